@@ -1,11 +1,18 @@
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional
+import asyncio
+import hashlib
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
+from app.user_store import compile_permissions, create_user_store
 
 import os
 from dotenv import load_dotenv
@@ -16,6 +23,14 @@ load_dotenv()
 SECRET_KEY = os.environ.get('SECRET_KEY')
 ALGORITHM = os.environ.get('ALGORITHM')
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
+# Quantidade máxima de tokens já verificados mantidos em memória (0 desativa o cache)
+TOKEN_CACHE_SIZE = int(os.environ.get('VITIBRASIL_TOKEN_CACHE_SIZE', '4096'))
+# Threads dedicadas à verificação de senhas (bcrypt) e quantas verificações podem aguardar na fila
+PASSWORD_WORKERS = int(os.environ.get('VITIBRASIL_PASSWORD_WORKERS', '2'))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get('VITIBRASIL_PASSWORD_QUEUE_LIMIT', '16'))
+# Tentativas de login permitidas por cliente dentro da janela (segundos)
+LOGIN_MAX_ATTEMPTS = int(os.environ.get('VITIBRASIL_LOGIN_MAX_ATTEMPTS', '10'))
+LOGIN_WINDOW_SECONDS = int(os.environ.get('VITIBRASIL_LOGIN_WINDOW', '60'))
 
 # Configuração do contexto de criptografia para hash de senhas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -23,14 +38,16 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Esquema OAuth2 com caminho do token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Banco de dados fictício de usuários
+# Usuários iniciais, carregados no repositório de usuários (ver app/user_store.py)
+# As senhas são armazenadas com hash bcrypt pré-calculado (senhas: "teste" e "admin"),
+# para não executar o bcrypt na importação do módulo a cada início de worker.
 
-users_db = {
+DEFAULT_USERS = {
     "usuario": {
         "username": "usuario",
         "full_name": "Usuário",
         "email": "user@email.com",
-        "hashed_password": pwd_context.hash("teste"),
+        "hashed_password": "$2b$12$fZABUzvkY5BC6x5cm6w7j.Gf1.pqTFL0Lq7wSUFTyLT.Rx4/25d4y",
         "disabled": False,
         "permissions": ["GET:/producao", "GET:/processamento"]  # Permissões do usuário
     },
@@ -38,13 +55,141 @@ users_db = {
         "username": "admin",
         "full_name": "Admin Usuário",
         "email": "admin@usuario.com",
-        "hashed_password": pwd_context.hash("admin"),
+        "hashed_password": "$2b$12$H6x9uRcKj9B7WUkfOSE9jek0cJNfXvFAhxa.gbPHGuN9m/iXvrVTW",
         "disabled": False,
         "permissions": [],
         "is_admin": True
     }
 }
 
+users_db = create_user_store(DEFAULT_USERS)
+
+
+class VerifiedTokenCache:
+    """
+    Cache LRU de tokens JWT já verificados, indexado pelo hash do token.
+
+    Cada entrada vale até o 'exp' do próprio token, evitando repetir a verificação
+    da assinatura a cada requisição.
+    """
+
+    def __init__(self, maxsize=TOKEN_CACHE_SIZE):
+        """
+        Inicializa o cache.
+
+        :param maxsize: Quantidade máxima de tokens mantidos (0 desativa o cache).
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        """
+        Obtém o usuário de um token verificado anteriormente e ainda não expirado.
+
+        :param token: Token JWT.
+        :return: Nome de usuário ou None se o token não estiver no cache.
+        """
+        if self.maxsize <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            username, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return username
+
+    def put(self, token, username, expires_at):
+        """
+        Registra um token verificado.
+
+        :param token: Token JWT.
+        :param username: Nome de usuário do token.
+        :param expires_at: Instante de expiração do token (timestamp).
+        """
+        if self.maxsize <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (username, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, username):
+        """
+        Remove do cache todos os tokens de um usuário.
+
+        :param username: Nome de usuário.
+        """
+        with self._lock:
+            for key in [k for k, (u, _) in self._entries.items() if u == username]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove todos os tokens do cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache()
+
+
+class LoginThrottle:
+    """Limite de tentativas de login por cliente em uma janela deslizante."""
+
+    def __init__(self, max_attempts=LOGIN_MAX_ATTEMPTS, window=LOGIN_WINDOW_SECONDS):
+        """
+        Inicializa o limitador de tentativas.
+
+        :param max_attempts: Tentativas permitidas por cliente dentro da janela (0 desativa).
+        :param window: Duração da janela em segundos.
+        """
+        self.max_attempts = max_attempts
+        self.window = window
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def hit(self, client: str):
+        """
+        Registra uma tentativa de login do cliente.
+
+        :param client: Identificação do cliente (ex.: endereço IP).
+        :return: Segundos até a próxima tentativa permitida, ou 0 se a tentativa for permitida.
+        """
+        if self.max_attempts <= 0:
+            return 0
+        agora = time.monotonic()
+        with self._lock:
+            tentativas = self._attempts.setdefault(client, deque())
+            while tentativas and tentativas[0] <= agora - self.window:
+                tentativas.popleft()
+            if len(tentativas) >= self.max_attempts:
+                return max(1, int(tentativas[0] + self.window - agora) + 1)
+            tentativas.append(agora)
+            # Descarta clientes sem tentativas recentes para o dicionário não crescer indefinidamente
+            if len(self._attempts) > 10000:
+                for chave in [k for k, v in self._attempts.items() if not v or v[-1] <= agora - self.window]:
+                    del self._attempts[chave]
+            return 0
+
+
+login_throttle = LoginThrottle()
+
+# Pool dedicado ao bcrypt: a verificação não bloqueia o event loop, e o semáforo
+# limita quantas verificações podem estar em execução ou aguardando ao mesmo tempo.
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix='vitibrasil-bcrypt')
+_password_slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT)
+
 
 class TokenData(BaseModel):
     """Modelo para os dados do token"""
@@ -61,6 +206,27 @@ def verify_password(plain_password, hashed_password):
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Verifica a senha no pool dedicado ao bcrypt, fora do event loop.
+
+    :param plain_password: Senha fornecida pelo usuário.
+    :param hashed_password: Senha hash armazenada.
+    :return: True se a senha corresponder, False caso contrário.
+    :raises HTTPException: Se a fila de verificações estiver cheia.
+    """
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitas autenticações em andamento, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+    finally:
+        _password_slots.release()
+
 def get_password_hash(password):
     """
     Gera um hash para a senha fornecida.
@@ -73,15 +239,13 @@ def get_password_hash(password):
 
 def get_user(db, username: str):
     """
-    Obtém um usuário do banco de dados fictício.
+    Obtém um usuário do repositório de usuários.
 
-    :param db: Banco de dados fictício.
+    :param db: Repositório de usuários (ou dicionário).
     :param username: Nome de usuário.
     :return: Dicionário do usuário ou None se o usuário não for encontrado.
     """
-    if username in db:
-        user_dict = db[username]
-        return user_dict
+    return db.get(username)
 
 def authenticate_user(fake_db, username: str, password: str):
     """
@@ -100,6 +264,24 @@ def authenticate_user(fake_db, username: str, password: str):
     return user
 
 
+async def authenticate_user_async(fake_db, username: str, password: str):
+    """
+    Autentica um usuário verificando suas credenciais fora do event loop.
+
+    :param fake_db: Banco de dados fictício.
+    :param username: Nome de usuário.
+    :param password: Senha do usuário.
+    :return: Dicionário do usuário autenticado ou False se a autenticação falhar.
+    :raises HTTPException: Se a fila de verificações estiver cheia.
+    """
+    user = get_user(fake_db, username)
+    if not user:
+        return False
+    if not await verify_password_async(password, user["hashed_password"]):
+        return False
+    return user
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Cria um token JWT para o usuário.
@@ -118,13 +300,48 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def decode_token_username(token: str):
+    """
+    Obtém o usuário de um token JWT, verificando a assinatura apenas se o token
+    não estiver no cache de tokens verificados.
+
+    :param token: Token JWT.
+    :return: Nome de usuário do token ou None se o token não tiver usuário.
+    :raises JWTError: Se o token for inválido ou estiver expirado.
+    """
+    username = token_cache.get(token)
+    if username is not None:
+        return username
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username = payload.get("sub")
+    if username is not None and payload.get("exp") is not None:
+        token_cache.put(token, username, payload["exp"])
+    return username
+
+
+def disable_user(db, username: str):
+    """
+    Desativa um usuário e descarta seus tokens do cache de tokens verificados.
+
+    O cache de tokens é de cada processo, mas só associa o token ao nome do usuário:
+    a desativação vale em todos os processos porque o repositório de usuários relê o
+    registro alterado (ver SQLiteUserStore) e get_current_user recusa o usuário
+    desativado.
+
+    :param db: Repositório de usuários.
+    :param username: Nome de usuário.
+    """
+    db.set_disabled(username, True)
+    token_cache.invalidate_user(username)
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Obtém o usuário atual a partir do token JWT.
 
     :param token: Token JWT.
     :return: Dicionário do usuário atual.
-    :raises HTTPException: Se o token for inválido ou o usuário não for encontrado.
+    :raises HTTPException: Se o token for inválido ou o usuário não for encontrado ou estiver desativado.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -132,29 +349,29 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
+        username: str = decode_token_username(token)
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
     user = get_user(users_db, username=token_data.username)
-    if user is None:
+    if user is None or user.get("disabled"):
         raise credentials_exception
     return user
 
-def check_permissions(user_permissions: List[str], method: str, path: str) -> bool:
+def check_permissions(user_permissions, method: str, path: str) -> bool:
     """
     Verifica se o usuário tem permissões para acessar o endpoint.
 
-    :param user_permissions: Lista de permissões do usuário.
+    :param user_permissions: Permissões compiladas (frozenset de (método, caminho)) ou lista "MÉTODO:/caminho".
     :param method: Método HTTP da requisição.
     :param path: Caminho do endpoint.
     :return: True se o usuário tiver permissão, False caso contrário.
     """
-    required_permission = f"{method}:{path}"
-    return required_permission in user_permissions
+    if not isinstance(user_permissions, frozenset):
+        user_permissions = compile_permissions(user_permissions)
+    return (method, path) in user_permissions
 
 
 async def get_current_active_user(current_user = Depends(get_current_user)):
@@ -170,6 +387,23 @@ async def get_current_active_user(current_user = Depends(get_current_user)):
     return current_user
 
 
+def is_authorized(user, method, path) -> bool:
+    """
+    Verifica se o usuário pode acessar um endpoint específico.
+
+    :param user: Dicionário do usuário.
+    :param method: Método HTTP da requisição.
+    :param path: Caminho do endpoint.
+    :return: True se o usuário tiver permissão, False caso contrário.
+    """
+    if user.get("is_admin"):
+        return True
+    permission_set = getattr(user, "permission_set", None)
+    if permission_set is None:
+        permission_set = user.get("permissions", [])
+    return check_permissions(permission_set, method, path)
+
+
 def authorize_user(user, method, path):
     """
     Autoriza o usuário para acessar um endpoint específico.
@@ -179,9 +413,7 @@ def authorize_user(user, method, path):
     :param path: Caminho do endpoint.
     :raises HTTPException: Se o usuário não tiver permissão para acessar o endpoint.
     """
-    if user.get("is_admin"):
-        return
-    if not check_permissions(user["permissions"], method, path):
+    if not is_authorized(user, method, path):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Usuário sem permissão"
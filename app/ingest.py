@@ -0,0 +1,336 @@
+"""
+Ingestão completa dos datasets fora do caminho das requisições.
+
+Divide a obtenção dos datasets em tarefas (dataset, botão, intervalo de anos),
+executadas em paralelo por processos de trabalho. Cada tarefa concluída é gravada
+em disco como ponto de controle, então uma ingestão interrompida continua de onde
+parou ao ser executada novamente. Ao final, os datasets são publicados no
+repositório compartilhado, com as consolidações e o registro de alterações (como
+no app.refresher), e o tempo gasto em cada etapa é resumido.
+
+Uso:
+    python -m app.ingest
+    python -m app.ingest --datasets importacao exportacao --source csv --workers 8
+    python -m app.ingest --fresh
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.routes.routes import get_data_from_source, CELULAS_FALHAS_ATTR
+from app.utils_data.csv.download_csv import download_and_process_csv, csv_urls_for_botoes
+from app.utils_data.datasets import DATASETS
+from app.utils_data.formats import to_arrow_table, concat_tables
+from app.utils_data.shared_store import shared_store, write_arrow_file, STORE_DIR
+from app.utils_data.web_scraping.scraping_base import FONTE_CSV
+from app.utils_data.upstream import limiter, UPSTREAM_RATE
+from app.utils_data.transport import transport
+from app.utils_data.constants import BASE_URL, DEFAULT_BASE_URL
+from app.refresher import refresh_rollups, record_changes, prepare_exports, IncompleteDataset
+from app.metrics import STAGE_DURATION, stage_timer
+from app.lazy import lazy_import
+
+pa = lazy_import('pyarrow')
+
+
+# Origem dos dados: 'auto' tenta o site e completa as páginas com falha pelos CSVs
+# (como a API), 'site' usa só o site e 'csv' usa só os arquivos CSV
+FONTES = ('auto', 'site', 'csv')
+DEFAULT_WORKERS = int(os.environ.get('VITIBRASIL_INGEST_WORKERS', '4'))
+# Anos por tarefa na raspagem do site (os CSVs trazem todos os anos de uma vez)
+DEFAULT_YEARS_PER_TASK = int(os.environ.get('VITIBRASIL_INGEST_YEARS_PER_TASK', '10'))
+# Pontos de controle das tarefas concluídas, removidos após a publicação
+CHECKPOINT_DIR = os.environ.get('VITIBRASIL_INGEST_CHECKPOINT_DIR', os.path.join(STORE_DIR, 'ingest'))
+
+
+def plan_tasks(nomes, fonte, anos_por_tarefa):
+    """
+    Divide a ingestão em tarefas independentes. Dentro de cada dataset, as tarefas
+    seguem a ordem da raspagem do site: intervalo de anos e, em cada um, os botões.
+
+    :param nomes: Nomes dos datasets.
+    :param fonte: Origem dos dados (ver FONTES).
+    :param anos_por_tarefa: Quantidade de anos por tarefa (0 para o intervalo completo).
+    :return: Lista de tuplas (dataset, opção de botão ou None, ano inicial, ano final).
+    """
+    tarefas = []
+    for nome in nomes:
+        config = DATASETS[nome]
+        inicio, fim = config['ano_inicial'], config['ano_final']
+        passo = fim - inicio + 1 if fonte == 'csv' or anos_por_tarefa <= 0 else anos_por_tarefa
+        for start_year in range(inicio, fim + 1, passo):
+            for botao_opcao in config['botoes'] or [None]:
+                tarefas.append((nome, botao_opcao, start_year, min(start_year + passo - 1, fim)))
+    return tarefas
+
+
+def describe_task(tarefa):
+    """Descrição da tarefa nas mensagens de progresso."""
+    nome, botao_opcao, start_year, end_year = tarefa
+    return f"{nome}{f' {botao_opcao}' if botao_opcao else ''} {start_year}-{end_year}"
+
+
+def checkpoint_path(checkpoint_dir, tarefa, fonte):
+    """
+    Obtém o caminho do ponto de controle de uma tarefa.
+
+    :param checkpoint_dir: Diretório dos pontos de controle.
+    :param tarefa: Tupla (dataset, opção de botão, ano inicial, ano final).
+    :param fonte: Origem dos dados.
+    :return: Caminho do arquivo Arrow da tarefa.
+    """
+    nome, botao_opcao, start_year, end_year = tarefa
+    return os.path.join(checkpoint_dir, f'{nome}.{botao_opcao or "-"}.{start_year}-{end_year}.{fonte}.arrow')
+
+
+def csv_data(config, botao, start_year, end_year):
+    """
+    Obtém os dados de um dataset apenas pelos arquivos CSV.
+
+    :param config: Configuração do dataset (DATASETS).
+    :param botao: Opção de botão ou None para todos.
+    :param start_year: Ano de início.
+    :param end_year: Ano de término.
+    :return: DataFrame com as linhas do intervalo (e do botão).
+    """
+    scraper = config['scraper'](range(start_year, end_year + 1), botao)
+    csv_urls = scraper.csv_url
+    if botao is not None:
+        csv_urls = csv_urls_for_botoes(csv_urls, {botao['classificacao_botao']})
+    dados = download_and_process_csv(csv_urls, scraper.tipo)
+    dados = dados[(dados['Ano'] >= start_year) & (dados['Ano'] <= end_year)]
+    if botao is not None and 'Botao' in dados.columns:
+        dados = dados[dados['Botao'] == botao['classificacao_botao']]
+    return dados.assign(Fonte=FONTE_CSV)
+
+
+def run_task(tarefa, fonte, checkpoint_dir):
+    """
+    Executa uma tarefa em um processo de trabalho e grava o ponto de controle.
+
+    :param tarefa: Tupla (dataset, opção de botão, ano inicial, ano final).
+    :param fonte: Origem dos dados (ver FONTES).
+    :param checkpoint_dir: Diretório dos pontos de controle.
+    :return: Tupla (linhas obtidas, duração em segundos, {etapa: (segundos, contagem)}).
+    :raises RuntimeError: Se alguma página falhar com a fonte 'site'.
+    :raises IncompleteDataset: Se a tarefa não obtiver nenhuma linha ou, com a
+        fonte 'auto', se alguma página não for completada pelos CSVs; nesse caso
+        o ponto de controle não é gravado.
+    """
+    # As etapas medidas no processo de trabalho são devolvidas por tarefa
+    STAGE_DURATION.clear()
+    inicio = time.perf_counter()
+    nome, botao_opcao, start_year, end_year = tarefa
+    config = DATASETS[nome]
+    botao = config['botoes'].get(botao_opcao)
+
+    if fonte == 'csv':
+        dados = csv_data(config, botao, start_year, end_year)
+    elif fonte == 'site':
+        scraper = config['scraper'](range(start_year, end_year + 1), botao)
+        scraper.run()
+        if scraper.celulas_falhas:
+            raise RuntimeError(f'{len(scraper.celulas_falhas)} página(s) com falha no site')
+        dados = scraper.dados
+    else:
+        dados = get_data_from_source(config['scraper'], start_year, end_year, botao)
+        faltando = dados.attrs.get(CELULAS_FALHAS_ATTR, [])
+        if faltando:
+            raise IncompleteDataset(f'{len(faltando)} página(s) sem dados no site nem nos CSVs')
+    if dados.empty:
+        raise IncompleteDataset('nenhuma linha obtida')
+
+    tabela = to_arrow_table(dados)
+    path = checkpoint_path(checkpoint_dir, tarefa, fonte)
+    with stage_timer('checkpoint', nome, botao['classificacao_botao'] if botao else None):
+        write_arrow_file(tabela, path + '.tmp')
+        os.replace(path + '.tmp', path)
+    return tabela.num_rows, time.perf_counter() - inicio, stage_totals()
+
+
+def worker_rate(rate, workers):
+    """
+    Divide o limite de requisições ao site entre os processos de trabalho, para
+    que a soma dos processos respeite o limite de um único processo da API.
+
+    :param rate: Requisições por segundo somando todos os processos ou None para
+        VITIBRASIL_UPSTREAM_RATE.
+    :param workers: Quantidade de processos de trabalho.
+    :return: Requisições por segundo de cada processo (0 sem limite).
+    :raises ValueError: Se o limite estiver desativado com mais de um processo
+        acessando o site da Embrapa.
+    """
+    total = UPSTREAM_RATE if rate is None else rate
+    if total > 0:
+        return total / workers
+    if workers > 1 and not transport.offline and BASE_URL == DEFAULT_BASE_URL:
+        raise ValueError('Sem limite de requisições (--rate ou VITIBRASIL_UPSTREAM_RATE igual a 0), '
+                         'a ingestão no site da Embrapa deve usar um único processo (--workers 1)')
+    return 0.0
+
+
+def _init_worker(rate):
+    """
+    Inicializa um processo de trabalho com a sua parte do limite de requisições ao site.
+
+    :param rate: Requisições por segundo deste processo (0 sem limite).
+    """
+    limiter.rate = rate
+
+
+def stage_totals():
+    """
+    Soma as durações medidas neste processo por etapa, juntando datasets e botões.
+
+    :return: Dicionário {etapa: (segundos, contagem)}.
+    """
+    etapas = {}
+    for (etapa, _, _), valores in STAGE_DURATION.summary().items():
+        merge_stages(etapas, {etapa: valores})
+    return etapas
+
+
+def merge_stages(total, etapas):
+    """
+    Acumula as durações por etapa de uma tarefa no total da ingestão.
+
+    :param total: Dicionário {etapa: (segundos, contagem)} acumulado.
+    :param etapas: Dicionário {etapa: (segundos, contagem)} da tarefa.
+    """
+    for etapa, (segundos, contagem) in etapas.items():
+        soma, vezes = total.get(etapa, (0.0, 0))
+        total[etapa] = (soma + segundos, vezes + contagem)
+
+
+def print_summary(etapas, duracao):
+    """
+    Mostra o tempo gasto em cada etapa, da mais demorada para a mais rápida. Nas
+    etapas dos processos de trabalho, o tempo é a soma de todos os processos.
+
+    :param etapas: Dicionário {etapa: (segundos, contagem)}.
+    :param duracao: Duração total da ingestão em segundos.
+    """
+    print(f'\nTempo por etapa (total da ingestão: {duracao:.1f}s)')
+    print(f'{"etapa":<20} {"segundos":>10} {"vezes":>8}')
+    for etapa, (segundos, contagem) in sorted(etapas.items(), key=lambda item: -item[1][0]):
+        print(f'{etapa:<20} {segundos:>10.2f} {contagem:>8}')
+
+
+def ingest(nomes=None, fonte='auto', workers=DEFAULT_WORKERS, anos_por_tarefa=DEFAULT_YEARS_PER_TASK,
+           checkpoint_dir=CHECKPOINT_DIR, fresh=False, rate=None, store=shared_store):
+    """
+    Obtém os datasets em paralelo, retomando os pontos de controle existentes, e
+    publica uma nova versão no repositório compartilhado.
+
+    :param nomes: Nomes dos datasets. Padrão: todos.
+    :param fonte: Origem dos dados (ver FONTES).
+    :param workers: Quantidade de processos de trabalho.
+    :param anos_por_tarefa: Quantidade de anos por tarefa (0 para o intervalo completo).
+    :param checkpoint_dir: Diretório dos pontos de controle.
+    :param fresh: Descarta os pontos de controle existentes antes de começar.
+    :param rate: Requisições por segundo ao site, divididas entre os processos
+        (padrão: VITIBRASIL_UPSTREAM_RATE).
+    :param store: Repositório compartilhado de destino.
+    :return: Número da versão publicada ou None se alguma tarefa falhou (ou algum
+        dataset ficou vazio), sem publicar nada.
+    :raises ValueError: Se o limite de requisições estiver desativado com mais de
+        um processo acessando o site da Embrapa.
+    """
+    inicio = time.perf_counter()
+    rate_processo = worker_rate(rate, workers)
+    STAGE_DURATION.clear()
+    nomes = list(nomes or DATASETS)
+    tarefas = plan_tasks(nomes, fonte, anos_por_tarefa)
+    if fresh:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    pendentes = [t for t in tarefas if not os.path.exists(checkpoint_path(checkpoint_dir, t, fonte))]
+    concluidas = len(tarefas) - len(pendentes)
+    print(f'{len(tarefas)} tarefa(s), {concluidas} retomada(s) de {checkpoint_dir}, {workers} processo(s)')
+
+    etapas = {}
+    falhas = []
+    if pendentes:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rate_processo,)) as executor:
+            futuros = {executor.submit(run_task, tarefa, fonte, checkpoint_dir): tarefa for tarefa in pendentes}
+            for futuro in as_completed(futuros):
+                tarefa = futuros[futuro]
+                concluidas += 1
+                try:
+                    linhas, duracao, etapas_tarefa = futuro.result()
+                except Exception as e:
+                    falhas.append(tarefa)
+                    print(f'[{concluidas}/{len(tarefas)}] {describe_task(tarefa)}: falha: {str(e)}')
+                    continue
+                merge_stages(etapas, etapas_tarefa)
+                print(f'[{concluidas}/{len(tarefas)}] {describe_task(tarefa)}: {linhas} linhas em {duracao:.1f}s')
+
+    if falhas:
+        print(f'{len(falhas)} tarefa(s) com falha; execute novamente para retomar a partir dos pontos de controle')
+        print_summary(etapas, time.perf_counter() - inicio)
+        return None
+
+    tabelas = {}
+    for nome in nomes:
+        with stage_timer('merge', nome):
+            partes = [
+                pa.ipc.open_file(pa.memory_map(checkpoint_path(checkpoint_dir, t, fonte), 'r')).read_all()
+                for t in tarefas if t[0] == nome
+            ]
+            tabelas[nome] = concat_tables(partes)
+        print(f'Dataset {nome}: {tabelas[nome].num_rows} linhas')
+        if not tabelas[nome].num_rows or 'Ano' not in tabelas[nome].column_names:
+            # Pontos de controle vazios (ex.: de uma versão anterior da ingestão) são refeitos na próxima execução
+            falhas.extend(t for t in tarefas if t[0] == nome)
+    if falhas:
+        for tarefa in falhas:
+            os.remove(checkpoint_path(checkpoint_dir, tarefa, fonte))
+        print(f'{len(falhas)} tarefa(s) de dataset(s) vazio(s); nenhuma versão publicada')
+        print_summary(etapas, time.perf_counter() - inicio)
+        return None
+    rollups = {nome: refresh_rollups(nome, tabela, store) for nome, tabela in tabelas.items()}
+    changes = record_changes(tabelas, store)
+    with stage_timer('publish'):
+        version = store.publish(tabelas, rollups, changes)
+    print(f'Versão {version} publicada em {store.root}')
+    prepare_exports(version, store)
+
+    for tarefa in tarefas:
+        os.remove(checkpoint_path(checkpoint_dir, tarefa, fonte))
+    merge_stages(etapas, stage_totals())
+    print_summary(etapas, time.perf_counter() - inicio)
+    return version
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando da ingestão.
+
+    :param argv: Argumentos da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description='Obtém os datasets em paralelo e publica no repositório compartilhado.')
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), help='Datasets a obter (padrão: todos)')
+    parser.add_argument('--source', choices=FONTES, default='auto', help='Origem dos dados (padrão: auto, site com complemento pelos CSVs)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Quantidade de processos de trabalho')
+    parser.add_argument('--years-per-task', type=int, default=DEFAULT_YEARS_PER_TASK, help='Anos por tarefa na raspagem do site (0 para todos)')
+    parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR, help='Diretório dos pontos de controle')
+    parser.add_argument('--fresh', action='store_true', help='Descarta os pontos de controle e recomeça do zero')
+    parser.add_argument('--rate', type=float,
+                        help='Requisições por segundo ao site, somando todos os processos (padrão: VITIBRASIL_UPSTREAM_RATE)')
+    args = parser.parse_args(argv)
+
+    try:
+        version = ingest(args.datasets, args.source, max(args.workers, 1), args.years_per_task,
+                         args.checkpoint_dir, args.fresh, args.rate)
+    except ValueError as e:
+        parser.error(str(e))
+    if version is None:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import importlib
+import sys
+import types
+
+
+# Módulos pesados carregados sob demanda e que podem ser pré-carregados após o início
+HEAVY_MODULES = ('pandas', 'pyarrow', 'pyarrow.compute', 'pyarrow.parquet', 'bs4')
+
+
+class _LazyModule(types.ModuleType):
+    """Módulo cujo carregamento real acontece no primeiro acesso a um atributo."""
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # Copia os atributos para que os próximos acessos não passem por aqui
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """
+    Importa um módulo sob demanda: o módulo só é carregado quando um atributo
+    dele é usado pela primeira vez.
+
+    :param name: Nome completo do módulo (ex.: 'pyarrow.compute').
+    :return: O módulo, se já carregado, ou um módulo de carregamento tardio.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return _LazyModule(name)
+
+
+def preload_heavy_modules():
+    """Carrega os módulos pesados, para aquecer o processo fora do caminho das requisições."""
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
@@ -1,8 +1,18 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import os
+import threading
+from fastapi import FastAPI, Depends, HTTPException, status, Response, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-from app.auth import authenticate_user, create_access_token, get_current_active_user, users_db, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.auth import authenticate_user_async, create_access_token, get_current_active_user, users_db, login_throttle, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.routes.routes import router
+from app.routes.batch import router as batch_router
+from app.routes.aggregation import router as aggregation_router
+from app.routes.analytics import router as analytics_router
+from app.routes.changes import router as changes_router
+from app.routes.export import router as export_router
+from app.metrics import registry, CONTENT_TYPE
+from app.profiling import ProfilingMiddleware
+from app.lazy import preload_heavy_modules
 
 tags_metadata = [
     {
@@ -29,6 +39,30 @@ tags_metadata = [
         "name": "Exportação",
         "description": "Endpoints relacionados à exportação de derivados de uva",
     },
+    {
+        "name": "Consultas em lote",
+        "description": "Endpoint para obter dados de vários datasets em uma única requisição",
+    },
+    {
+        "name": "Agregações",
+        "description": "Endpoints de agregação dos dados no servidor (totais, médias, contagens e maiores grupos)",
+    },
+    {
+        "name": "Análises",
+        "description": "Endpoints de análise de séries temporais (variação anual, média móvel e acumulado)",
+    },
+    {
+        "name": "Alterações",
+        "description": "Registro das alterações de cada atualização dos datasets, para sincronização incremental",
+    },
+    {
+        "name": "Exportação completa",
+        "description": "Pacote com todos os datasets de uma versão publicada, em CSV ou Parquet",
+    },
+    {
+        "name": "Monitoramento",
+        "description": "Métricas de operação da API no formato do Prometheus",
+    },
     {   
         "name": "Página Inicial",
         "description": "Banco de dados de uva, vinho e derivados",
@@ -42,6 +76,15 @@ app = FastAPI(
     openapi_tags=tags_metadata,
 )
 
+# Profiling por amostragem sob demanda (apenas administradores, ver app/profiling.py)
+app.add_middleware(ProfilingMiddleware)
+
+# Os módulos pesados (pandas, pyarrow, bs4) são carregados no primeiro uso. Com
+# VITIBRASIL_PRELOAD=1 eles são carregados em segundo plano logo após o início,
+# sem atrasar a disponibilidade do worker.
+if os.environ.get('VITIBRASIL_PRELOAD') == '1':
+    threading.Thread(target=preload_heavy_modules, name='vitibrasil-preload', daemon=True).start()
+
 @app.get("/",
         response_model=dict, 
         tags=["Página Inicial"], 
@@ -63,14 +106,26 @@ def root():
         summary='Autenticar usuário', 
         description='Gera um token JWT para autenticação'
         )
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Autentica o usuário e gera um token JWT.
 
+    A verificação da senha roda no pool dedicado ao bcrypt, fora do event loop,
+    e as tentativas são limitadas por cliente.
+
+    :param request: Requisição HTTP, usada para identificar o cliente.
     :param form_data: Dados do formulário de autenticação.
     :return: Token de acesso JWT e tipo de token.
     """
-    user = authenticate_user(users_db, form_data.username, form_data.password)
+    client = request.client.host if request.client else "desconhecido"
+    retry_after = login_throttle.hit(client)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login, tente novamente mais tarde",
+            headers={"Retry-After": str(retry_after)},
+        )
+    user = await authenticate_user_async(users_db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -100,7 +155,26 @@ async def read_users_me(current_user = Depends(get_current_active_user)):
 
 
 
+@app.get("/metrics",
+        tags=["Monitoramento"],
+        summary='Métricas da API',
+        description='Métricas de operação no formato de exposição do Prometheus')
+def metrics():
+    """
+    Endpoint de métricas no formato texto do Prometheus.
+
+    :return: Texto com as métricas registradas.
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
+
 app.include_router(router, prefix="/vitibrasil/api/v1" )
+app.include_router(batch_router, prefix="/vitibrasil/api/v1")
+app.include_router(aggregation_router, prefix="/vitibrasil/api/v1")
+app.include_router(analytics_router, prefix="/vitibrasil/api/v1")
+app.include_router(changes_router, prefix="/vitibrasil/api/v1")
+app.include_router(export_router, prefix="/vitibrasil/api/v1")
 
 
 
@@ -0,0 +1,279 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Limites padrão (segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    """
+    Formata os rótulos de uma amostra no formato texto do Prometheus.
+
+    :param labelnames: Nomes dos rótulos.
+    :param values: Valores dos rótulos.
+    :param extra: Par (nome, valor) adicional, como o 'le' dos histogramas.
+    :return: Texto dos rótulos entre chaves, ou vazio se não houver rótulos.
+    """
+    pares = list(zip(labelnames, values))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    texto = ','.join(
+        '{}="{}"'.format(nome, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for nome, valor in pares
+    )
+    return '{' + texto + '}'
+
+
+def _format_value(valor):
+    """
+    Formata um valor numérico no formato texto do Prometheus.
+
+    :param valor: Valor numérico.
+    :return: Texto do valor.
+    """
+    if valor == float('inf'):
+        return '+Inf'
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metric:
+    """Base das métricas: nome, descrição, rótulos e valores por combinação de rótulos."""
+
+    tipo = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'Rótulos inválidos para {self.name}: {sorted(labels)}')
+        return tuple(str(labels[nome]) for nome in self.labelnames)
+
+    def clear(self):
+        """Descarta todos os valores registrados."""
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """
+        Gera as linhas da métrica no formato texto do Prometheus.
+
+        :return: Lista de linhas.
+        """
+        linhas = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.tipo}']
+        with self._lock:
+            itens = sorted(self._values.items())
+        for key, valor in itens:
+            linhas.extend(self._render_sample(key, valor))
+        return linhas
+
+    def _render_sample(self, key, valor):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(valor)}']
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+
+    tipo = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Incrementa o contador.
+
+        :param amount: Valor do incremento.
+        :param labels: Valores dos rótulos.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """
+        Obtém o valor atual do contador.
+
+        :param labels: Valores dos rótulos.
+        :return: Valor atual.
+        """
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Medidor que pode subir e descer."""
+
+    tipo = 'gauge'
+
+    def set(self, valor, **labels):
+        """
+        Define o valor do medidor.
+
+        :param valor: Novo valor.
+        :param labels: Valores dos rótulos.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = valor
+
+    def inc(self, amount=1, **labels):
+        """
+        Incrementa o medidor.
+
+        :param amount: Valor do incremento.
+        :param labels: Valores dos rótulos.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        """
+        Decrementa o medidor.
+
+        :param amount: Valor do decremento.
+        :param labels: Valores dos rótulos.
+        """
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        """
+        Obtém o valor atual do medidor.
+
+        :param labels: Valores dos rótulos.
+        :return: Valor atual.
+        """
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Histograma com buckets cumulativos, soma e contagem."""
+
+    tipo = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, valor, **labels):
+        """
+        Registra uma observação.
+
+        :param valor: Valor observado (ex.: duração em segundos).
+        :param labels: Valores dos rótulos.
+        """
+        key = self._key(labels)
+        with self._lock:
+            amostra = self._values.get(key)
+            if amostra is None:
+                amostra = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    amostra['buckets'][i] += 1
+            amostra['sum'] += valor
+            amostra['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Registra a duração do bloco, em segundos, mesmo que ele termine com exceção.
+
+        :param labels: Valores dos rótulos.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, **labels)
+
+    def summary(self):
+        """
+        Obtém a soma e a contagem das observações de cada combinação de rótulos.
+
+        :return: Dicionário {valores dos rótulos: (soma, contagem)}.
+        """
+        with self._lock:
+            return {key: (amostra['sum'], amostra['count']) for key, amostra in self._values.items()}
+
+    def _render_sample(self, key, amostra):
+        linhas = []
+        for limite, contagem in zip(self.buckets, amostra['buckets']):
+            rotulos = _format_labels(self.labelnames, key, ('le', _format_value(limite)))
+            linhas.append(f'{self.name}_bucket{rotulos} {contagem}')
+        rotulos = _format_labels(self.labelnames, key)
+        linhas.append(f'{self.name}_sum{rotulos} {_format_value(amostra["sum"])}')
+        linhas.append(f'{self.name}_count{rotulos} {amostra["count"]}')
+        return linhas
+
+
+class Registry:
+    """Registro das métricas expostas no endpoint /metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Registra uma métrica, reaproveitando a existente se o nome já estiver registrado.
+
+        :param metric: Métrica a registrar.
+        :return: Métrica registrada.
+        """
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        """Cria (ou obtém) um contador registrado."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Cria (ou obtém) um medidor registrado."""
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Cria (ou obtém) um histograma registrado."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        Gera o texto de todas as métricas no formato de exposição do Prometheus.
+
+        :return: Texto das métricas.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        linhas = []
+        for metric in metrics:
+            linhas.extend(metric.render())
+        return '\n'.join(linhas) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = Registry()
+
+STAGE_DURATION = registry.histogram(
+    'vitibrasil_stage_duration_seconds',
+    'Duração de cada etapa da obtenção dos dados',
+    ['etapa', 'tipo', 'botao'],
+)
+
+
+def stage_timer(etapa, tipo='-', botao=None):
+    """
+    Mede a duração de uma etapa (health check, página, parse, CSV, serialização...).
+
+    :param etapa: Nome da etapa.
+    :param tipo: Tipo de dados (ex.: 'Prod', 'Imp') ou nome do dataset.
+    :param botao: Classificação do botão, se houver.
+    :return: Context manager que registra a duração do bloco.
+    """
+    return STAGE_DURATION.time(etapa=etapa, tipo=tipo or '-', botao=botao or '-')
@@ -0,0 +1,226 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+from jose import JWTError
+
+from app.auth import decode_token_username, get_user, is_admin_user, users_db
+
+
+# Cabeçalho e parâmetro de query que ativam o profiler em uma requisição.
+# Valores: '1' grava o perfil em disco; 'inline' devolve o perfil no lugar da resposta.
+PROFILE_HEADER = b'x-vitibrasil-profile'
+PROFILE_QUERY = 'profile'
+# Intervalo (segundos) entre as amostras das pilhas
+PROFILE_INTERVAL = float(os.environ.get('VITIBRASIL_PROFILE_INTERVAL', '0.005'))
+# Diretório onde os perfis gravados ficam, no formato de pilhas colapsadas (flamegraph.pl, speedscope)
+PROFILE_DIR = os.environ.get('VITIBRASIL_PROFILE_DIR', os.path.join(os.getcwd(), '.vitibrasil_profiles'))
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem: uma thread lê periodicamente as pilhas de todas as
+    threads (sys._current_frames) e conta as pilhas que passam pelo código da API.
+
+    Como as amostras incluem todas as threads, requisições simultâneas à que está
+    sendo perfilada também aparecem no resultado.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        """
+        Inicializa o profiler.
+
+        :param interval: Intervalo entre as amostras em segundos.
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._inicio = None
+
+    @staticmethod
+    def _collapse(frame):
+        """
+        Converte a pilha de um frame em uma linha colapsada ("raiz;...;folha").
+
+        :param frame: Frame do topo da pilha.
+        :return: Pilha colapsada ou None se a pilha não passar pelo código da API.
+        """
+        nomes = []
+        no_app = False
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.abspath(code.co_filename)
+            if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+                no_app = True
+            nomes.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+        if not no_app:
+            return None
+        return ';'.join(reversed(nomes))
+
+    def _run(self):
+        proprio = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = self._collapse(frame)
+                if pilha:
+                    self.stacks[pilha] += 1
+
+    def start(self):
+        """Inicia a amostragem em segundo plano."""
+        self._inicio = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='vitibrasil-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Interrompe a amostragem e aguarda a thread do profiler terminar."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._inicio
+
+    def collapsed(self):
+        """
+        Gera o perfil no formato de pilhas colapsadas (uma pilha e sua contagem por linha).
+
+        :return: Texto do perfil.
+        """
+        return ''.join(f'{pilha} {contagem}\n' for pilha, contagem in self.stacks.most_common())
+
+
+def _profile_mode(scope):
+    """
+    Obtém o modo de profiling solicitado pelo cabeçalho ou pela query.
+
+    :param scope: Escopo ASGI da requisição.
+    :return: 'store', 'inline' ou None se o profiling não foi solicitado.
+    """
+    valor = None
+    for nome, conteudo in scope.get('headers', ()):
+        if nome == PROFILE_HEADER:
+            valor = conteudo.decode('latin-1')
+            break
+    if valor is None and PROFILE_QUERY.encode() in scope.get('query_string', b''):
+        valores = parse_qs(scope['query_string'].decode('latin-1')).get(PROFILE_QUERY)
+        valor = valores[0] if valores else None
+    if not valor or valor.strip().lower() in ('0', 'false'):
+        return None
+    return 'inline' if valor.strip().lower() == 'inline' else 'store'
+
+
+def _is_admin_request(scope):
+    """
+    Verifica se a requisição traz o token de um administrador ativo.
+
+    :param scope: Escopo ASGI da requisição.
+    :return: True se o usuário for administrador, False caso contrário.
+    """
+    for nome, conteudo in scope.get('headers', ()):
+        if nome == b'authorization':
+            esquema, _, token = conteudo.decode('latin-1').partition(' ')
+            if esquema.lower() != 'bearer' or not token:
+                return False
+            try:
+                username = decode_token_username(token.strip())
+            except JWTError:
+                return False
+            user = get_user(users_db, username) if username else None
+            return bool(user) and not user.get('disabled') and bool(is_admin_user(user))
+    return False
+
+
+async def _send_json(send, status_code, detail):
+    corpo = json.dumps({'detail': detail}).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status_code,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(corpo)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': corpo})
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que executa a requisição sob o SamplingProfiler quando um
+    administrador envia o cabeçalho X-Vitibrasil-Profile (ou ?profile=).
+
+    Sem o cabeçalho, a requisição segue direto para a aplicação.
+    """
+
+    def __init__(self, app, profile_dir=PROFILE_DIR):
+        self.app = app
+        self.profile_dir = profile_dir
+        # Um perfil por vez por processo, para o custo da amostragem não se acumular
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        modo = _profile_mode(scope)
+        if modo is None:
+            await self.app(scope, receive, send)
+            return
+        if not _is_admin_request(scope):
+            await _send_json(send, 403, 'Profiling disponível apenas para administradores')
+            return
+        if not self._lock.acquire(blocking=False):
+            await _send_json(send, 409, 'Já existe um profiling em andamento neste processo')
+            return
+        try:
+            await self._profile(scope, receive, send, modo)
+        finally:
+            self._lock.release()
+
+    async def _profile(self, scope, receive, send, modo):
+        nome = '{}-{}.collapsed'.format(
+            time.strftime('%Y%m%dT%H%M%S'), scope['path'].strip('/').replace('/', '_') or 'root'
+        )
+        profiler = SamplingProfiler()
+
+        async def send_wrapper(message):
+            if modo == 'inline':
+                # A resposta original é descartada; o perfil é devolvido no lugar dela
+                return
+            if message['type'] == 'http.response.start':
+                message = dict(message)
+                message['headers'] = list(message.get('headers', [])) + [(b'x-vitibrasil-profile-file', nome.encode())]
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+
+        perfil = profiler.collapsed()
+        if modo == 'inline':
+            corpo = perfil.encode('utf-8')
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/plain; charset=utf-8'),
+                    (b'content-length', str(len(corpo)).encode()),
+                    (b'x-vitibrasil-profile-samples', str(profiler.samples).encode()),
+                    (b'x-vitibrasil-profile-duration', f'{profiler.duration:.3f}'.encode()),
+                ],
+            })
+            await send({'type': 'http.response.body', 'body': corpo})
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        with open(os.path.join(self.profile_dir, nome), 'w', encoding='utf-8') as f:
+            f.write(perfil)
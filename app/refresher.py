@@ -0,0 +1,196 @@
+"""
+Processo de atualização dos datasets compartilhados.
+
+Executa a raspagem (ou o download dos CSVs) de cada dataset no intervalo completo
+de anos e publica uma nova versão no repositório compartilhado, que todos os
+workers da API mapeiam em modo somente leitura. As consolidações de cada dataset
+(app/utils_data/rollups.py) são atualizadas para os anos alterados e publicadas
+junto com ele, e os pacotes de exportação completa da nova versão já ficam prontos.
+
+Uso:
+    python -m app.refresher --once
+    python -m app.refresher --interval 21600
+"""
+import argparse
+import time
+
+from app.routes.routes import get_data_from_source, CELULAS_FALHAS_ATTR
+from app.utils_data.datasets import DATASETS
+from app.utils_data.cache import cache, make_key
+from app.utils_data.formats import to_arrow_table, serialize_arrow_ipc, deserialize_arrow_ipc
+from app.utils_data.shared_store import shared_store
+from app.utils_data.rollups import ROLLUPS, update_rollups
+from app.utils_data.changes import changes_schema, diff_tables
+from app.utils_data.export import build_exports
+from app.metrics import stage_timer
+from app.utils_data.upstream import limiter, upstream_priority, PRIORIDADE_BACKGROUND
+from app.lazy import lazy_import
+
+pa = lazy_import('pyarrow')
+
+
+DEFAULT_INTERVAL = 6 * 60 * 60
+# Tempo máximo de retenção da trava de atualização de um dataset entre os nós
+REFRESH_LOCK_TTL = 30 * 60
+
+
+class IncompleteDataset(Exception):
+    """A raspagem do dataset voltou vazia ou com páginas que nem os CSVs completaram."""
+
+
+def refresh_dataset(nome, ttl, backend=cache):
+    """
+    Obtém a versão atualizada de um dataset, garantindo que apenas um nó faça a
+    raspagem por vez. Os demais nós aguardam a trava e reaproveitam o resultado
+    publicado no cache compartilhado.
+
+    :param nome: Nome do dataset.
+    :param ttl: Validade, em segundos, do dataset publicado no cache.
+    :param backend: Backend de cache compartilhado.
+    :return: Tabela Arrow com o dataset completo.
+    :raises IncompleteDataset: Se os dados vierem vazios ou com células faltando;
+        nesse caso nada é gravado no cache compartilhado.
+    """
+    key = make_key('dataset', nome)
+    content = backend.get(key)
+    if content is not None:
+        print(f'Dataset {nome} reaproveitado do cache compartilhado')
+        return deserialize_arrow_ipc(content)
+
+    with backend.lock(make_key('refresh', nome), ttl=REFRESH_LOCK_TTL, blocking_timeout=REFRESH_LOCK_TTL) as lock:
+        if not lock.acquired:
+            raise TimeoutError(f'Trava de atualização do dataset {nome} não foi liberada')
+        # Outro nó pode ter concluído a atualização enquanto aguardávamos a trava
+        content = backend.get(key)
+        if content is not None:
+            print(f'Dataset {nome} atualizado por outro nó')
+            return deserialize_arrow_ipc(content)
+
+        dataset = DATASETS[nome]
+        print(f'Atualizando o dataset {nome}')
+        inicio = time.perf_counter()
+        dados = get_data_from_source(dataset['scraper'], dataset['ano_inicial'], dataset['ano_final'])
+        faltando = dados.attrs.get(CELULAS_FALHAS_ATTR, [])
+        if dados.empty or faltando:
+            motivo = f'{len(faltando)} página(s) sem dados no site nem nos CSVs' if faltando else 'nenhuma linha obtida'
+            raise IncompleteDataset(f'Dataset {nome} incompleto: {motivo}')
+        tabela = to_arrow_table(dados)
+        backend.set(key, serialize_arrow_ipc(tabela), ttl=ttl)
+        print(f'Dataset {nome}: {tabela.num_rows} linhas em {time.perf_counter() - inicio:.1f}s')
+        return tabela
+
+
+def refresh_rollups(nome, tabela, store=shared_store):
+    """
+    Atualiza as consolidações de um dataset a partir das publicadas na versão
+    atual, recalculando apenas os anos alterados.
+
+    :param nome: Nome do dataset.
+    :param tabela: Tabela Arrow com a nova versão do dataset.
+    :param store: Repositório compartilhado com a versão atual.
+    :return: Dicionário nome da consolidação -> tabela Arrow.
+    """
+    with stage_timer('rollups', nome):
+        rollups, alterados = update_rollups(tabela, store.get_table(nome), store.get_rollups(nome, ROLLUPS))
+    if alterados is None:
+        print(f'Consolidações do dataset {nome} calculadas por completo')
+    else:
+        print(f'Consolidações do dataset {nome}: {len(alterados)} ano(s) recalculado(s)')
+    return rollups
+
+
+def record_changes(tabelas, store=shared_store):
+    """
+    Calcula as alterações linha a linha dos datasets atualizados em relação à
+    versão atual. Datasets ainda não publicados entram como inclusões.
+
+    :param tabelas: Dicionário nome do dataset -> tabela Arrow da nova versão.
+    :param store: Repositório compartilhado com a versão atual.
+    :return: Tabela Arrow com as alterações de todos os datasets.
+    """
+    alteracoes = []
+    for nome, tabela in tabelas.items():
+        with stage_timer('changes', nome):
+            alteracoes.append(diff_tables(nome, store.get_table(nome), tabela))
+        print(f'Alterações do dataset {nome}: {alteracoes[-1].num_rows} linha(s)')
+    return pa.concat_tables(alteracoes) if alteracoes else changes_schema().empty_table()
+
+
+def refresh_datasets(nomes=None, store=shared_store, ttl=DEFAULT_INTERVAL, backend=cache):
+    """
+    Atualiza os datasets informados e publica uma nova versão de forma atômica.
+
+    Um dataset cuja raspagem voltou vazia ou incompleta não é publicado: a nova
+    versão mantém o dele da versão anterior, para que o registro de alterações
+    não acuse exclusões que não aconteceram.
+
+    :param nomes: Lista de nomes de datasets a atualizar. Padrão: todos.
+    :param store: Repositório compartilhado de destino.
+    :param ttl: Validade, em segundos, dos datasets publicados no cache compartilhado.
+    :param backend: Backend de cache compartilhado.
+    :return: Número da versão publicada ou a versão atual se nenhum dataset foi atualizado.
+    """
+    tabelas = {}
+    for nome in nomes or DATASETS:
+        try:
+            tabelas[nome] = refresh_dataset(nome, ttl, backend)
+        except IncompleteDataset as e:
+            print(f'{str(e)}; mantida a versão anterior do dataset')
+    if not tabelas:
+        print('Nenhum dataset atualizado; nenhuma versão publicada')
+        return store.current_version()
+    rollups = {nome: refresh_rollups(nome, tabela, store) for nome, tabela in tabelas.items()}
+    version = store.publish(tabelas, rollups, record_changes(tabelas, store))
+    print(f'Versão {version} publicada em {store.root}')
+    prepare_exports(version, store)
+    return version
+
+
+def prepare_exports(version, store=shared_store):
+    """
+    Monta os pacotes de exportação de uma versão recém-publicada. Uma falha não
+    desfaz a publicação: o pacote é montado no primeiro download.
+
+    :param version: Número da versão publicada.
+    :param store: Repositório compartilhado.
+    """
+    try:
+        with stage_timer('export'):
+            build_exports(store, version)
+    except Exception as e:
+        print(f'Falha ao montar os pacotes de exportação da versão {version}: {str(e)}')
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando do processo de atualização.
+
+    :param argv: Argumentos da linha de comando.
+    """
+    parser = argparse.ArgumentParser(description='Atualiza os datasets compartilhados da API.')
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), help='Datasets a atualizar (padrão: todos)')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help='Intervalo entre atualizações, em segundos')
+    parser.add_argument('--once', action='store_true', help='Executa uma única atualização e termina')
+    parser.add_argument('--rate', type=float, help='Requisições por segundo ao site durante a atualização')
+    args = parser.parse_args(argv)
+
+    if args.rate is not None:
+        limiter.rate = args.rate
+
+    while True:
+        try:
+            # A atualização cede a vez às requisições interativas no limitador do site
+            # A validade no cache termina antes do próximo ciclo para forçar a nova raspagem
+            with upstream_priority(PRIORIDADE_BACKGROUND):
+                refresh_datasets(args.datasets, ttl=max(args.interval - 60, 60))
+        except Exception as e:
+            print(f'Falha na atualização: {str(e)}')
+            if args.once:
+                raise
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+from typing import List
+
+from fastapi import APIRouter, Query, Depends, HTTPException, status
+
+from app.auth import get_current_user
+from app.routes.routes import FORMATO_DESCRICAO, dataset_config, derived_response, get_data, is_stale
+from app.utils_data.aggregation import aggregate, top_n
+from app.utils_data.rollups import ROLLUPS, available_rollups, compute_rollups
+from app.utils_data.shared_store import shared_store
+
+router = APIRouter()
+
+DIMENSOES_DESCRICAO = "Colunas de agrupamento: Ano, Países, Produto, Cultivar, Classificação ou Botao (conforme o dataset)"
+METRICA_DESCRICAO = "Métrica: Quantidade ou Valor (US$) (também aceita 'valor')"
+
+
+def load_table(config, start_year, end_year, botao_opcao):
+    """
+    Obtém a tabela do dataset no intervalo de anos e botão informados, com os
+    anos ausentes assumindo o intervalo completo do dataset.
+
+    :param config: Configuração do dataset (DATASETS).
+    :param start_year: Ano de início ou None.
+    :param end_year: Ano de término ou None.
+    :param botao_opcao: Opção de botão ou None.
+    :return: Tupla (tabela Arrow, True se os dados estiverem vencidos).
+    """
+    tabela = get_data(
+        config['scraper'],
+        config['ano_inicial'] if start_year is None else start_year,
+        config['ano_final'] if end_year is None else end_year,
+        config['botoes'].get(botao_opcao),
+    )
+    return tabela, is_stale(tabela)
+
+
+@router.get("/agregacao/{dataset}",
+        tags=["Agregações"],
+        summary='Agregar dados de um dataset',
+        description='Soma, média e contagem de Quantidade ou Valor (US$) agrupadas pelas colunas informadas')
+async def get_aggregation(
+    dataset: str,
+    group_by: List[str] = Query(..., description=DIMENSOES_DESCRICAO),
+    metric: str = Query("Quantidade", description=METRICA_DESCRICAO),
+    agg: List[str] = Query(["sum"], description="Funções de agregação: sum, mean e/ou count"),
+    start_year: int = None,
+    end_year: int = None,
+    botao_opcao: str = Query(None, description="Opção do botão, nos datasets com botões"),
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Endpoint para agregar os dados de um dataset no servidor.
+
+    As linhas de total e de subtotal por classificação são descartadas antes da
+    agregação, para que cada valor seja contado uma única vez.
+
+    :param dataset: Nome do dataset.
+    :param group_by: Colunas de agrupamento.
+    :param metric: Coluna agregada.
+    :param agg: Funções de agregação.
+    :param start_year: Ano de início (padrão: primeiro ano do dataset).
+    :param end_year: Ano de término (padrão: último ano do dataset).
+    :param botao_opcao: Opção de filtro por botão.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param current_user: Usuário atual autenticado.
+    :return: Lista de grupos com os valores agregados (ou arquivo Arrow/Parquet).
+    """
+    config = dataset_config(dataset, current_user)
+
+    def calcular():
+        tabela, stale = load_table(config, start_year, end_year, botao_opcao)
+        return aggregate(tabela, group_by, metric, agg), stale
+
+    partes = (dataset, start_year, end_year, botao_opcao or '-', ','.join(group_by), metric, ','.join(agg))
+    return await derived_response(f'{dataset}_agregacao', partes, calcular, formato)
+
+
+@router.get("/agregacao/{dataset}/top",
+        tags=["Agregações"],
+        summary='Maiores grupos de um dataset',
+        description='Os N grupos (ex.: países ou produtos) com a maior soma de Quantidade ou Valor (US$)')
+async def get_top(
+    dataset: str,
+    group_by: str = Query(..., description=DIMENSOES_DESCRICAO),
+    metric: str = Query("Quantidade", description=METRICA_DESCRICAO),
+    n: int = Query(10, ge=1, le=1000, description="Quantidade de grupos"),
+    start_year: int = None,
+    end_year: int = None,
+    botao_opcao: str = Query(None, description="Opção do botão, nos datasets com botões"),
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Endpoint para obter os N grupos com a maior soma da métrica.
+
+    :param dataset: Nome do dataset.
+    :param group_by: Coluna de agrupamento.
+    :param metric: Coluna usada na ordenação.
+    :param n: Quantidade de grupos.
+    :param start_year: Ano de início (padrão: primeiro ano do dataset).
+    :param end_year: Ano de término (padrão: último ano do dataset).
+    :param botao_opcao: Opção de filtro por botão.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param current_user: Usuário atual autenticado.
+    :return: Lista dos grupos em ordem decrescente (ou arquivo Arrow/Parquet).
+    """
+    config = dataset_config(dataset, current_user)
+
+    def calcular():
+        tabela, stale = load_table(config, start_year, end_year, botao_opcao)
+        return top_n(tabela, group_by, metric, n), stale
+
+    partes = (dataset, start_year, end_year, botao_opcao or '-', group_by, metric, n)
+    return await derived_response(f'{dataset}_top', partes, calcular, formato)
+
+
+@router.get("/agregacao/{dataset}/rollup/{rollup}",
+        tags=["Agregações"],
+        summary='Consolidações pré-calculadas de um dataset',
+        description='Totais por ano (anual), por país e ano (paises_ano) e por país (paises), com o preço médio em US$/kg na importação e exportação')
+async def get_rollup(
+    dataset: str,
+    rollup: str,
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Endpoint para obter uma consolidação do dataset.
+
+    As consolidações são calculadas pelo processo de atualização e publicadas junto
+    com cada versão dos datasets, então a resposta é só a leitura da tabela já
+    pronta. Sem versão publicada, a consolidação é calculada sobre o histórico completo.
+
+    :param dataset: Nome do dataset.
+    :param rollup: Nome da consolidação (anual, paises_ano ou paises).
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param current_user: Usuário atual autenticado.
+    :return: Lista de registros da consolidação (ou arquivo Arrow/Parquet).
+    :raises HTTPException: Se a consolidação não existir para o dataset.
+    """
+    config = dataset_config(dataset, current_user)
+    if rollup not in ROLLUPS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Consolidação não encontrada: escolha entre {', '.join(ROLLUPS)}"
+        )
+
+    def calcular():
+        tabela = shared_store.get_rollup(dataset, rollup)
+        if tabela is not None:
+            return tabela, False
+        dados, stale = load_table(config, None, None, None)
+        if rollup not in available_rollups(dados):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Consolidação não disponível para o dataset: escolha entre {', '.join(available_rollups(dados))}"
+            )
+        return compute_rollups(dados)[rollup], stale
+
+    return await derived_response(f'{dataset}_{rollup}', (dataset, rollup), calcular, formato)
@@ -0,0 +1,157 @@
+import threading
+
+from fastapi import APIRouter, Query, Depends, HTTPException, status
+
+from app.auth import get_current_user
+from app.routes.routes import FORMATO_DESCRICAO, dataset_config, derived_response
+from app.routes.aggregation import METRICA_DESCRICAO, load_table
+from app.utils_data.analytics import series_analytics
+from app.utils_data.shared_store import shared_store
+from app.utils_data.singleflight import SingleFlight
+from app.utils_data.trade import trade_totals, filter_trade, trade_balance
+
+router = APIRouter()
+
+# Totais de importação e exportação indexados por (Países, Ano, Botao), por versão publicada
+_trade_frames = {}
+_trade_lock = threading.Lock()
+# Indexações em andamento, para que requisições simultâneas ocupem uma única vaga de admissão
+_trade_builds = SingleFlight()
+
+
+def trade_frame(nome, config, start_year, end_year):
+    """
+    Obtém os totais indexados de importação ou exportação no intervalo de anos.
+
+    Com uma versão publicada, o dataset completo é indexado uma única vez por
+    versão e cada requisição só filtra os anos; sem versão publicada, os dados do
+    intervalo são obtidos e indexados a cada requisição.
+
+    :param nome: Nome do dataset ('importacao' ou 'exportacao').
+    :param config: Configuração do dataset (DATASETS).
+    :param start_year: Ano de início.
+    :param end_year: Ano de término.
+    :return: Tupla (totais indexados, True se os dados estiverem vencidos).
+    """
+    version = shared_store.current_version()
+    if version is None:
+        tabela, stale = load_table(config, start_year, end_year, None)
+        return trade_totals(tabela), stale
+
+    totais = _trade_frames.get((version, nome))
+    if totais is None:
+        totais, _ = _trade_builds.do((version, nome), index_trade, version, nome)
+    return filter_trade(totais, start_year, end_year), False
+
+
+def index_trade(version, nome):
+    """
+    Indexa os totais do dataset completo de uma versão publicada e os guarda em
+    memória, descartando os índices das versões anteriores. A tabela é lida da
+    própria versão, mesmo que outra tenha sido publicada durante a indexação.
+
+    :param version: Número da versão publicada.
+    :param nome: Nome do dataset ('importacao' ou 'exportacao').
+    :return: Totais indexados.
+    :raises HTTPException: Se a versão for descartada antes da leitura (503).
+    """
+    tabela = shared_store.get_table(nome, version)
+    if tabela is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Versão {version} descartada durante a consulta, tente novamente"
+        )
+    totais = trade_totals(tabela)
+    with _trade_lock:
+        for chave in [chave for chave in _trade_frames if chave[0] != version]:
+            del _trade_frames[chave]
+        _trade_frames[(version, nome)] = totais
+    return totais
+
+
+@router.get("/analise/{dataset}",
+        tags=["Análises"],
+        summary='Séries temporais de um dataset',
+        description='Variação anual, média móvel e total acumulado de cada série (produto, cultivar ou país) ano a ano')
+async def get_series_analytics(
+    dataset: str,
+    serie: str = Query(..., description="Coluna das séries: Produto, Cultivar, Países, Classificação ou Botao (conforme o dataset)"),
+    metric: str = Query("Quantidade", description=METRICA_DESCRICAO),
+    window: int = Query(3, ge=1, le=50, description="Anos da média móvel"),
+    start_year: int = None,
+    end_year: int = None,
+    botao_opcao: str = Query(None, description="Opção do botão, nos datasets com botões"),
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Endpoint para obter as séries temporais de um dataset com a variação anual,
+    a média móvel e o total acumulado da métrica.
+
+    Todas as séries são calculadas de uma só vez, sobre a matriz séries x anos.
+    A variação anual é relativa (0.1 = 10%) e fica nula no primeiro ano e quando
+    o ano anterior é zero; a média móvel fica nula até a janela se completar.
+    Sem resultado em cache, a obtenção dos dados e o cálculo da matriz rodam fora
+    do event loop e passam pelo controle de admissão (429/503 com Retry-After).
+
+    :param dataset: Nome do dataset.
+    :param serie: Coluna que identifica as séries.
+    :param metric: Coluna da métrica.
+    :param window: Quantidade de anos da média móvel.
+    :param start_year: Ano de início (padrão: primeiro ano do dataset).
+    :param end_year: Ano de término (padrão: último ano do dataset).
+    :param botao_opcao: Opção de filtro por botão.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param current_user: Usuário atual autenticado.
+    :return: Lista com uma linha por série e ano (ou arquivo Arrow/Parquet).
+    """
+    config = dataset_config(dataset, current_user)
+
+    def calcular():
+        tabela, stale = load_table(config, start_year, end_year, botao_opcao)
+        return series_analytics(tabela, serie, metric, window), stale
+
+    partes = (dataset, start_year, end_year, botao_opcao or '-', serie, metric, window)
+    return await derived_response(f'{dataset}_analise', partes, calcular, formato)
+
+
+@router.get("/balanca-comercial",
+        tags=["Análises"],
+        summary='Balança comercial por país, ano e botão',
+        description='Junta importação e exportação por (Países, Ano, Botao) e retorna o saldo e o valor unitário em US$/kg de cada lado')
+async def get_trade_balance(
+    start_year: int = 1970,
+    end_year: int = 2023,
+    botao_opcao: str = Query(None, description="Opção do botão (VINHOS_DE_MESA, ESPUMANTES, UVAS_FRESCAS, UVAS_PASSAS, SUCO_DE_UVA)"),
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Endpoint para obter a balança comercial de derivados de uva.
+
+    O saldo é exportação menos importação, em quantidade (kg) e em valor (US$).
+    Exige permissão de acesso à importação e à exportação. Sem resultado em cache,
+    a obtenção dos dois datasets e a junção rodam fora do event loop e passam pelo
+    controle de admissão (429/503 com Retry-After).
+
+    :param start_year: Ano de início.
+    :param end_year: Ano de término.
+    :param botao_opcao: Opção de filtro por botão.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param current_user: Usuário atual autenticado.
+    :return: Lista com uma linha por país, ano e botão (ou arquivo Arrow/Parquet).
+    """
+    importacao = dataset_config('importacao', current_user)
+    exportacao = dataset_config('exportacao', current_user)
+    botao = importacao['botoes'].get(botao_opcao) or exportacao['botoes'].get(botao_opcao)
+
+    def calcular():
+        exp, stale_exp = trade_frame('exportacao', exportacao, start_year, end_year)
+        imp, stale_imp = trade_frame('importacao', importacao, start_year, end_year)
+        if botao is not None:
+            exp = filter_trade(exp, start_year, end_year, botao['classificacao_botao'])
+            imp = filter_trade(imp, start_year, end_year, botao['classificacao_botao'])
+        return trade_balance(exp, imp), stale_exp or stale_imp
+
+    partes = (start_year, end_year, botao_opcao if botao else '-')
+    return await derived_response('balanca_comercial', partes, calcular, formato)
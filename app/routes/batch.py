@@ -0,0 +1,254 @@
+import asyncio
+import json
+import os
+from functools import partial
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, Depends, HTTPException, status, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.auth import get_current_user, authorize_user
+from app.routes.routes import FORMATO_DESCRICAO, AS_OF_DESCRICAO, check_format, serialized_data, get_data, is_stale, \
+    missing_from, snapshot_version, snapshot_headers, run_admitted, MISSING_METADATA_KEY
+from app.utils_data.datasets import DATASETS
+from app.utils_data.formats import MEDIA_TYPES, EXTENSOES, concat_tables, serialize
+from app.lazy import lazy_import
+
+pa = lazy_import('pyarrow')
+
+router = APIRouter()
+
+# Quantidade máxima de consultas por lote e quantas delas são resolvidas ao mesmo tempo
+BATCH_MAX_QUERIES = int(os.environ.get('VITIBRASIL_BATCH_MAX_QUERIES', '20'))
+BATCH_CONCURRENCY = int(os.environ.get('VITIBRASIL_BATCH_CONCURRENCY', '4'))
+
+# Erros das consultas do lote, nos metadados da tabela Arrow/Parquet
+BATCH_ERRORS_METADATA_KEY = b'vitibrasil:erros'
+
+
+class BatchQuery(BaseModel):
+    dataset: str
+    start_year: Optional[int] = None
+    end_year: Optional[int] = None
+    botao_opcao: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    consultas: List[BatchQuery]
+
+
+def resolve_query(consulta: BatchQuery, current_user: dict):
+    """
+    Valida uma consulta do lote e verifica a permissão do usuário para o dataset.
+
+    Os anos ausentes assumem o intervalo completo do dataset e, como nos endpoints
+    individuais, uma opção de botão desconhecida consulta todos os botões.
+
+    :param consulta: Consulta do lote.
+    :param current_user: Usuário atual autenticado.
+    :return: Dicionário com o dataset, a classe de raspagem, o intervalo de anos e o botão.
+    :raises HTTPException: Se o dataset não existir ou o usuário não tiver permissão.
+    """
+    config = DATASETS.get(consulta.dataset)
+    if config is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Dataset não suportado: escolha entre {', '.join(DATASETS)}"
+        )
+    authorize_user(current_user, "GET", f"/{consulta.dataset}")
+    return {
+        'dataset': consulta.dataset,
+        'scraper': config['scraper'],
+        'start_year': consulta.start_year if consulta.start_year is not None else config['ano_inicial'],
+        'end_year': consulta.end_year if consulta.end_year is not None else config['ano_final'],
+        'botao_opcao': consulta.botao_opcao,
+        'botao': config['botoes'].get(consulta.botao_opcao),
+    }
+
+
+def describe_error(e: Exception):
+    """
+    Descreve o erro de uma consulta do lote no formato das respostas de erro da API.
+
+    :param e: Exceção levantada pela consulta.
+    :return: Dicionário com o status HTTP e o detalhe do erro.
+    """
+    if isinstance(e, HTTPException):
+        return {'status': e.status_code, 'detail': e.detail}
+    print(f'Erro inesperado na consulta do lote: {e!r}')
+    return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'detail': str(e)}
+
+
+def run_queries(consultas, funcao, *extra):
+    """
+    Dispara as consultas, no máximo BATCH_CONCURRENCY ao mesmo tempo. Consultas
+    idênticas no mesmo lote são resolvidas uma única vez.
+
+    A função é responsável pelo controle de admissão, como nas requisições
+    individuais (ver serialized_data e run_admitted); uma consulta descartada
+    (429/503) vira o erro daquela consulta no lote.
+
+    :param consultas: Consultas validadas por resolve_query.
+    :param funcao: Função assíncrona chamada com (scraper_class, start_year, end_year, botao, *extra).
+    :param extra: Argumentos adicionais da função.
+    :return: Lista de tarefas asyncio, uma por consulta, na ordem do lote.
+    """
+    semaforo = asyncio.Semaphore(BATCH_CONCURRENCY)
+    tarefas = {}
+
+    async def executar(consulta):
+        args = (consulta['scraper'], consulta['start_year'], consulta['end_year'], consulta['botao'], *extra)
+        async with semaforo:
+            return await funcao(*args)
+
+    resultado = []
+    for consulta in consultas:
+        chave = (consulta['dataset'], consulta['start_year'], consulta['end_year'],
+                 consulta['botao']['value'] if consulta['botao'] else '-')
+        if chave not in tarefas:
+            tarefas[chave] = asyncio.ensure_future(executar(consulta))
+        resultado.append(tarefas[chave])
+    return resultado
+
+
+def describe_query(indice, consulta):
+    """
+    Identifica uma consulta do lote na resposta.
+
+    :param indice: Índice da consulta no lote.
+    :param consulta: Consulta validada por resolve_query.
+    :return: Dicionário com o índice, o dataset, o intervalo de anos e a opção de botão.
+    """
+    return {
+        'consulta': indice,
+        'dataset': consulta['dataset'],
+        'start_year': consulta['start_year'],
+        'end_year': consulta['end_year'],
+        'botao_opcao': consulta['botao_opcao'],
+    }
+
+
+async def stream_json(consultas, tarefas):
+    """
+    Gera o documento JSON do lote à medida que as consultas terminam. Cada item de
+    'resultados' traz o índice da consulta no lote e os dados (reaproveitando a
+    resposta serializada do cache) ou o erro da consulta.
+
+    :param consultas: Consultas validadas por resolve_query.
+    :param tarefas: Tarefas das consultas, na ordem do lote.
+    :return: Gerador assíncrono de blocos de bytes.
+    """
+    async def aguardar(indice):
+        try:
+            return indice, await tarefas[indice], None
+        except Exception as e:
+            return indice, None, e
+
+    pendentes = [asyncio.ensure_future(aguardar(indice)) for indice in range(len(consultas))]
+    try:
+        yield b'{"resultados": ['
+        for ordem, proxima in enumerate(asyncio.as_completed(pendentes)):
+            indice, resultado, erro = await proxima
+            item = describe_query(indice, consultas[indice])
+            if erro is not None:
+                item['erro'] = describe_error(erro)
+                corpo = json.dumps(item, ensure_ascii=False).encode('utf-8')
+            else:
+                content, stale, faltando = resultado
+                item['vencido'] = stale
+                if faltando:
+                    item['celulas_faltando'] = faltando
+                corpo = json.dumps(item, ensure_ascii=False).encode('utf-8')[:-1] + b', "dados": ' + content + b'}'
+            yield (b', ' if ordem else b'') + corpo
+        yield b']}'
+    finally:
+        for tarefa in [*pendentes, *tarefas]:
+            tarefa.cancel()
+
+
+async def combined_table(consultas, tarefas):
+    """
+    Combina as tabelas das consultas em uma única tabela Arrow, com as colunas
+    'Dataset' e 'Consulta' (índice no lote). Os erros das consultas ficam nos
+    metadados da tabela, em BATCH_ERRORS_METADATA_KEY, e as células ausentes de
+    cada consulta em MISSING_METADATA_KEY.
+
+    :param consultas: Consultas validadas por resolve_query.
+    :param tarefas: Tarefas get_data das consultas, na ordem do lote.
+    :return: Tupla (tabela Arrow combinada, True se alguma consulta veio do cache vencido).
+    """
+    tabelas = []
+    erros = []
+    ausentes = []
+    stale = False
+    for indice, (consulta, resultado) in enumerate(zip(consultas, await asyncio.gather(*tarefas, return_exceptions=True))):
+        if isinstance(resultado, Exception):
+            erros.append({**describe_query(indice, consulta), 'erro': describe_error(resultado)})
+            continue
+        stale = stale or is_stale(resultado)
+        faltando = missing_from(resultado)
+        if faltando:
+            ausentes.append({**describe_query(indice, consulta), 'celulas_faltando': faltando})
+        tabela = resultado.replace_schema_metadata(None)
+        tabela = tabela.append_column('Dataset', pa.array([consulta['dataset']] * tabela.num_rows, pa.string()))
+        tabela = tabela.append_column('Consulta', pa.array([indice] * tabela.num_rows, pa.int32()))
+        tabelas.append(tabela)
+    if not tabelas:
+        raise HTTPException(status_code=erros[0]['erro']['status'], detail=erros[0]['erro']['detail'])
+    tabela = concat_tables(tabelas)
+    metadata = {}
+    if erros:
+        metadata[BATCH_ERRORS_METADATA_KEY] = json.dumps(erros, ensure_ascii=False)
+    if ausentes:
+        metadata[MISSING_METADATA_KEY] = json.dumps(ausentes, ensure_ascii=False)
+    if metadata:
+        tabela = tabela.replace_schema_metadata(metadata)
+    return tabela, stale
+
+
+@router.post("/batch",
+        tags=["Consultas em lote"],
+        summary='Obter dados de vários datasets em uma requisição',
+        description='Resolve várias consultas (dataset, intervalo de anos, botão) de forma concorrente e retorna uma única resposta')
+async def get_batch_data(
+    pedido: BatchRequest,
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    as_of: str = Query(None, description=AS_OF_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Endpoint para obter dados de várias consultas em uma única requisição.
+
+    As consultas são resolvidas em paralelo por get_data e compartilham as
+    requisições ao site: páginas idênticas são baixadas uma única vez. Em JSON,
+    a resposta é transmitida à medida que cada consulta termina; em Arrow e
+    Parquet, as tabelas são combinadas com as colunas 'Dataset' e 'Consulta'.
+
+    :param pedido: Lista de consultas do lote.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param as_of: Versão publicada consultada por todo o lote (padrão: versão atual).
+    :param current_user: Usuário atual autenticado.
+    :return: Documento JSON transmitido ou arquivo Arrow/Parquet com os dados de todas as consultas.
+    :raises HTTPException: Se o lote for vazio ou grande demais, ou se alguma consulta for inválida.
+    """
+    check_format(formato)
+    if not pedido.consultas or len(pedido.consultas) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"O lote deve ter entre 1 e {BATCH_MAX_QUERIES} consultas"
+        )
+    consultas = [resolve_query(consulta, current_user) for consulta in pedido.consultas]
+    version = snapshot_version(as_of)
+
+    if formato == 'json':
+        tarefas = run_queries(consultas, serialized_data, formato, version)
+        return StreamingResponse(stream_json(consultas, tarefas), media_type=MEDIA_TYPES[formato],
+                                 headers=snapshot_headers(version))
+
+    tabela, stale = await combined_table(consultas, run_queries(consultas, partial(run_admitted, get_data), version))
+    content, _, _ = await asyncio.to_thread(serialize, tabela, formato)
+    headers = {**snapshot_headers(version), "Content-Disposition": f'attachment; filename="batch.{EXTENSOES[formato]}"'}
+    if stale:
+        headers["Warning"] = '110 - "Response is Stale"'
+    return Response(content=content, media_type=MEDIA_TYPES[formato], headers=headers)
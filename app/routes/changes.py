@@ -0,0 +1,99 @@
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, Query, Depends, HTTPException, status, Response
+
+from app.auth import get_current_user, is_authorized
+from app.routes.routes import FORMATO_DESCRICAO, VERSION_HEADER, check_format, dataset_config
+from app.utils_data.changes import changes_since
+from app.utils_data.datasets import DATASETS
+from app.utils_data.formats import MEDIA_TYPES, EXTENSOES, serialize
+from app.utils_data.shared_store import shared_store
+
+router = APIRouter()
+
+
+@router.get("/changes",
+        tags=["Alterações"],
+        summary='Alterações desde uma versão',
+        description='Linhas incluídas, alteradas e excluídas em cada atualização dos datasets, a partir da versão informada')
+async def get_changes(
+    since: int = Query(..., ge=0, description="Última versão já sincronizada (0 para a carga inicial)"),
+    dataset: List[str] = Query(None, description="Datasets incluídos (padrão: todos os permitidos ao usuário)"),
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Endpoint do registro de alterações para sincronização incremental.
+
+    Cada atualização registra, em relação à versão anterior, as linhas incluídas
+    ('insert'), alteradas ('update', com os valores anteriores) e excluídas
+    ('delete'), pela chave (Dataset, Botao, Ano, Classificação, Entidade,
+    Ocorrencia). A coluna 'Fonte' não é comparada. O cabeçalho
+    X-Vitibrasil-Version traz a versão atual, usada como `since` na próxima chamada.
+
+    :param since: Última versão já sincronizada pelo cliente.
+    :param dataset: Datasets incluídos.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param current_user: Usuário atual autenticado.
+    :return: Lista de alterações com a versão de cada uma (ou arquivo Arrow/Parquet).
+    :raises HTTPException: Se não houver versão publicada, se `since` for posterior
+        à versão atual ou se alguma versão do intervalo já tiver sido descartada.
+    """
+    check_format(formato)
+    if dataset:
+        nomes = list(dict.fromkeys(dataset))
+        for nome in nomes:
+            dataset_config(nome, current_user)
+    else:
+        nomes = [nome for nome in DATASETS if is_authorized(current_user, "GET", f"/{nome}")]
+
+    atual = shared_store.current_version()
+    if atual is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma versão dos datasets foi publicada")
+    if since > atual:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Versão {since} posterior à versão atual ({atual})"
+        )
+    # Clientes atrasados podem juntar muitas versões: a leitura sai do event loop
+    alteracoes = await asyncio.to_thread(changes_since, shared_store, since, nomes, atual)
+    if alteracoes is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"As alterações desde a versão {since} não estão mais disponíveis: recarregue os datasets completos (versão atual {atual})",
+            headers={VERSION_HEADER: str(atual)},
+        )
+
+    content, _, _ = await asyncio.to_thread(serialize, alteracoes, formato)
+    headers = {VERSION_HEADER: str(atual)}
+    if formato != 'json':
+        headers["Content-Disposition"] = f'attachment; filename="changes.{EXTENSOES[formato]}"'
+    return Response(content=content, media_type=MEDIA_TYPES[formato], headers=headers)
+
+
+@router.get("/snapshots",
+        tags=["Alterações"],
+        summary='Versões publicadas mantidas',
+        description='Versões dos datasets disponíveis para consulta com o parâmetro as_of')
+async def get_snapshots(current_user: dict = Depends(get_current_user)):
+    """
+    Endpoint para listar as versões publicadas ainda mantidas em disco.
+
+    Cada versão traz o número, o identificador do conteúdo (SHA-256 dos
+    manifestos dos datasets; versões com o mesmo conteúdo têm o mesmo
+    identificador), a data de publicação e os datasets publicados. Qualquer
+    uma delas pode ser consultada nos endpoints de dados com `as_of`.
+
+    :param current_user: Usuário atual autenticado.
+    :return: Lista de versões, da mais antiga para a mais recente.
+    """
+    return [
+        {
+            'versao': snapshot['versao'],
+            'id': snapshot['id'],
+            'publicado_em': snapshot['publicado_em'],
+            'datasets': [nome for nome in snapshot['datasets'] if is_authorized(current_user, "GET", f"/{nome}")],
+        }
+        for snapshot in shared_store.snapshots()
+    ]
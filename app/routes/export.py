@@ -0,0 +1,128 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, Query, Depends, HTTPException, Request, status, Response
+from fastapi.responses import StreamingResponse
+
+from app.auth import get_current_user, authorize_user
+from app.routes.routes import AS_OF_DESCRICAO, snapshot_version, snapshot_headers
+from app.utils_data.datasets import DATASETS
+from app.utils_data.export import FORMATOS_EXPORTACAO, build_archive
+from app.utils_data.shared_store import shared_store
+
+router = APIRouter()
+
+# Tamanho dos blocos lidos do disco durante o envio do pacote
+EXPORT_CHUNK_SIZE = int(os.environ.get('VITIBRASIL_EXPORT_CHUNK_SIZE', str(1024 * 1024)))
+
+
+def parse_range(header, tamanho):
+    """
+    Interpreta o cabeçalho Range de um único intervalo de bytes ('bytes=inicio-fim',
+    'bytes=inicio-' ou 'bytes=-sufixo'). Vários intervalos ou valores que não
+    puderem ser interpretados são ignorados e o arquivo é enviado por inteiro.
+
+    :param header: Valor do cabeçalho Range ou None.
+    :param tamanho: Tamanho do arquivo em bytes.
+    :return: Tupla (primeiro byte, último byte) ou None para o arquivo inteiro.
+    :raises HTTPException: Se o intervalo estiver fora do arquivo (416).
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    inicio, _, fim = header[len('bytes='):].strip().partition('-')
+    try:
+        if inicio:
+            inicio, fim = int(inicio), int(fim) if fim else tamanho - 1
+        else:
+            sufixo = int(fim)
+            inicio, fim = (max(tamanho - sufixo, 0), tamanho - 1) if sufixo else (tamanho, tamanho)
+    except ValueError:
+        return None
+    if inicio >= tamanho or fim < inicio:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Intervalo fora do arquivo",
+            headers={"Content-Range": f"bytes */{tamanho}"},
+        )
+    return inicio, min(fim, tamanho - 1)
+
+
+def read_file(path, inicio, quantidade):
+    """
+    Lê um trecho do arquivo em blocos de EXPORT_CHUNK_SIZE.
+
+    :param path: Caminho do arquivo.
+    :param inicio: Primeiro byte.
+    :param quantidade: Quantidade de bytes.
+    :return: Gerador de blocos de bytes.
+    """
+    with open(path, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        while quantidade > 0:
+            bloco = arquivo.read(min(EXPORT_CHUNK_SIZE, quantidade))
+            if not bloco:
+                break
+            quantidade -= len(bloco)
+            yield bloco
+
+
+@router.get("/export",
+        tags=["Exportação completa"],
+        summary='Baixar todos os datasets',
+        description='Pacote ZIP com todos os datasets de uma versão publicada, em CSV ou Parquet, com suporte a downloads parciais (Range)')
+async def get_export(
+    request: Request,
+    formato: str = Query("parquet", alias="format", description="Formato dos datasets no pacote: parquet (padrão) ou csv"),
+    as_of: str = Query(None, description=AS_OF_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Endpoint para baixar todos os datasets de uma versão em um único pacote ZIP.
+
+    O pacote é montado uma única vez por versão (o processo de atualização já o
+    deixa pronto) e enviado direto do disco, então cada download custa quase nada
+    de CPU. Com o cabeçalho Range, apenas o trecho solicitado é enviado (206),
+    o que permite retomar downloads interrompidos; If-Range com o ETag garante
+    que o trecho seja da mesma versão.
+
+    :param request: Requisição, para os cabeçalhos Range, If-Range e If-None-Match.
+    :param formato: Formato dos datasets no pacote (csv ou parquet).
+    :param as_of: Versão publicada a exportar (padrão: versão atual).
+    :param current_user: Usuário atual autenticado.
+    :return: Pacote ZIP (200), trecho do pacote (206) ou 304 se o ETag não mudou.
+    :raises HTTPException: Se o formato for inválido, se não houver versão
+        publicada ou se o usuário não tiver acesso a todos os datasets.
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato não suportado: escolha entre {', '.join(FORMATOS_EXPORTACAO)}"
+        )
+    for nome in DATASETS:
+        authorize_user(current_user, "GET", f"/{nome}")
+    version = snapshot_version(as_of) or shared_store.current_version()
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma versão dos datasets foi publicada")
+
+    path = await asyncio.to_thread(build_archive, shared_store, version, formato)
+    tamanho = os.path.getsize(path)
+    headers = {
+        **snapshot_headers(version),
+        "ETag": f'"{os.path.basename(path)[:-len(".zip")]}"',
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="vitibrasil-v{version}-{formato}.zip"',
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    intervalo = None
+    if request.headers.get("if-range") in (None, headers["ETag"]):
+        intervalo = parse_range(request.headers.get("range"), tamanho)
+    if intervalo is None:
+        inicio, fim, codigo = 0, tamanho - 1, status.HTTP_200_OK
+    else:
+        (inicio, fim), codigo = intervalo, status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {inicio}-{fim}/{tamanho}"
+    headers["Content-Length"] = str(fim - inicio + 1)
+    return StreamingResponse(read_file(path, inicio, fim - inicio + 1), status_code=codigo,
+                             media_type="application/zip", headers=headers)
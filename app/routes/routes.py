@@ -1,56 +1,543 @@
-from fastapi import APIRouter, Query, Depends, HTTPException, status
+import asyncio
+import json
+
+from fastapi import APIRouter, Query, Depends, HTTPException, status, Response
 from app.auth import get_current_user, authorize_user
 from requests.exceptions import ConnectionError, RequestException
-import time
+from datetime import datetime, timedelta, timezone
 
 from app.utils_data.utils import health_check_site 
-from app.utils_data.csv.download_csv import download_and_process_csv
+from app.utils_data.csv.download_csv import download_and_process_csv, csv_urls_for_botoes
+from app.utils_data.formats import FORMATOS_SUPORTADOS, MEDIA_TYPES, EXTENSOES, serialize, to_arrow_table
+from app.metrics import stage_timer
+from app.utils_data.cache import cache, make_key, record_lookup, RESPONSE_TTL
+from app.utils_data.segments import load_segments, store_segments
+from app.utils_data.deadline import deadline_scope, current_deadline, DeadlineExceeded, REQUEST_BUDGET
+from app.utils_data.datasets import DATASETS, dataset_name
+from app.utils_data.shared_store import shared_store, filter_table
+from app.utils_data.admission import admission, Overloaded, MOTIVO_FILA_CHEIA
 
+from app.utils_data.web_scraping.scraping_base import FONTE_CSV
 from app.utils_data.web_scraping.scraping_producao import ProducaoScraper
 from app.utils_data.web_scraping.scraping_processamento import ProcessamentoScraper
 from app.utils_data.web_scraping.scraping_exportacao import ExportacaoScraper
 from app.utils_data.web_scraping.scraping_importacao import ImportacaoScraper
 from app.utils_data.web_scraping.scraping_comercializacao import ComercializacaoScraper
 from app.utils_data.constants import opcoes_botoes_exportacao, opcoes_botoes_processamento, opcoes_botoes_importacao
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 router = APIRouter()
 
-def get_data(scraper_class, start_year: int, end_year: int, botao=None):
+FORMATO_DESCRICAO = "Formato da resposta: json (padrão), arrow (Arrow IPC stream) ou parquet"
+AS_OF_DESCRICAO = "Versão publicada a consultar: número da versão, identificador do conteúdo ou data (ISO 8601) (padrão: versão atual)"
+
+# Respostas dos endpoints de dados na documentação OpenAPI: o corpo já serializado em um dos formatos
+DATASET_RESPONSES = {
+    200: {
+        "description": "Dados no formato solicitado: lista de registros (json), Arrow IPC stream (arrow) ou Parquet",
+        "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+    },
+}
+
+# Cabeçalhos com a versão e o identificador do conteúdo dos dados servidos
+VERSION_HEADER = "X-Vitibrasil-Version"
+SNAPSHOT_HEADER = "X-Vitibrasil-Snapshot"
+
+# Marca, nos metadados da tabela, os dados servidos do cache vencido após o prazo se esgotar
+STALE_METADATA_KEY = b'vitibrasil:stale'
+# Células (ano, botão) que falharam no site e não foram completadas pelos CSVs, em DataFrame.attrs
+CELULAS_FALHAS_ATTR = 'celulas_falhas'
+# Células (ano, botão) ausentes na resposta, nos metadados da tabela Arrow/Parquet e no cabeçalho (JSON)
+MISSING_METADATA_KEY = b'vitibrasil:celulas_faltando'
+MISSING_HEADER = "X-Vitibrasil-Missing-Cells"
+
+
+async def dataset_response(scraper_class, start_year: int, end_year: int, botao, formato: str, as_of: str = None):
+    """
+    Monta a resposta de um endpoint de dados no formato solicitado, reaproveitando
+    a resposta serializada do cache quando disponível.
+
+    Sem resposta em cache, os dados são obtidos fora do event loop e sob o controle
+    de admissão (app/utils_data/admission.py), para que uma rajada de requisições
+    sem cache não impeça as demais de serem atendidas.
+
+    :param scraper_class: Classe de raspagem do dataset.
+    :param start_year: Ano de início para os dados.
+    :param end_year: Ano de término para os dados.
+    :param botao: Opção de botão para filtrar dados, se aplicável.
+    :param formato: Formato da resposta ('json', 'arrow' ou 'parquet').
+    :param as_of: Versão publicada a consultar (ver snapshot_version) ou None para a atual.
+    :return: Response com o conteúdo serializado.
+    :raises HTTPException: Se o formato não for suportado, se a versão não estiver
+        disponível ou se a requisição for descartada pelo controle de admissão.
+    """
+    check_format(formato)
+    version = snapshot_version(as_of)
+    content, stale, faltando = await serialized_data(scraper_class, start_year, end_year, botao, formato, version)
+    headers = snapshot_headers(version)
+    if stale:
+        headers["Warning"] = '110 - "Response is Stale"'
+    if faltando:
+        headers[MISSING_HEADER] = json.dumps(faltando)
+    if formato != 'json':
+        headers["Content-Disposition"] = f'attachment; filename="{dataset_name(scraper_class)}.{EXTENSOES[formato]}"'
+    return Response(content=content, media_type=MEDIA_TYPES[formato], headers=headers)
+
+
+async def run_admitted(funcao, *args):
+    """
+    Executa uma computação sem resposta em cache em uma thread, depois de
+    conseguir uma vaga no controle de admissão. A vaga fica ocupada até a thread
+    terminar, mesmo que o cliente desconecte antes.
+
+    :param funcao: Função síncrona a executar.
+    :param args: Argumentos da função.
+    :return: Resultado da função.
+    :raises HTTPException: Se a fila estiver cheia (429) ou a espera por uma vaga
+        se esgotar (503), com o cabeçalho Retry-After.
+    """
+    try:
+        return await admission.run(funcao, *args)
+    except Overloaded as e:
+        if e.motivo == MOTIVO_FILA_CHEIA:
+            codigo, detalhe = status.HTTP_429_TOO_MANY_REQUESTS, "Muitas requisições sem cache em andamento, tente novamente"
+        else:
+            codigo, detalhe = status.HTTP_503_SERVICE_UNAVAILABLE, "Tempo de espera por processamento esgotado, tente novamente"
+        raise HTTPException(status_code=codigo, detail=detalhe, headers={"Retry-After": str(e.retry_after)})
+
+
+def snapshot_version(as_of: str):
+    """
+    Resolve a versão publicada solicitada pelo parâmetro `as_of`: o número da
+    versão, o identificador do conteúdo (ou um prefixo com pelo menos 8
+    caracteres) ou uma data ISO 8601. Uma data seleciona a última versão
+    publicada até ela (datas sem horário incluem o dia inteiro, em UTC).
+
+    :param as_of: Valor do parâmetro ou None.
+    :return: Número da versão ou None para a versão atual.
+    :raises HTTPException: Se o valor for inválido (400), se a versão não existir
+        (404) ou se ela já tiver sido descartada (410).
+    """
+    if as_of is None:
+        return None
+    atual = shared_store.current_version()
+    if atual is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma versão dos datasets foi publicada")
+
+    if as_of.isdigit():
+        version = int(as_of)
+        if version > atual or version == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Versão {version} não publicada (versão atual {atual})")
+    else:
+        try:
+            instante = datetime.fromisoformat(as_of)
+        except ValueError:
+            instante = None
+        snapshots = shared_store.snapshots()
+        if instante is not None:
+            if instante.tzinfo is None:
+                instante = instante.replace(tzinfo=timezone.utc)
+            if len(as_of) == 10:
+                instante += timedelta(days=1)
+            anteriores = [s for s in snapshots if datetime.fromisoformat(s['publicado_em']) < instante]
+            if not anteriores:
+                raise HTTPException(status_code=status.HTTP_410_GONE, detail=f"Nenhuma versão mantida foi publicada até {as_of}")
+            version = anteriores[-1]['versao']
+        elif len(as_of) >= 8 and all(c in '0123456789abcdef' for c in as_of.lower()):
+            iguais = [s for s in snapshots if s['id'].startswith(as_of.lower())]
+            if not iguais:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Versão {as_of} não encontrada entre as versões mantidas")
+            version = iguais[-1]['versao']
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="as_of deve ser o número da versão, o identificador do conteúdo ou uma data ISO 8601"
+            )
+
+    if shared_store.snapshot(version) is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"A versão {version} não está mais disponível (versão atual {atual})"
+        )
+    return version
+
+
+def snapshot_headers(version):
+    """
+    Monta os cabeçalhos que identificam a versão consultada por `as_of`.
+
+    :param version: Número da versão ou None para a versão atual.
+    :return: Dicionário de cabeçalhos (vazio para a versão atual).
+    """
+    if version is None:
+        return {}
+    headers = {VERSION_HEADER: str(version)}
+    snapshot = shared_store.snapshot(version)
+    if snapshot is not None:
+        headers[SNAPSHOT_HEADER] = snapshot['id']
+    return headers
+
+
+def check_format(formato: str):
+    """
+    Valida o formato de resposta solicitado.
+
+    :param formato: Formato da resposta.
+    :raises HTTPException: Se o formato não for suportado.
+    """
+    if formato not in FORMATOS_SUPORTADOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato não suportado: escolha entre {', '.join(FORMATOS_SUPORTADOS)}"
+        )
+
+
+def dataset_config(dataset: str, current_user: dict):
+    """
+    Obtém a configuração de um dataset informado pelo nome, verificando a
+    permissão do usuário para o endpoint do dataset.
+
+    :param dataset: Nome do dataset.
+    :param current_user: Usuário atual autenticado.
+    :return: Configuração do dataset (DATASETS).
+    :raises HTTPException: Se o dataset não existir ou o usuário não tiver permissão.
+    """
+    config = DATASETS.get(dataset)
+    if config is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Dataset não encontrado: escolha entre {', '.join(DATASETS)}"
+        )
+    authorize_user(current_user, "GET", f"/{dataset}")
+    return config
+
+
+async def derived_response(nome: str, partes, calcular, formato: str):
+    """
+    Monta a resposta de dados derivados dos datasets (agregações, análises),
+    reaproveitando o resultado serializado do cache da versão atual.
+
+    Sem resultado em cache, o cálculo e a serialização são executados fora do
+    event loop e sob o controle de admissão, como nos endpoints de dados.
+
+    :param nome: Nome do resultado, usado na chave do cache e no nome do arquivo.
+    :param partes: Parâmetros que identificam o resultado na chave do cache.
+    :param calcular: Função sem argumentos que retorna (tabela Arrow, True se os dados estiverem vencidos).
+    :param formato: Formato da resposta ('json', 'arrow' ou 'parquet').
+    :return: Response com o conteúdo serializado.
+    :raises HTTPException: Se o formato ou os parâmetros do cálculo forem inválidos
+        ou se a requisição for descartada pelo controle de admissão.
+    """
+    check_format(formato)
+    key = make_key('derived', nome, shared_store.current_version() or 'live', *partes, formato)
+    headers = {}
+    content, stale = await asyncio.to_thread(cache.get, key), False
+    record_lookup('derivado', content is not None)
+    if content is None:
+        content, stale = await run_admitted(compute_derived, key, nome, calcular, formato)
+    if stale:
+        headers["Warning"] = '110 - "Response is Stale"'
+    if formato != 'json':
+        headers["Content-Disposition"] = f'attachment; filename="{nome}.{EXTENSOES[formato]}"'
+    return Response(content=content, media_type=MEDIA_TYPES[formato], headers=headers)
+
+
+def compute_derived(key, nome: str, calcular, formato: str):
+    """
+    Calcula e serializa dados derivados, gravando o resultado no cache quando os
+    dados não estiverem vencidos.
+
+    :param key: Chave do resultado no cache.
+    :param nome: Nome do resultado, usado nas métricas.
+    :param calcular: Função sem argumentos que retorna (tabela Arrow, True se os dados estiverem vencidos).
+    :param formato: Formato da resposta.
+    :return: Tupla (conteúdo em bytes, True se os dados estiverem vencidos).
+    :raises HTTPException: Se os parâmetros do cálculo forem inválidos.
+    """
+    try:
+        tabela, stale = calcular()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    with stage_timer('serialization', nome):
+        content, _, _ = serialize(tabela, formato)
+    if not stale:
+        cache.set(key, content, ttl=RESPONSE_TTL)
+    return content, stale
+
+
+async def serialized_data(scraper_class, start_year: int, end_year: int, botao, formato: str, version=None):
+    """
+    Obtém os dados serializados no formato solicitado, do cache de respostas
+    quando disponível. A consulta ao cache pode ir à rede (Redis), então sai do
+    event loop, mas não passa pelo controle de admissão: respostas em cache
+    continuam sendo servidas com o servidor sobrecarregado. Sem resposta em cache,
+    os dados são obtidos por compute_data sob o controle de admissão.
+
+    :param scraper_class: Classe de raspagem do dataset.
+    :param start_year: Ano de início para os dados.
+    :param end_year: Ano de término para os dados.
+    :param botao: Opção de botão para filtrar dados, se aplicável.
+    :param formato: Formato da resposta ('json', 'arrow' ou 'parquet').
+    :param version: Versão publicada a consultar ou None para a atual.
+    :return: Tupla (conteúdo em bytes, True se os dados estiverem vencidos ou
+        incompletos, lista das células ausentes).
+    :raises HTTPException: Se a requisição for descartada pelo controle de admissão.
+    """
+    args = (scraper_class, start_year, end_year, botao, formato, version)
+    content = await asyncio.to_thread(cached_data, *args)
+    if content is not None:
+        return content, False, []
+    return await run_admitted(compute_data, *args)
+
+
+def response_key(scraper_class, start_year: int, end_year: int, botao, formato: str, version=None):
+    """
+    Monta a chave da resposta serializada no cache, por versão publicada.
+
+    :param scraper_class: Classe de raspagem do dataset.
+    :param start_year: Ano de início para os dados.
+    :param end_year: Ano de término para os dados.
+    :param botao: Opção de botão para filtrar dados, se aplicável.
+    :param formato: Formato da resposta.
+    :param version: Versão publicada a consultar ou None para a atual.
+    :return: Chave do cache.
+    """
+    return make_key(
+        'response', dataset_name(scraper_class), version or shared_store.current_version() or 'live',
+        start_year, end_year, botao['value'] if botao else '-', formato
+    )
+
+
+def cached_data(scraper_class, start_year: int, end_year: int, botao, formato: str, version=None):
+    """
+    Obtém a resposta serializada do cache, sem calcular nada.
+
+    :param scraper_class: Classe de raspagem do dataset.
+    :param start_year: Ano de início para os dados.
+    :param end_year: Ano de término para os dados.
+    :param botao: Opção de botão para filtrar dados, se aplicável.
+    :param formato: Formato da resposta.
+    :param version: Versão publicada a consultar ou None para a atual.
+    :return: Conteúdo em bytes ou None se não estiver em cache.
+    """
+    content = cache.get(response_key(scraper_class, start_year, end_year, botao, formato, version))
+    record_lookup('resposta', content is not None)
+    return content
+
+
+def compute_data(scraper_class, start_year: int, end_year: int, botao, formato: str, version=None):
+    """
+    Obtém os dados e os serializa no formato solicitado, gravando a resposta no
+    cache quando os dados não estiverem vencidos nem incompletos.
+
+    :param scraper_class: Classe de raspagem do dataset.
+    :param start_year: Ano de início para os dados.
+    :param end_year: Ano de término para os dados.
+    :param botao: Opção de botão para filtrar dados, se aplicável.
+    :param formato: Formato da resposta.
+    :param version: Versão publicada a consultar ou None para a atual.
+    :return: Tupla (conteúdo em bytes, True se os dados estiverem vencidos ou
+        incompletos, lista das células ausentes).
+    """
+    # Chave montada antes da leitura, para não gravar dados de uma versão na chave da seguinte
+    key = response_key(scraper_class, start_year, end_year, botao, formato, version)
+    dados = get_data(scraper_class, start_year, end_year, botao, version)
+    with stage_timer('serialization', dataset_name(scraper_class), botao['classificacao_botao'] if botao else None):
+        content, _, _ = serialize(dados, formato)
+    stale = is_stale(dados)
+    if not stale:
+        cache.set(key, content, ttl=RESPONSE_TTL)
+    return content, stale, missing_from(dados)
+
+
+def is_stale(tabela):
+    """
+    Verifica se a tabela foi servida do cache vencido ou está incompleta.
+
+    :param tabela: Tabela Arrow retornada por get_data.
+    :return: True se os dados estiverem vencidos ou incompletos, False caso contrário.
+    """
+    metadata = tabela.schema.metadata or {}
+    return metadata.get(STALE_METADATA_KEY) == b'true'
+
+
+def missing_from(tabela):
+    """
+    Obtém as células (ano, botão) ausentes de uma tabela retornada por get_data.
+
+    :param tabela: Tabela Arrow retornada por get_data.
+    :return: Lista de listas [ano, classificação do botão ou None].
+    """
+    metadata = tabela.schema.metadata or {}
+    return json.loads(metadata.get(MISSING_METADATA_KEY, b'[]'))
+
+
+def get_data(scraper_class, start_year: int, end_year: int, botao=None, version=None, budget: float = REQUEST_BUDGET):
+    """
+    Obtém dados do dataset, servindo primeiro a versão publicada no repositório
+    compartilhado, depois os segmentos transformados em cache e, por fim,
+    buscando diretamente na origem dentro do prazo da requisição.
+
+    Se o prazo se esgotar, serve os segmentos vencidos do cache, quando houver,
+    ou falha imediatamente. Uma versão informada é servida apenas do repositório.
+
+    As células que falharem no site e nos CSVs não são gravadas como segmentos:
+    a tabela é marcada como vencida (não vai para o cache de respostas) e as
+    células ausentes ficam nos metadados, em MISSING_METADATA_KEY.
+
+    :param scraper_class: Classe de raspagem a ser usada.
+    :param start_year: Ano de início para os dados.
+    :param end_year: Ano de término para os dados.
+    :param botao: Opção de botão para filtrar dados, se aplicável.
+    :param version: Versão publicada a consultar ou None para a atual.
+    :param budget: Orçamento de tempo da requisição em segundos.
+    :return: Tabela Arrow com os dados do intervalo solicitado.
+    :raises HTTPException: Se o prazo se esgotar sem dados em cache ou se o
+        dataset não estiver na versão informada.
+    """
+    nome = dataset_name(scraper_class)
+    if version is not None:
+        tabela = shared_store.get_table(nome, version)
+        if tabela is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Dataset {nome} não publicado na versão {version}"
+            )
+        return filter_table(tabela, start_year, end_year, botao)
+
+    tabela = shared_store.get_table(nome) if nome else None
+    record_lookup('snapshot', tabela is not None)
+    if tabela is not None:
+        return filter_table(tabela, start_year, end_year, botao)
+
+    scraper = scraper_class(range(start_year, end_year + 1), botao)
+    tabela = load_segments(nome, scraper, start_year, end_year)
+    if tabela is not None:
+        return tabela
+
+    try:
+        with deadline_scope(budget):
+            dados = get_data_from_source(scraper_class, start_year, end_year, botao)
+    except DeadlineExceeded as e:
+        print(f'Prazo da requisição esgotado: {str(e)}')
+        tabela = load_segments(nome, scraper, start_year, end_year, max_age=None)
+        if tabela is None:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Tempo limite para obter os dados excedido"
+            )
+        return mark_stale(tabela)
+
+    tabela = to_arrow_table(dados)
+    faltando = dados.attrs.get(CELULAS_FALHAS_ATTR, [])
+    store_segments(nome, scraper, tabela, start_year, end_year, exclude=faltando)
+    if faltando:
+        print(f'{len(faltando)} página(s) sem dados no site nem nos CSVs: resposta incompleta')
+        return mark_stale(tabela, faltando)
+    return tabela
+
+
+def mark_stale(tabela, faltando=None):
+    """
+    Marca, nos metadados, a tabela como vencida ou incompleta.
+
+    :param tabela: Tabela Arrow.
+    :param faltando: Células (ano, botão) ausentes da tabela, se houver.
+    :return: Tabela Arrow com os metadados atualizados.
+    """
+    metadata = dict(tabela.schema.metadata or {})
+    metadata[STALE_METADATA_KEY] = b'true'
+    if faltando:
+        metadata[MISSING_METADATA_KEY] = json.dumps([list(celula) for celula in faltando]).encode()
+    return tabela.replace_schema_metadata(metadata)
+
+
+def fill_from_csv(csv_urls, tipo, celulas):
+    """
+    Obtém dos arquivos CSV apenas as células (ano, botão) informadas.
+
+    :param csv_urls: Lista de URLs dos arquivos CSV do dataset.
+    :param tipo: Tipo de dados a serem processados.
+    :param celulas: Lista de tuplas (ano, classificação do botão ou None).
+    :return: DataFrame com as linhas das células solicitadas.
+    """
+    classificacoes = {botao for _, botao in celulas}
+    dados = download_and_process_csv(csv_urls_for_botoes(csv_urls, classificacoes), tipo)
+    if 'Botao' in dados.columns and None not in classificacoes:
+        chaves = pd.MultiIndex.from_frame(dados[['Ano', 'Botao']])
+        mask = chaves.isin(list(celulas))
+    else:
+        mask = dados['Ano'].isin([ano for ano, _ in celulas])
+    return dados[mask]
+
+
+def missing_cells(celulas, dados):
+    """
+    Obtém as células (ano, botão) sem nenhuma linha nos dados.
+
+    :param celulas: Lista de tuplas (ano, classificação do botão ou None).
+    :param dados: DataFrame com a coluna 'Ano' (e 'Botao', se aplicável).
+    :return: Lista das células ausentes.
+    """
+    anos = set(dados['Ano']) if 'Ano' in dados.columns else set()
+    chaves = set(zip(dados['Ano'], dados['Botao'])) if 'Botao' in dados.columns else set()
+    return [(ano, botao) for ano, botao in celulas if (ano, botao) not in chaves and (botao is not None or ano not in anos)]
+
+
+def get_data_from_source(scraper_class, start_year: int, end_year: int, botao=None):
     """
     Obtém dados usando a classe de raspagem fornecida, tenta primeiro obter dados do site,
     se falhar, tenta obter dados de um arquivo CSV.
 
+    As páginas são tentadas individualmente: apenas as células (ano, botão) que
+    falharem no site são completadas com os CSVs. A coluna 'Fonte' indica a
+    origem de cada linha ('SITE' ou 'CSV'), e as células que nem os CSVs
+    completaram ficam em `dados.attrs[CELULAS_FALHAS_ATTR]`.
+
     :param scraper_class: Classe de raspagem a ser usada.
     :param start_year: Ano de início para os dados.
     :param end_year: Ano de término para os dados.
     :param botao: Opção de botão para filtrar dados, se aplicável.
-    :return: Dados raspados ou baixados e processados, em formato de lista de dicionários.
+    :return: DataFrame com os dados raspados ou baixados e processados.
+    :raises DeadlineExceeded: Se o prazo ativo se esgotar.
     """
+    deadline = current_deadline()
     data = scraper_class(range(start_year, end_year + 1), botao)
     url = data.url
     csv_url = data.csv_url
     tipo = data.tipo 
 
     try:
-        if health_check_site(url):
+        with stage_timer('health_check', tipo):
+            site_disponivel = health_check_site(url)
+        if site_disponivel:
             print('Tentativa através do Site')
-            attempt = 0
-            retries = 2
-            while attempt < retries:
-                try:
-                    data.run()
-                    return data.dados.to_dict(orient="records")
-                except ConnectionError as e:
-                    print(f"Tentativa {attempt + 1} falhou: {str(e)}")
-                    attempt += 1
-                    time.sleep(2)
-                    if attempt == retries:
-                        raise e
+            data.run()
+            if not data.celulas_falhas:
+                return data.dados
+
+            print(f'Completando {len(data.celulas_falhas)} página(s) com falha a partir do CSV')
+            if deadline:
+                deadline.check('antes do download dos CSVs')
+            try:
+                complemento = fill_from_csv(csv_url, tipo, data.celulas_falhas)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Erro ao baixar e processar o CSV: {str(e)}")
+            complemento = complemento.assign(Fonte=FONTE_CSV)
+            dados = pd.concat([data.dados, complemento], ignore_index=True)
+            dados.attrs[CELULAS_FALHAS_ATTR] = missing_cells(data.celulas_falhas, complemento)
+            return dados
         else:
             raise RequestException("Site não disponível")
     except (ConnectionError, RequestException) as e:
         print('Erro ao conectar ao site para download CSV')
-        
+        if deadline:
+            deadline.check('antes do download dos CSVs')
+
         try:
             data = download_and_process_csv(csv_url, tipo)
             data_filtered = data[(data['Ano'] >= start_year) & (data['Ano'] <= end_year)]
@@ -59,112 +546,151 @@ def get_data(scraper_class, start_year: int, end_year: int, botao=None):
                 classificacao_botao = botao['classificacao_botao']
                 data_filtered = data_filtered[data_filtered['Botao'] == classificacao_botao]
 
-            return data_filtered.to_dict(orient="records")
+            return data_filtered.assign(Fonte=FONTE_CSV)
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Erro ao baixar e processar o CSV: {str(e)}")
 
 @router.get("/producao", 
         tags=["Produção"], 
         summary='Obter dados de Produção', 
-        description='Retorna os dados de Produção de um intervalo de anos especificado'
-        )
-async def get_producao_data(start_year: int = 1970, end_year: int = 2023, current_user: dict = Depends(get_current_user)) -> list:
+        description='Retorna os dados de Produção de um intervalo de anos especificado',
+        response_class=Response,
+        responses=DATASET_RESPONSES)
+async def get_producao_data(
+    start_year: int = 1970,
+    end_year: int = 2023,
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    as_of: str = Query(None, description=AS_OF_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+) -> Response:
     """
     Endpoint para obter dados de produção de um intervalo de anos especificado.
 
     :param start_year: Ano de início para os dados de produção.
     :param end_year: Ano de término para os dados de produção.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param as_of: Versão publicada a consultar (padrão: versão atual).
     :param current_user: Usuário atual autenticado.
-    :return: Lista de dicionários contendo os dados de produção.
+    :return: Response com a lista de registros (ou arquivo Arrow/Parquet) contendo os dados de produção.
     """
     authorize_user(current_user, "GET", "/producao"
 )
-    return get_data(ProducaoScraper, start_year, end_year)
+    return await dataset_response(ProducaoScraper, start_year, end_year, None, formato, as_of)
 
 @router.get("/processamento", 
         tags=["Processamento"], 
         summary='Obter dados de Processamento', 
-        description='Retorna os dados de Processamento em um intervalo de anos especificado de forma opcional com as opções no site.')
+        description='Retorna os dados de Processamento em um intervalo de anos especificado de forma opcional com as opções no site.',
+        response_class=Response,
+        responses=DATASET_RESPONSES)
 async def get_processamento_data(
     start_year: int = 1970, 
     end_year: int = 2022,
     botao_opcao: str = Query(None, description="Opção para filtro: (VINIFERA, AMERICANAS_E_HIBRIDA, UVA_DE_MESA, SEM_CLASSIFICACAO)"),
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    as_of: str = Query(None, description=AS_OF_DESCRICAO),
     current_user: dict = Depends(get_current_user)
-) -> list:
+) -> Response:
     """
     Endpoint para obter dados de processamento de um intervalo de anos especificado, com filtro opcional.
 
     :param start_year: Ano de início para os dados de processamento.
     :param end_year: Ano de término para os dados de processamento.
     :param botao_opcao: Opção de filtro para os dados de processamento.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param as_of: Versão publicada a consultar (padrão: versão atual).
     :param current_user: Usuário atual autenticado.
-    :return: Lista de dicionários contendo os dados de processamento.
+    :return: Response com a lista de registros (ou arquivo Arrow/Parquet) contendo os dados de processamento.
     """
     authorize_user(current_user, "GET", "/processamento")
     botao = opcoes_botoes_processamento.get(botao_opcao)
-    return get_data(ProcessamentoScraper, start_year, end_year, botao)
+    return await dataset_response(ProcessamentoScraper, start_year, end_year, botao, formato, as_of)
 
 @router.get("/comercializacao", 
         tags=["Comercialização"], 
         summary='Obter dados de Comercialização', 
-        description='Retorna os dados de Comercialização de um intervalo de anos especificado')
-async def get_comercializacao_data(start_year: int = 1970, end_year: int = 2023, current_user: dict = Depends(get_current_user)) -> list:
+        description='Retorna os dados de Comercialização de um intervalo de anos especificado',
+        response_class=Response,
+        responses=DATASET_RESPONSES)
+async def get_comercializacao_data(
+    start_year: int = 1970,
+    end_year: int = 2023,
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    as_of: str = Query(None, description=AS_OF_DESCRICAO),
+    current_user: dict = Depends(get_current_user)
+) -> Response:
     """
     Endpoint para obter dados de comercialização de um intervalo de anos especificado.
 
     :param start_year: Ano de início para os dados de comercialização.
     :param end_year: Ano de término para os dados de comercialização.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param as_of: Versão publicada a consultar (padrão: versão atual).
     :param current_user: Usuário atual autenticado.
-    :return: Lista de dicionários contendo os dados de comercialização.
+    :return: Response com a lista de registros (ou arquivo Arrow/Parquet) contendo os dados de comercialização.
     """
     authorize_user(current_user, "GET", "/comercializacao")
-    return get_data(ComercializacaoScraper, start_year, end_year)
+    return await dataset_response(ComercializacaoScraper, start_year, end_year, None, formato, as_of)
 
 @router.get("/importacao", 
         tags=["Importação"], 
         summary='Obter dados de Importação', 
-        description='Retorna os dados de Importação de um intervalo de anos especificado e de forma opcional com as opções no site.')
+        description='Retorna os dados de Importação de um intervalo de anos especificado e de forma opcional com as opções no site.',
+        response_class=Response,
+        responses=DATASET_RESPONSES)
 async def get_importacao_data(
     start_year: int = 1970, 
     end_year: int = 2023,
     botao_opcao: str = Query(None, description="Opção do botão (VINHOS_DE_MESA, ESPUMANTES, UVAS_FRESCAS, UVAS_PASSAS, SUCO_DE_UVA)"),
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    as_of: str = Query(None, description=AS_OF_DESCRICAO),
     current_user: dict = Depends(get_current_user)
-) -> list:
+) -> Response:
     """
     Endpoint para obter dados de importação de um intervalo de anos especificado, com filtro opcional.
 
     :param start_year: Ano de início para os dados de importação.
     :param end_year: Ano de término para os dados de importação.
     :param botao_opcao: Opção de filtro para os dados de importação.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param as_of: Versão publicada a consultar (padrão: versão atual).
     :param current_user: Usuário atual autenticado.
-    :return: Lista de dicionários contendo os dados de importação.
+    :return: Response com a lista de registros (ou arquivo Arrow/Parquet) contendo os dados de importação.
     """
     authorize_user(current_user, "GET", "/importacao"
 )
     botao = opcoes_botoes_importacao.get(botao_opcao)
-    return get_data(ImportacaoScraper, start_year, end_year, botao)
+    return await dataset_response(ImportacaoScraper, start_year, end_year, botao, formato, as_of)
 
 @router.get("/exportacao", 
         tags=["Exportação"], 
         summary='Obter dados de Exportação', 
-        description='Retorna os dados de Exportação de um intervalo de anos especificado e de forma opcional com as opções no site.')
+        description='Retorna os dados de Exportação de um intervalo de anos especificado e de forma opcional com as opções no site.',
+        response_class=Response,
+        responses=DATASET_RESPONSES)
 async def get_exportacao_data(
     start_year: int = 1970, 
     end_year: int = 2023,
     botao_opcao: str = Query(None, description="Opção do botão (VINHOS_DE_MESA, ESPUMANTES, UVAS_FRESCAS, SUCO_DE_UVA)"),
+    formato: str = Query("json", alias="format", description=FORMATO_DESCRICAO),
+    as_of: str = Query(None, description=AS_OF_DESCRICAO),
     current_user: dict = Depends(get_current_user)
-) -> list:
+) -> Response:
     """
     Endpoint para obter dados de exportação de um intervalo de anos especificado, com filtro opcional.
 
     :param start_year: Ano de início para os dados de exportação.
     :param end_year: Ano de término para os dados de exportação.
     :param botao_opcao: Opção de filtro para os dados de exportação.
+    :param formato: Formato da resposta (json, arrow ou parquet).
+    :param as_of: Versão publicada a consultar (padrão: versão atual).
     :param current_user: Usuário atual autenticado.
-    :return: Lista de dicionários contendo os dados de exportação.
+    :return: Response com a lista de registros (ou arquivo Arrow/Parquet) contendo os dados de exportação.
     """
     authorize_user(current_user, "GET", "/exportacao"
 )
     botao = opcoes_botoes_exportacao.get(botao_opcao)
-    return get_data(ExportacaoScraper, start_year, end_year, botao)
+    return await dataset_response(ExportacaoScraper, start_year, end_year, botao, formato, as_of)
 
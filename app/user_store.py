@@ -0,0 +1,268 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.utils_data.cache import cache, make_key
+
+
+# Banco SQLite de usuários. Sem ele, os usuários ficam apenas em memória.
+USERS_DB = os.environ.get('VITIBRASIL_USERS_DB')
+# Por quanto tempo (segundos) um usuário lido do banco fica em memória antes de ser relido
+USER_CACHE_TTL = float(os.environ.get('VITIBRASIL_USER_CACHE_TTL', '60'))
+# Quantidade máxima de usuários mantidos em memória (os menos usados recentemente saem primeiro)
+USER_CACHE_SIZE = int(os.environ.get('VITIBRASIL_USER_CACHE_SIZE', '1024'))
+
+
+def user_changed_key(username):
+    """
+    Monta a chave do cache compartilhado que marca a última alteração de um usuário.
+
+    :param username: Nome de usuário.
+    :return: Chave de cache.
+    """
+    return make_key('usuario_alterado', username)
+
+
+def compile_permissions(permissions):
+    """
+    Compila a lista de permissões ("MÉTODO:/caminho") em um conjunto imutável de
+    pares (método, caminho), consultado em O(1) a cada requisição.
+
+    :param permissions: Lista de permissões no formato "MÉTODO:/caminho".
+    :return: Frozenset de tuplas (método, caminho).
+    """
+    return frozenset(tuple(permission.split(':', 1)) for permission in permissions if ':' in permission)
+
+
+class UserRecord(dict):
+    """
+    Registro de usuário: um dicionário com as permissões já compiladas no atributo
+    permission_set (fora das chaves, então não aparece nas respostas da API).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.permission_set = compile_permissions(self.get('permissions', []))
+
+
+class UserStore:
+    """Interface dos repositórios de usuários."""
+
+    def get(self, username, default=None):
+        """
+        Obtém um usuário pelo nome.
+
+        :param username: Nome de usuário.
+        :param default: Valor retornado se o usuário não existir.
+        :return: UserRecord do usuário ou o valor padrão.
+        """
+        raise NotImplementedError
+
+    def set_disabled(self, username, disabled=True):
+        """
+        Ativa ou desativa um usuário.
+
+        :param username: Nome de usuário.
+        :param disabled: True para desativar, False para reativar.
+        """
+        raise NotImplementedError
+
+    def __contains__(self, username):
+        return self.get(username) is not None
+
+    def __getitem__(self, username):
+        user = self.get(username)
+        if user is None:
+            raise KeyError(username)
+        return user
+
+
+class MemoryUserStore(UserStore):
+    """Usuários mantidos em memória, com as permissões compiladas na carga."""
+
+    def __init__(self, users=None):
+        """
+        Inicializa o repositório com os usuários fornecidos.
+
+        :param users: Dicionário nome de usuário -> dados do usuário.
+        """
+        self._users = {username: UserRecord(user) for username, user in (users or {}).items()}
+
+    def get(self, username, default=None):
+        return self._users.get(username, default)
+
+    def set_disabled(self, username, disabled=True):
+        user = self._users.get(username)
+        if user is not None:
+            user['disabled'] = disabled
+
+
+class SQLiteUserStore(UserStore):
+    """
+    Usuários em um banco SQLite, com busca pela chave primária (indexada) e cache
+    em memória dos registros já lidos.
+
+    O cache guarda no máximo ``cache_size`` usuários, descartando os menos usados
+    recentemente. Cada alteração de um usuário grava uma marca no cache compartilhado
+    (``backend``); um registro em memória lido antes da alteração é relido do banco, de
+    modo que desativar um usuário vale para todos os processos que compartilham o
+    backend, e não só para o processo que fez a alteração.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            full_name TEXT,
+            email TEXT,
+            hashed_password TEXT NOT NULL,
+            disabled INTEGER NOT NULL DEFAULT 0,
+            is_admin INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS user_permissions (
+            username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+            permission TEXT NOT NULL,
+            PRIMARY KEY (username, permission)
+        );
+    """
+
+    def __init__(self, path, seed_users=None, cache_ttl=USER_CACHE_TTL, cache_size=USER_CACHE_SIZE, backend=cache):
+        """
+        Inicializa o repositório, criando as tabelas e inserindo os usuários iniciais
+        que ainda não existirem.
+
+        :param path: Caminho do arquivo SQLite.
+        :param seed_users: Dicionário de usuários iniciais.
+        :param cache_ttl: Tempo em segundos que um usuário fica em memória.
+        :param cache_size: Quantidade máxima de usuários mantidos em memória.
+        :param backend: Cache compartilhado onde as alterações de usuários são sinalizadas.
+        """
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self.cache_size = max(cache_size, 1)
+        self.backend = backend
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+        if seed_users:
+            for user in seed_users.values():
+                self.add_user(user, replace=False)
+
+    def add_user(self, user, replace=True):
+        """
+        Insere (ou substitui) um usuário e suas permissões.
+
+        :param user: Dados do usuário.
+        :param replace: Se False, mantém o usuário existente com o mesmo nome.
+        """
+        verbo = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f'{verbo} INTO users (username, full_name, email, hashed_password, disabled, is_admin) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    user['username'], user.get('full_name'), user.get('email'), user['hashed_password'],
+                    int(bool(user.get('disabled'))), int(bool(user.get('is_admin'))),
+                ),
+            )
+            if cursor.rowcount:
+                self._conn.execute('DELETE FROM user_permissions WHERE username = ?', (user['username'],))
+                self._conn.executemany(
+                    'INSERT INTO user_permissions (username, permission) VALUES (?, ?)',
+                    [(user['username'], permission) for permission in user.get('permissions', [])],
+                )
+        if cursor.rowcount and replace:
+            self._invalidate(user['username'])
+
+    def _invalidate(self, username):
+        """
+        Descarta o usuário do cache deste processo e marca a alteração no cache
+        compartilhado, para que os demais processos também o releiam do banco.
+
+        :param username: Nome de usuário.
+        """
+        with self._cache_lock:
+            self._cache.pop(username, None)
+        # A marca só precisa durar o tempo de vida dos registros em memória
+        ttl = max(int(self.cache_ttl + 0.999), 1)
+        self.backend.set(user_changed_key(username), uuid.uuid4().hex.encode(), ttl=ttl)
+
+    def _cached(self, username, agora):
+        """
+        Obtém um usuário do cache em memória, se ainda válido.
+
+        :param username: Nome de usuário.
+        :param agora: Instante atual (time.monotonic).
+        :return: UserRecord do usuário ou None se não estiver no cache ou tiver sido alterado.
+        """
+        with self._cache_lock:
+            entry = self._cache.get(username)
+            if entry is None:
+                return None
+            user, expira_em, marca = entry
+            if expira_em <= agora:
+                del self._cache[username]
+                return None
+            self._cache.move_to_end(username)
+        if self.backend.get(user_changed_key(username)) != marca:
+            with self._cache_lock:
+                self._cache.pop(username, None)
+            return None
+        return user
+
+    def get(self, username, default=None):
+        agora = time.monotonic()
+        user = self._cached(username, agora)
+        if user is not None:
+            return user
+        # A marca é lida antes do banco: uma alteração feita durante a leitura invalida o registro
+        marca = self.backend.get(user_changed_key(username))
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+            if row is None:
+                return default
+            permissions = [
+                r['permission'] for r in self._conn.execute(
+                    'SELECT permission FROM user_permissions WHERE username = ? ORDER BY permission', (username,)
+                )
+            ]
+        user = UserRecord(
+            username=row['username'],
+            full_name=row['full_name'],
+            email=row['email'],
+            hashed_password=row['hashed_password'],
+            disabled=bool(row['disabled']),
+            permissions=permissions,
+        )
+        if row['is_admin']:
+            user['is_admin'] = True
+        with self._cache_lock:
+            self._cache[username] = (user, agora + self.cache_ttl, marca)
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return user
+
+    def set_disabled(self, username, disabled=True):
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE users SET disabled = ? WHERE username = ?', (int(disabled), username))
+        self._invalidate(username)
+
+
+def create_user_store(seed_users, path=USERS_DB):
+    """
+    Cria o repositório de usuários a partir da configuração.
+
+    :param seed_users: Dicionário de usuários iniciais.
+    :param path: Caminho do banco SQLite. Sem ele, usa o repositório em memória.
+    :return: Instância de UserStore.
+    """
+    if path:
+        return SQLiteUserStore(path, seed_users)
+    return MemoryUserStore(seed_users)
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from app.metrics import registry
+
+
+# Computações sem resposta em cache executadas ao mesmo tempo por processo
+ADMISSION_CONCURRENCY = int(os.environ.get('VITIBRASIL_ADMISSION_CONCURRENCY', '8'))
+# Requisições que podem aguardar uma vaga e tempo máximo (segundos) de espera na fila
+ADMISSION_QUEUE_LIMIT = int(os.environ.get('VITIBRASIL_ADMISSION_QUEUE_LIMIT', '32'))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('VITIBRASIL_ADMISSION_QUEUE_TIMEOUT', '5'))
+# Sugestão (segundos) enviada no Retry-After das requisições descartadas
+ADMISSION_RETRY_AFTER = int(os.environ.get('VITIBRASIL_ADMISSION_RETRY_AFTER', '5'))
+
+# Motivos de descarte, nos rótulos da métrica
+MOTIVO_FILA_CHEIA = 'fila_cheia'
+MOTIVO_TEMPO_NA_FILA = 'tempo_na_fila'
+
+ADMISSION_IN_FLIGHT = registry.gauge(
+    'vitibrasil_admission_in_flight',
+    'Computações sem resposta em cache em execução',
+)
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    'vitibrasil_admission_queue_depth',
+    'Requisições sem resposta em cache aguardando uma vaga',
+)
+ADMISSION_SHED = registry.counter(
+    'vitibrasil_admission_shed_total',
+    'Requisições sem resposta em cache descartadas pelo controle de admissão',
+    ['motivo'],
+)
+ADMISSION_WAIT = registry.histogram(
+    'vitibrasil_admission_wait_seconds',
+    'Tempo de espera na fila do controle de admissão',
+)
+
+
+class Overloaded(Exception):
+    """A requisição foi descartada pelo controle de admissão."""
+
+    def __init__(self, motivo, retry_after):
+        """
+        :param motivo: Motivo do descarte (MOTIVO_FILA_CHEIA ou MOTIVO_TEMPO_NA_FILA).
+        :param retry_after: Segundos sugeridos até a próxima tentativa.
+        """
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Controle de admissão das computações sem resposta em cache (raspagem,
+    segmentos, serialização). No máximo `max_concurrent` executam ao mesmo tempo;
+    até `queue_limit` aguardam, em ordem de chegada, por no máximo `queue_timeout`
+    segundos. Além disso, a requisição é descartada na hora.
+
+    Os limites valem por processo (por worker do uvicorn) e o controle roda no
+    event loop, então as requisições na fila não ocupam threads.
+    """
+
+    def __init__(self, max_concurrent=ADMISSION_CONCURRENCY, queue_limit=ADMISSION_QUEUE_LIMIT,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT, retry_after=ADMISSION_RETRY_AFTER):
+        """
+        Inicializa o controle de admissão.
+
+        :param max_concurrent: Computações executadas ao mesmo tempo.
+        :param queue_limit: Requisições que podem aguardar uma vaga.
+        :param queue_timeout: Tempo máximo de espera na fila em segundos.
+        :param retry_after: Segundos sugeridos no Retry-After das requisições descartadas.
+        """
+        self.max_concurrent = max_concurrent
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._em_execucao = 0
+        self._fila = deque()
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Reserva uma vaga durante o bloco, aguardando na fila se necessário.
+
+        :raises Overloaded: Se a fila estiver cheia ou a espera passar de queue_timeout.
+        """
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def run(self, funcao, *args):
+        """
+        Executa uma função síncrona em uma thread, com uma vaga reservada.
+
+        A vaga só é liberada quando a thread termina: se a requisição for cancelada
+        (cliente desconectado), a thread continua até o fim ocupando a vaga, então
+        as computações em execução nunca passam de max_concurrent.
+
+        :param funcao: Função síncrona a executar.
+        :param args: Argumentos da função.
+        :return: Resultado da função.
+        :raises Overloaded: Se a fila estiver cheia ou a espera passar de queue_timeout.
+        """
+        await self._acquire()
+        try:
+            execucao = asyncio.ensure_future(asyncio.to_thread(funcao, *args))
+        except BaseException:
+            self._release()
+            raise
+        execucao.add_done_callback(self._finish)
+        return await asyncio.shield(execucao)
+
+    def _finish(self, execucao):
+        """Libera a vaga de uma execução concluída por run."""
+        self._release()
+        # Marca a exceção como lida quando ninguém mais aguarda o resultado
+        if not execucao.cancelled():
+            execucao.exception()
+
+    async def _acquire(self):
+        """Ocupa uma vaga livre ou aguarda na fila até uma vaga ser repassada."""
+        if self._em_execucao < self.max_concurrent and not self._fila:
+            self._em_execucao += 1
+            ADMISSION_IN_FLIGHT.set(self._em_execucao)
+            return
+        if len(self._fila) >= self.queue_limit:
+            ADMISSION_SHED.inc(motivo=MOTIVO_FILA_CHEIA)
+            raise Overloaded(MOTIVO_FILA_CHEIA, self.retry_after)
+
+        vaga = asyncio.get_running_loop().create_future()
+        self._fila.append(vaga)
+        ADMISSION_QUEUE_DEPTH.set(len(self._fila))
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(vaga), self.queue_timeout)
+        except asyncio.TimeoutError:
+            # A vaga pode ter sido repassada no mesmo instante em que o prazo terminou
+            if not vaga.done():
+                self._fila.remove(vaga)
+                ADMISSION_SHED.inc(motivo=MOTIVO_TEMPO_NA_FILA)
+                raise Overloaded(MOTIVO_TEMPO_NA_FILA, self.retry_after)
+        except asyncio.CancelledError:
+            # Cliente desconectou: devolve a vaga se ela já tinha sido repassada
+            if vaga.done():
+                self._release()
+            else:
+                self._fila.remove(vaga)
+            raise
+        finally:
+            ADMISSION_QUEUE_DEPTH.set(len(self._fila))
+            ADMISSION_WAIT.observe(time.perf_counter() - inicio)
+
+    def _release(self):
+        """Repassa a vaga para a próxima requisição da fila ou a libera."""
+        while self._fila:
+            vaga = self._fila.popleft()
+            if not vaga.done():
+                vaga.set_result(None)
+                ADMISSION_QUEUE_DEPTH.set(len(self._fila))
+                return
+        self._em_execucao -= 1
+        ADMISSION_IN_FLIGHT.set(self._em_execucao)
+
+
+admission = AdmissionController()
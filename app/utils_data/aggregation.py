@@ -0,0 +1,135 @@
+from unidecode import unidecode
+
+from app.lazy import lazy_import
+
+pa = lazy_import('pyarrow')
+pc = lazy_import('pyarrow.compute')
+
+
+# Colunas aceitas no agrupamento e nas métricas, pelo nome sem acentos em minúsculas
+DIMENSOES = {
+    'ano': 'Ano',
+    'paises': 'Países',
+    'produto': 'Produto',
+    'cultivar': 'Cultivar',
+    'classificacao': 'Classificação',
+    'botao': 'Botao',
+}
+METRICAS = {
+    'quantidade': 'Quantidade',
+    'valor': 'Valor (US$)',
+    'valor (us$)': 'Valor (US$)',
+}
+FUNCOES_AGREGACAO = ('sum', 'mean', 'count')
+
+# Colunas que identificam o item de cada linha (produto, cultivar ou país)
+COLUNAS_ITEM = ('Produto', 'Cultivar', 'Países')
+
+
+def resolve_column(nome, opcoes, tabela):
+    """
+    Obtém o nome da coluna a partir do nome informado pelo cliente, aceitando o
+    nome exato ou sem acentos e em minúsculas (ex.: 'paises' para 'Países').
+
+    :param nome: Nome informado.
+    :param opcoes: DIMENSOES ou METRICAS.
+    :param tabela: Tabela Arrow do dataset.
+    :return: Nome da coluna na tabela.
+    :raises ValueError: Se a coluna não for aceita ou não existir no dataset.
+    """
+    coluna = opcoes.get(unidecode(nome).strip().lower())
+    if coluna is None or coluna not in tabela.column_names:
+        disponiveis = [c for c in dict.fromkeys(opcoes.values()) if c in tabela.column_names]
+        raise ValueError(f"Coluna não suportada neste dataset: {nome} (escolha entre {', '.join(disponiveis)})")
+    return coluna
+
+
+def item_column(tabela):
+    """
+    Obtém a coluna que identifica o item de cada linha do dataset.
+
+    :param tabela: Tabela Arrow do dataset.
+    :return: Nome da coluna ou None se o dataset não tiver coluna de item.
+    """
+    return next((coluna for coluna in COLUNAS_ITEM if coluna in tabela.column_names), None)
+
+
+def detail_rows(tabela):
+    """
+    Remove as linhas de total e de subtotal, para que as somas não contem o mesmo
+    valor duas vezes. Nos datasets com 'Classificação', a linha cujo item tem o
+    nome da própria classificação é o subtotal dos demais itens dela; classificações
+    sem outros itens (ex.: 'SEM CLASSIFICACAO') são mantidas.
+
+    :param tabela: Tabela Arrow do dataset.
+    :return: Tabela Arrow só com as linhas de detalhe.
+    """
+    item = item_column(tabela)
+    if item is None:
+        return tabela
+    mask = pc.not_equal(tabela[item], 'TOTAL')
+    if 'Classificação' in tabela.column_names:
+        mesmo_nome = pc.equal(tabela[item], tabela['Classificação'])
+        com_detalhe = pc.unique(tabela['Classificação'].filter(pc.invert(mesmo_nome)))
+        subtotal = pc.and_(mesmo_nome, pc.is_in(tabela['Classificação'], value_set=com_detalhe))
+        # Sem classificação, a linha não é subtotal (e a de TOTAL continua descartada)
+        mask = pc.and_(mask, pc.invert(pc.fill_null(subtotal, False)))
+    return tabela.filter(pc.fill_null(mask, True))
+
+
+def numeric(coluna):
+    """
+    Converte uma coluna para número. Colunas de texto (dados vindos do CSV com
+    valores como '-') têm os valores não numéricos tratados como nulos.
+
+    :param coluna: Coluna Arrow.
+    :return: Coluna Arrow numérica.
+    """
+    if pa.types.is_integer(coluna.type) or pa.types.is_floating(coluna.type):
+        return coluna
+    texto = pc.cast(coluna, pa.string())
+    valido = pc.match_substring_regex(texto, r'^\s*-?\d+(\.\d+)?\s*$')
+    return pc.cast(pc.utf8_trim_whitespace(pc.if_else(valido, texto, None)), pa.float64())
+
+
+def aggregate(tabela, dimensoes, metrica, funcoes=('sum',)):
+    """
+    Agrupa as linhas de detalhe pelas dimensões e calcula as funções de agregação
+    da métrica, de forma vetorizada sobre as colunas Arrow.
+
+    :param tabela: Tabela Arrow do dataset.
+    :param dimensoes: Nomes das colunas de agrupamento (ver DIMENSOES).
+    :param metrica: Nome da coluna da métrica (ver METRICAS).
+    :param funcoes: Funções de agregação ('sum', 'mean' e/ou 'count').
+    :return: Tabela Arrow com as dimensões e uma coluna '<métrica>_<função>' por função, ordenada pelas dimensões.
+    :raises ValueError: Se alguma coluna ou função não for suportada.
+    """
+    colunas = list(dict.fromkeys(resolve_column(nome, DIMENSOES, tabela) for nome in dimensoes))
+    if not colunas:
+        raise ValueError('Informe ao menos uma coluna de agrupamento')
+    coluna_metrica = resolve_column(metrica, METRICAS, tabela)
+    invalidas = [funcao for funcao in funcoes if funcao not in FUNCOES_AGREGACAO]
+    if invalidas or not funcoes:
+        raise ValueError(f"Função de agregação não suportada: escolha entre {', '.join(FUNCOES_AGREGACAO)}")
+
+    detalhe = detail_rows(tabela)
+    base = pa.table({**{coluna: detalhe[coluna] for coluna in colunas}, coluna_metrica: numeric(detalhe[coluna_metrica])})
+    resultado = base.group_by(colunas).aggregate([(coluna_metrica, funcao) for funcao in dict.fromkeys(funcoes)])
+    return resultado.select([*colunas, *(f'{coluna_metrica}_{funcao}' for funcao in dict.fromkeys(funcoes))]) \
+        .sort_by([(coluna, 'ascending') for coluna in colunas])
+
+
+def top_n(tabela, dimensao, metrica, n=10):
+    """
+    Obtém os N grupos de uma dimensão com a maior soma da métrica.
+
+    :param tabela: Tabela Arrow do dataset.
+    :param dimensao: Coluna de agrupamento (ver DIMENSOES).
+    :param metrica: Coluna da métrica usada na ordenação (ver METRICAS).
+    :param n: Quantidade de grupos retornados.
+    :return: Tabela Arrow com a dimensão e a coluna '<métrica>_sum', em ordem decrescente.
+    :raises ValueError: Se alguma coluna não for suportada.
+    """
+    agregado = aggregate(tabela, [dimensao], metrica, ('sum',))
+    coluna = agregado.column_names[-1]
+    return agregado.sort_by([(coluna, 'descending')]).slice(0, max(n, 0))
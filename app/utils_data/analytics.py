@@ -0,0 +1,96 @@
+from app.utils_data.aggregation import DIMENSOES, METRICAS, aggregate, resolve_column
+from app.lazy import lazy_import
+
+np = lazy_import('numpy')
+pa = lazy_import('pyarrow')
+
+
+# Colunas calculadas para cada série e ano
+COLUNA_VARIACAO = 'Variação Anual'
+COLUNA_MEDIA_MOVEL = 'Média Móvel'
+COLUNA_ACUMULADO = 'Acumulado'
+
+
+def series_matrix(tabela, serie, metrica):
+    """
+    Monta a matriz séries x anos da métrica, somando as linhas de detalhe de cada
+    série em cada ano. Anos sem dados de uma série ficam com zero.
+
+    :param tabela: Tabela Arrow do dataset.
+    :param serie: Coluna que identifica as séries (ex.: 'Países', 'Produto').
+    :param metrica: Coluna da métrica (ver METRICAS).
+    :return: Tupla (nomes das séries, anos, matriz NumPy float64 de formato (séries, anos)).
+    :raises ValueError: Se alguma coluna não for suportada.
+    """
+    if resolve_column(serie, DIMENSOES, tabela) == 'Ano':
+        raise ValueError('A coluna das séries não pode ser Ano')
+    totais = aggregate(tabela, [serie, 'Ano'], metrica, ('sum',))
+    nomes, indice_serie = np.unique(totais.column(0).to_numpy(zero_copy_only=False).astype(str), return_inverse=True)
+    anos_linhas = totais['Ano'].to_numpy()
+    if len(anos_linhas) == 0:
+        return nomes, np.array([], dtype=np.int64), np.zeros((0, 0))
+    anos = np.arange(anos_linhas.min(), anos_linhas.max() + 1)
+    matriz = np.zeros((len(nomes), len(anos)))
+    matriz[indice_serie, anos_linhas - anos[0]] = totais.column(2).to_numpy(zero_copy_only=False).astype(np.float64)
+    return nomes, anos, matriz
+
+
+def year_over_year(matriz):
+    """
+    Calcula a variação relativa de cada ano em relação ao anterior, para todas as séries.
+
+    :param matriz: Matriz séries x anos.
+    :return: Matriz com a variação (NaN no primeiro ano e quando o ano anterior for zero).
+    """
+    variacao = np.full(matriz.shape, np.nan)
+    anterior = matriz[:, :-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variacao[:, 1:] = np.where(anterior != 0, (matriz[:, 1:] - anterior) / anterior, np.nan)
+    return variacao
+
+
+def moving_average(matriz, janela):
+    """
+    Calcula a média móvel dos últimos anos, para todas as séries, por somas acumuladas.
+
+    :param matriz: Matriz séries x anos.
+    :param janela: Quantidade de anos da média.
+    :return: Matriz com a média móvel (NaN nos anos sem janela completa).
+    """
+    media = np.full(matriz.shape, np.nan)
+    if janela <= matriz.shape[1]:
+        acumulado = np.concatenate([np.zeros((matriz.shape[0], 1)), np.cumsum(matriz, axis=1)], axis=1)
+        media[:, janela - 1:] = (acumulado[:, janela:] - acumulado[:, :-janela]) / janela
+    return media
+
+
+def series_analytics(tabela, serie, metrica, janela=3):
+    """
+    Calcula, para todas as séries do dataset de uma só vez, a variação anual, a
+    média móvel e o total acumulado da métrica.
+
+    :param tabela: Tabela Arrow do dataset.
+    :param serie: Coluna que identifica as séries (ex.: 'Países', 'Produto', 'Cultivar').
+    :param metrica: Coluna da métrica (ver METRICAS).
+    :param janela: Quantidade de anos da média móvel.
+    :return: Tabela Arrow com uma linha por série e ano.
+    :raises ValueError: Se alguma coluna não for suportada ou a janela for inválida.
+    """
+    if janela < 1:
+        raise ValueError('A janela da média móvel deve ser de pelo menos 1 ano')
+    coluna_serie = resolve_column(serie, DIMENSOES, tabela)
+    coluna_metrica = resolve_column(metrica, METRICAS, tabela)
+    nomes, anos, matriz = series_matrix(tabela, serie, metrica)
+
+    def coluna(valores):
+        valores = valores.ravel()
+        return pa.array(valores, mask=np.isnan(valores))
+
+    return pa.table({
+        coluna_serie: pa.array(np.repeat(nomes, len(anos))),
+        'Ano': pa.array(np.tile(anos, len(nomes))),
+        coluna_metrica: pa.array(matriz.ravel()),
+        COLUNA_VARIACAO: coluna(year_over_year(matriz)),
+        COLUNA_MEDIA_MOVEL: coluna(moving_average(matriz, janela)),
+        COLUNA_ACUMULADO: pa.array(np.cumsum(matriz, axis=1).ravel()),
+    })
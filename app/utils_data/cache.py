@@ -0,0 +1,330 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.metrics import registry
+
+
+# URL do cache externo compartilhado entre os nós (ex.: redis://localhost:6379/0).
+# Sem ela, cada processo usa um cache em memória.
+CACHE_URL = os.environ.get('VITIBRASIL_CACHE_URL')
+CACHE_PREFIX = os.environ.get('VITIBRASIL_CACHE_PREFIX', 'vitibrasil:')
+
+# Tempo de vida (segundos) de cada tipo de entrada do cache
+PAGE_TTL = int(os.environ.get('VITIBRASIL_CACHE_PAGE_TTL', str(6 * 60 * 60)))
+SEGMENT_TTL = int(os.environ.get('VITIBRASIL_CACHE_SEGMENT_TTL', str(6 * 60 * 60)))
+RESPONSE_TTL = int(os.environ.get('VITIBRASIL_CACHE_RESPONSE_TTL', str(60 * 60)))
+# Por quanto tempo (segundos) um segmento vencido ainda pode ser servido quando o prazo se esgota
+STALE_TTL = int(os.environ.get('VITIBRASIL_CACHE_STALE_TTL', str(7 * 24 * 60 * 60)))
+
+# Entradas do cache em memória por processo (as menos usadas recentemente saem
+# primeiro) e intervalo (segundos) entre as remoções das entradas expiradas
+CACHE_MAX_ENTRIES = int(os.environ.get('VITIBRASIL_CACHE_MAX_ENTRIES', '10000'))
+CACHE_PURGE_INTERVAL = float(os.environ.get('VITIBRASIL_CACHE_PURGE_INTERVAL', '60'))
+
+
+CACHE_LOOKUPS = registry.counter(
+    'vitibrasil_cache_lookups_total',
+    'Consultas ao cache por camada e resultado (hit ou miss)',
+    ['camada', 'resultado'],
+)
+
+
+def record_lookup(camada, hit, quantidade=1):
+    """
+    Registra consultas ao cache nas métricas.
+
+    :param camada: Camada consultada ('pagina', 'segmento', 'resposta', 'snapshot'...).
+    :param hit: True se o valor foi encontrado, False caso contrário.
+    :param quantidade: Quantidade de consultas com esse resultado.
+    """
+    if quantidade:
+        CACHE_LOOKUPS.inc(quantidade, camada=camada, resultado='hit' if hit else 'miss')
+
+
+def make_key(*parts):
+    """
+    Monta uma chave de cache a partir das partes fornecidas.
+
+    :param parts: Partes da chave (convertidas para texto).
+    :return: Chave de cache.
+    """
+    return ':'.join(str(part) for part in parts)
+
+
+def page_key(url, params=None):
+    """
+    Monta a chave de cache de uma página do site a partir da URL e dos parâmetros.
+
+    :param url: URL da requisição.
+    :param params: Parâmetros da requisição.
+    :return: Chave de cache da página.
+    """
+    query = '&'.join(f'{k}={v}' for k, v in sorted((params or {}).items()))
+    return make_key('page', hashlib.sha1(f'{url}?{query}'.encode('utf-8')).hexdigest())
+
+
+def segment_key(nome, ano, botao=None):
+    """
+    Monta a chave de cache de um segmento transformado (dataset, ano e botão).
+
+    :param nome: Nome do dataset.
+    :param ano: Ano do segmento.
+    :param botao: Classificação do botão, se aplicável.
+    :return: Chave de cache do segmento.
+    """
+    return make_key('segment', nome, ano, botao or '-')
+
+
+class CacheBackend:
+    """Interface dos backends de cache de páginas, segmentos e respostas serializadas."""
+
+    def get(self, key):
+        """
+        Obtém o valor armazenado em uma chave.
+
+        :param key: Chave de cache.
+        :return: Valor em bytes ou None se a chave não existir.
+        """
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """
+        Armazena um valor em uma chave.
+
+        :param key: Chave de cache.
+        :param value: Valor em bytes.
+        :param ttl: Tempo de vida em segundos (None para não expirar).
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """
+        Remove uma chave do cache.
+
+        :param key: Chave de cache.
+        """
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """
+        Obtém vários valores de uma vez.
+
+        :param keys: Lista de chaves.
+        :return: Lista de valores (None para as chaves ausentes), na mesma ordem.
+        """
+        return [self.get(key) for key in keys]
+
+    def lock(self, name, ttl=60, blocking_timeout=None):
+        """
+        Cria uma trava com o nome fornecido.
+
+        :param name: Nome da trava.
+        :param ttl: Tempo máximo em segundos que a trava pode ficar retida.
+        :param blocking_timeout: Tempo máximo de espera para adquirir (None espera indefinidamente, 0 não espera).
+        :return: Objeto de trava com acquire/release, utilizável em bloco with.
+        """
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Cache em memória do processo, com expiração. Padrão para execução local.
+
+    Guarda no máximo ``max_entries`` entradas, descartando as menos usadas
+    recentemente, e remove as expiradas a cada ``purge_interval`` segundos, já
+    que as chaves das respostas dependem dos parâmetros enviados pelos clientes.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, purge_interval=CACHE_PURGE_INTERVAL):
+        """
+        Inicializa o cache em memória.
+
+        :param max_entries: Quantidade máxima de entradas.
+        :param purge_interval: Intervalo em segundos entre as remoções das entradas expiradas.
+        """
+        self.max_entries = max(max_entries, 1)
+        self.purge_interval = purge_interval
+        self._data = OrderedDict()
+        self._locks = {}
+        self._mutex = threading.Lock()
+        self._next_purge = time.monotonic() + purge_interval
+
+    def get(self, key):
+        with self._mutex:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        agora = time.monotonic()
+        expires_at = agora + ttl if ttl else None
+        with self._mutex:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            if agora >= self._next_purge:
+                self._purge_expired(agora)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _purge_expired(self, agora):
+        """Remove as entradas expiradas (chamado com o mutex retido)."""
+        for key in [key for key, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= agora]:
+            del self._data[key]
+        self._next_purge = agora + self.purge_interval
+
+    def __len__(self):
+        return len(self._data)
+
+    def delete(self, key):
+        with self._mutex:
+            self._data.pop(key, None)
+
+    def lock(self, name, ttl=60, blocking_timeout=None):
+        with self._mutex:
+            lock = self._locks.setdefault(name, threading.Lock())
+        return _LocalLock(lock, blocking_timeout)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache compartilhado via protocolo Redis, para implantações com vários nós.
+
+    Aceita qualquer cliente compatível com redis-py, como ``fakeredis.FakeRedis``
+    para execução local sem servidor.
+    """
+
+    def __init__(self, client=None, url=None, prefix=CACHE_PREFIX):
+        """
+        Inicializa o backend Redis.
+
+        :param client: Cliente Redis já configurado (opcional).
+        :param url: URL de conexão, usada se nenhum cliente for fornecido.
+        :param prefix: Prefixo aplicado a todas as chaves.
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return self.client.mget([self.prefix + key for key in keys])
+
+    def lock(self, name, ttl=60, blocking_timeout=None):
+        return RedisLock(self.client, self.prefix + make_key('lock', name), ttl, blocking_timeout)
+
+
+class _LocalLock:
+    """Trava local (threading) com a mesma interface da trava distribuída."""
+
+    def __init__(self, lock, blocking_timeout=None):
+        self._lock = lock
+        self.blocking_timeout = blocking_timeout
+        self.acquired = False
+
+    def acquire(self):
+        if self.blocking_timeout is None:
+            self.acquired = self._lock.acquire()
+        elif self.blocking_timeout <= 0:
+            self.acquired = self._lock.acquire(blocking=False)
+        else:
+            self.acquired = self._lock.acquire(timeout=self.blocking_timeout)
+        return self.acquired
+
+    def release(self):
+        if self.acquired:
+            self._lock.release()
+            self.acquired = False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class RedisLock:
+    """
+    Trava distribuída: SET NX com expiração e um token único por dono.
+
+    A liberação só remove a chave se o token ainda for o do dono (WATCH/MULTI),
+    evitando liberar uma trava que expirou e foi adquirida por outro nó.
+    """
+
+    def __init__(self, client, key, ttl=60, blocking_timeout=None, poll_interval=0.1):
+        self.client = client
+        self.key = key
+        self.ttl = ttl
+        self.blocking_timeout = blocking_timeout
+        self.poll_interval = poll_interval
+        self.token = uuid.uuid4().hex.encode('utf-8')
+        self.acquired = False
+
+    def acquire(self):
+        deadline = None if self.blocking_timeout is None else time.monotonic() + self.blocking_timeout
+        while True:
+            if self.client.set(self.key, self.token, nx=True, px=int(self.ttl * 1000)):
+                self.acquired = True
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        if not self.acquired:
+            return
+        import redis
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(self.key)
+                if pipe.get(self.key) == self.token:
+                    pipe.multi()
+                    pipe.delete(self.key)
+                    pipe.execute()
+            except redis.WatchError:
+                pass
+        self.acquired = False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def create_cache_backend(url=CACHE_URL):
+    """
+    Cria o backend de cache a partir da configuração.
+
+    :param url: URL do cache externo. Sem URL, usa o cache em memória.
+    :return: Instância de CacheBackend.
+    """
+    if url:
+        return RedisCacheBackend(url=url)
+    return MemoryCacheBackend()
+
+
+cache = create_cache_backend()
@@ -0,0 +1,114 @@
+from app.utils_data.aggregation import item_column
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
+pa = lazy_import('pyarrow')
+pc = lazy_import('pyarrow.compute')
+
+
+# Chave de cada linha no registro de alterações. 'Ocorrencia' diferencia linhas
+# com a mesma chave no mesmo ano (ex.: itens repetidos em uma classificação).
+CHAVES_ALTERACAO = ['Botao', 'Ano', 'Classificação', 'Entidade', 'Ocorrencia']
+# Valores comparados entre as versões (a coluna 'Fonte' fica de fora: a mesma
+# linha vinda do site ou do CSV não é uma alteração)
+VALORES_ALTERACAO = ['Quantidade', 'Valor (US$)']
+
+OPERACAO_INCLUSAO = 'insert'
+OPERACAO_ALTERACAO = 'update'
+OPERACAO_EXCLUSAO = 'delete'
+
+
+def changes_schema():
+    """
+    Obtém o esquema do registro de alterações, comum a todos os datasets.
+
+    :return: Esquema Arrow.
+    """
+    return pa.schema([
+        ('Dataset', pa.string()),
+        ('Operacao', pa.string()),
+        ('Botao', pa.string()),
+        ('Ano', pa.int64()),
+        ('Classificação', pa.string()),
+        ('Entidade', pa.string()),
+        ('Ocorrencia', pa.int64()),
+        ('Quantidade', pa.float64()),
+        ('Valor (US$)', pa.float64()),
+        ('Quantidade Anterior', pa.float64()),
+        ('Valor (US$) Anterior', pa.float64()),
+    ])
+
+
+def _normalize(tabela):
+    """
+    Converte um dataset para o formato de comparação: chave de alteração e valores numéricos.
+
+    :param tabela: Tabela Arrow do dataset.
+    :return: DataFrame com as colunas CHAVES_ALTERACAO e VALORES_ALTERACAO.
+    """
+    dados = tabela.to_pandas()
+    item = item_column(tabela)
+    frame = pd.DataFrame({
+        'Botao': dados['Botao'].fillna('').astype(str) if 'Botao' in dados else '',
+        'Ano': dados['Ano'].astype('int64'),
+        'Classificação': dados['Classificação'].fillna('').astype(str) if 'Classificação' in dados else '',
+        'Entidade': dados[item].fillna('').astype(str) if item else '',
+    }, index=dados.index)
+    frame['Ocorrencia'] = frame.groupby(CHAVES_ALTERACAO[:-1], sort=False).cumcount()
+    for coluna in VALORES_ALTERACAO:
+        frame[coluna] = pd.to_numeric(dados[coluna], errors='coerce').astype('float64') if coluna in dados else float('nan')
+    return frame
+
+
+def diff_tables(nome, anterior, nova):
+    """
+    Calcula as alterações linha a linha entre duas versões de um dataset:
+    linhas incluídas, alteradas (mesma chave com outros valores) e excluídas.
+
+    :param nome: Nome do dataset.
+    :param anterior: Tabela Arrow da versão anterior ou None (todas as linhas são incluídas).
+    :param nova: Tabela Arrow da nova versão.
+    :return: Tabela Arrow no esquema changes_schema().
+    """
+    novo = _normalize(nova)
+    antigo = _normalize(anterior) if anterior is not None else novo.iloc[0:0]
+    junta = antigo.merge(novo, on=CHAVES_ALTERACAO, how='outer', suffixes=(' Anterior', ''), indicator=True)
+
+    diferente = pd.Series(False, index=junta.index)
+    for coluna in VALORES_ALTERACAO:
+        a, b = junta[f'{coluna} Anterior'], junta[coluna]
+        diferente |= (a != b) & ~(a.isna() & b.isna())
+    operacao = pd.Series(None, index=junta.index, dtype=object)
+    operacao[junta['_merge'] == 'right_only'] = OPERACAO_INCLUSAO
+    operacao[junta['_merge'] == 'left_only'] = OPERACAO_EXCLUSAO
+    operacao[(junta['_merge'] == 'both') & diferente] = OPERACAO_ALTERACAO
+
+    alteracoes = junta.assign(Dataset=nome, Operacao=operacao)[operacao.notna()]
+    for coluna in ('Botao', 'Classificação'):
+        alteracoes[coluna] = alteracoes[coluna].replace('', None)
+    alteracoes = alteracoes.sort_values(['Botao', 'Ano', 'Classificação', 'Entidade', 'Ocorrencia'], na_position='first')
+    schema = changes_schema()
+    return pa.Table.from_pandas(alteracoes[schema.names], schema=schema, preserve_index=False)
+
+
+def changes_since(store, since, nomes, atual):
+    """
+    Junta os registros de alterações das versões posteriores a `since` até a atual.
+
+    :param store: Repositório compartilhado.
+    :param since: Última versão já sincronizada pelo cliente.
+    :param nomes: Datasets incluídos.
+    :param atual: Versão atual.
+    :return: Tabela Arrow com a coluna 'Versao' ou None se alguma versão do intervalo não estiver mais disponível.
+    """
+    tabelas = []
+    for version in range(since + 1, atual + 1):
+        tabela = store.get_changes(version)
+        if tabela is None:
+            return None
+        tabela = tabela.filter(pc.is_in(tabela['Dataset'], value_set=pa.array(list(nomes), pa.string())))
+        tabelas.append(tabela.append_column('Versao', pa.array([version] * tabela.num_rows, pa.int64())))
+    if not tabelas:
+        schema = changes_schema().append(pa.field('Versao', pa.int64()))
+        return schema.empty_table()
+    return pa.concat_tables(tabelas)
@@ -1,3 +1,11 @@
+import os
+
+
+# Endereço do site da Embrapa Uva e Vinho. Pode apontar para um servidor local (ex.: o stub
+# dos benchmarks) ou para um espelho.
+DEFAULT_BASE_URL = 'http://vitibrasil.cnpuv.embrapa.br'
+BASE_URL = os.environ.get('VITIBRASIL_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
+
 # Conjunto de opções para os botões para o Scraper
 opcoes_botoes_processamento = {
     'VINIFERA': {'name': 'subopcao', 'value': 'subopt_01', 'classificacao_botao': 'VINIFERAS'},
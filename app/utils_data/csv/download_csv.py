@@ -1,8 +1,53 @@
-import pandas as pd
-import requests
 from io import StringIO
 
+from app.metrics import stage_timer
 from app.utils_data.csv.transform_csv import transform_csv
+from app.utils_data.upstream import upstream_get
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+
+# Classificação do botão correspondente a cada arquivo CSV dos datasets com botões
+BOTOES_CSV = {
+    'ProcessaViniferas.csv': 'VINIFERAS',
+    'ProcessaAmericanas.csv': 'AMERICANAS E HIBRIDAS',
+    'ProcessaMesa.csv': 'UVAS DE MESA',
+    'ProcessaSemclass.csv': 'SEM CLASSIFICACAO',
+    'ImpVinhos.csv': 'VINHOS DE MESA',
+    'ImpEspumantes.csv': 'ESPUMANTES',
+    'ImpFrescas.csv': 'UVAS FRESCAS',
+    'ImpPassas.csv': 'UVAS PASSAS',
+    'ImpSuco.csv': 'SUCO DE UVA',
+    'ExpVinho.csv': 'VINHOS DE MESA',
+    'ExpEspumantes.csv': 'ESPUMANTES',
+    'ExpUva.csv': 'UVAS FRESCAS',
+    'ExpSuco.csv': 'SUCO DE UVA',
+}
+
+
+def botao_do_csv(csv_url):
+    """
+    Obtém a classificação do botão correspondente a uma URL de CSV.
+
+    :param csv_url: URL do arquivo CSV.
+    :return: Classificação do botão ou None se o CSV não tiver botão.
+    """
+    return BOTOES_CSV.get(csv_url.rsplit('/', 1)[-1])
+
+
+def csv_urls_for_botoes(csv_urls, classificacoes):
+    """
+    Seleciona apenas os CSVs necessários para as classificações de botão informadas.
+
+    :param csv_urls: Lista de URLs dos arquivos CSV do dataset.
+    :param classificacoes: Conjunto de classificações de botão (None para datasets sem botão).
+    :return: Lista de URLs dos CSVs necessários.
+    """
+    return [
+        csv_url for csv_url in csv_urls
+        if botao_do_csv(csv_url) is None or botao_do_csv(csv_url) in classificacoes
+    ]
 
 
 def infer_delimiter(text):
@@ -32,8 +77,10 @@ def download_and_process_csv(csv_urls, tipo):
 
     for csv_url in csv_urls:
         print('Pegando o csv do site: ' + csv_url)
-        response = requests.get(csv_url)
-        response.raise_for_status()
+        classificacao_botao = botao_do_csv(csv_url)
+        with stage_timer('csv_download', tipo, classificacao_botao):
+            response = upstream_get(csv_url)
+            response.raise_for_status()
         csv_data = StringIO(response.text)
 
 
@@ -41,42 +88,15 @@ def download_and_process_csv(csv_urls, tipo):
         delimiter = infer_delimiter(first_line)
 
 
-        df = pd.read_csv(csv_data, delimiter=delimiter, encoding='utf-8')
+        with stage_timer('csv_parse', tipo, classificacao_botao):
+            df = pd.read_csv(csv_data, delimiter=delimiter, encoding='utf-8')
 
-        formated = transform_csv(df, tipo)
+        with stage_timer('transform_csv', tipo, classificacao_botao):
+            formated = transform_csv(df, tipo)
         
 
-        if tipo == 'Proces': 
-            if csv_url.endswith("ProcessaViniferas.csv"):
-                formated['Botao'] = 'VINIFERAS'
-            elif csv_url.endswith("ProcessaAmericanas.csv"):
-                formated['Botao'] = 'AMERICANAS E HIBRIDAS'
-            elif csv_url.endswith("ProcessaMesa.csv"):
-                formated['Botao'] = 'UVAS DE MESA'
-            elif csv_url.endswith("ProcessaSemclass.csv"):
-                formated['Botao'] = 'SEM CLASSIFICACAO'
-
-        elif tipo == 'Imp': 
-            if csv_url.endswith("ImpVinhos.csv"):
-                formated['Botao'] = 'VINHOS DE MESA'
-            elif csv_url.endswith("ImpEspumantes.csv"):
-                formated['Botao'] = 'ESPUMANTES'
-            elif csv_url.endswith("ImpFrescas.csv"):
-                formated['Botao'] = 'UVAS FRESCAS'
-            elif csv_url.endswith("ImpPassas.csv"):
-                formated['Botao'] = 'UVAS PASSAS'
-            elif csv_url.endswith("ImpSuco.csv"):
-                formated['Botao'] = 'SUCO DE UVA'
-        
-        elif tipo == 'Exp': 
-            if csv_url.endswith("ExpVinho.csv"):
-                formated['Botao'] = 'VINHOS DE MESA'
-            elif csv_url.endswith("ExpEspumantes.csv"):
-                formated['Botao'] = 'ESPUMANTES'
-            elif csv_url.endswith("ExpUva.csv"):
-                formated['Botao'] = 'UVAS FRESCAS'
-            elif csv_url.endswith("ExpSuco.csv"):
-                formated['Botao'] = 'SUCO DE UVA'
+        if classificacao_botao:
+            formated['Botao'] = classificacao_botao
 
 
         dataframes.append(formated)
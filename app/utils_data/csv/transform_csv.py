@@ -1,5 +1,7 @@
-import pandas as pd
 from unidecode import unidecode
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 def remover_acentos(text):
     return unidecode(text)
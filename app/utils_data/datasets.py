@@ -0,0 +1,36 @@
+from app.utils_data.web_scraping.scraping_producao import ProducaoScraper
+from app.utils_data.web_scraping.scraping_processamento import ProcessamentoScraper
+from app.utils_data.web_scraping.scraping_comercializacao import ComercializacaoScraper
+from app.utils_data.web_scraping.scraping_importacao import ImportacaoScraper
+from app.utils_data.web_scraping.scraping_exportacao import ExportacaoScraper
+from app.utils_data.constants import opcoes_botoes_processamento, opcoes_botoes_importacao, opcoes_botoes_exportacao
+
+
+# Conjunto de datasets servidos pela API, com o intervalo de anos completo de cada um
+# e as opções de botão aceitas em botao_opcao (vazio para os datasets sem botões)
+DATASETS = {
+    'producao': {'scraper': ProducaoScraper, 'ano_inicial': 1970, 'ano_final': 2023, 'botoes': {}},
+    'processamento': {
+        'scraper': ProcessamentoScraper, 'ano_inicial': 1970, 'ano_final': 2022, 'botoes': opcoes_botoes_processamento,
+    },
+    'comercializacao': {'scraper': ComercializacaoScraper, 'ano_inicial': 1970, 'ano_final': 2023, 'botoes': {}},
+    'importacao': {
+        'scraper': ImportacaoScraper, 'ano_inicial': 1970, 'ano_final': 2023, 'botoes': opcoes_botoes_importacao,
+    },
+    'exportacao': {
+        'scraper': ExportacaoScraper, 'ano_inicial': 1970, 'ano_final': 2023, 'botoes': opcoes_botoes_exportacao,
+    },
+}
+
+
+def dataset_name(scraper_class):
+    """
+    Obtém o nome do dataset associado a uma classe de raspagem.
+
+    :param scraper_class: Classe de raspagem.
+    :return: Nome do dataset ou None se a classe não estiver registrada.
+    """
+    for nome, dataset in DATASETS.items():
+        if dataset['scraper'] is scraper_class:
+            return nome
+    return None
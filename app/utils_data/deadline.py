@@ -0,0 +1,109 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Orçamento total (segundos) de uma requisição a get_data, incluindo retentativas e fallback CSV
+REQUEST_BUDGET = float(os.environ.get('VITIBRASIL_REQUEST_BUDGET', '30'))
+# Tempo máximo (segundos) de cada chamada individual ao site da Embrapa
+UPSTREAM_TIMEOUT = float(os.environ.get('VITIBRASIL_UPSTREAM_TIMEOUT', '10'))
+
+_deadline_atual = ContextVar('vitibrasil_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """O orçamento de tempo da requisição se esgotou."""
+
+
+class Deadline:
+    """Prazo absoluto de uma requisição, propagado para todas as etapas que ela executa."""
+
+    def __init__(self, budget):
+        """
+        Inicializa o prazo a partir do orçamento em segundos.
+
+        :param budget: Orçamento de tempo em segundos.
+        """
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        """
+        Obtém o tempo restante até o prazo.
+
+        :return: Tempo restante em segundos (zero se o prazo já passou).
+        """
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        """
+        Verifica se o prazo já passou.
+
+        :return: True se o prazo se esgotou, False caso contrário.
+        """
+        return self.remaining() <= 0
+
+    def check(self, etapa=''):
+        """
+        Interrompe a execução se o prazo já passou.
+
+        :param etapa: Descrição da etapa, usada na mensagem de erro.
+        :raises DeadlineExceeded: Se o prazo se esgotou.
+        """
+        if self.expired():
+            raise DeadlineExceeded(f'Prazo de {self.budget:.0f}s esgotado {etapa}'.strip())
+
+    def timeout(self, maximo=UPSTREAM_TIMEOUT):
+        """
+        Obtém o timeout para uma chamada ao site, limitado ao tempo restante.
+
+        :param maximo: Timeout máximo da chamada em segundos.
+        :return: Timeout em segundos.
+        :raises DeadlineExceeded: Se o prazo se esgotou.
+        """
+        self.check()
+        return min(maximo, self.remaining())
+
+
+def current_deadline():
+    """
+    Obtém o prazo da requisição em execução no contexto atual.
+
+    :return: Deadline ativo ou None.
+    """
+    return _deadline_atual.get()
+
+
+@contextmanager
+def deadline_scope(budget=REQUEST_BUDGET):
+    """
+    Define o prazo das operações executadas dentro do bloco. Se já houver um prazo
+    mais curto ativo, ele é mantido.
+
+    :param budget: Orçamento de tempo em segundos.
+    :return: Deadline ativo dentro do bloco.
+    """
+    atual = _deadline_atual.get()
+    novo = Deadline(budget)
+    if atual is not None and atual.expires_at <= novo.expires_at:
+        yield atual
+        return
+    token = _deadline_atual.set(novo)
+    try:
+        yield novo
+    finally:
+        _deadline_atual.reset(token)
+
+
+def upstream_timeout():
+    """
+    Obtém o timeout para uma chamada ao site respeitando o prazo ativo, se houver.
+
+    :return: Timeout em segundos.
+    :raises DeadlineExceeded: Se o prazo ativo se esgotou.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return UPSTREAM_TIMEOUT
+    return deadline.timeout()
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import zipfile
+
+from app.utils_data.datasets import DATASETS
+from app.utils_data.formats import serialize_parquet
+from app.utils_data.singleflight import SingleFlight
+from app.lazy import lazy_import
+
+pa = lazy_import('pyarrow')
+pacsv = lazy_import('pyarrow.csv')
+
+
+# Formatos dos datasets dentro do pacote de exportação
+FORMATOS_EXPORTACAO = ('csv', 'parquet')
+# Pasta, na raiz do repositório compartilhado, com os pacotes prontos de cada versão
+EXPORTS_DIR = 'exports'
+
+# Montagens em andamento neste processo, por pacote
+_em_andamento = SingleFlight()
+
+
+def archive_path(store, version, formato):
+    """
+    Obtém o caminho do pacote de exportação de uma versão. O nome usa o
+    identificador do conteúdo, então versões com o mesmo conteúdo compartilham o pacote.
+
+    :param store: Repositório compartilhado.
+    :param version: Número da versão.
+    :param formato: Formato dos datasets (ver FORMATOS_EXPORTACAO).
+    :return: Caminho do arquivo ZIP.
+    """
+    snapshot = store.snapshot(version)
+    chave = snapshot['id'] if snapshot is not None else f'versao-{version}'
+    return os.path.join(store.root, EXPORTS_DIR, f'{chave}.{formato}.zip')
+
+
+def build_archive(store, version, formato):
+    """
+    Obtém o pacote de exportação de uma versão, montando-o na primeira chamada.
+    Chamadas simultâneas no mesmo processo aguardam a mesma montagem.
+
+    :param store: Repositório compartilhado.
+    :param version: Número da versão.
+    :param formato: Formato dos datasets (ver FORMATOS_EXPORTACAO).
+    :return: Caminho do arquivo ZIP pronto.
+    :raises ValueError: Se o formato não for suportado.
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato não suportado: escolha entre {', '.join(FORMATOS_EXPORTACAO)}")
+    path = archive_path(store, version, formato)
+    if os.path.exists(path):
+        return path
+    _em_andamento.do(path, _write_archive, store, version, formato, path)
+    return path
+
+
+def _write_archive(store, version, formato, path):
+    """
+    Grava o pacote de exportação: um arquivo por dataset (CSV comprimido no ZIP,
+    Parquet armazenado como está, pois já é comprimido) e um manifest.json com o
+    identificador do conteúdo e a quantidade de linhas de cada dataset.
+
+    O pacote é compartilhado pelas versões com o mesmo conteúdo, então o
+    manifesto não traz o número nem a data de publicação da versão (que vêm nos
+    cabeçalhos da resposta do endpoint).
+
+    :param store: Repositório compartilhado.
+    :param version: Número da versão.
+    :param formato: Formato dos datasets.
+    :param path: Caminho do arquivo ZIP.
+    """
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    snapshot = store.snapshot(version) or {}
+    manifesto = {'id': snapshot.get('id'), 'datasets': {}}
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with zipfile.ZipFile(tmp, 'w') as pacote:
+        for nome in DATASETS:
+            tabela = store.get_table(nome, version)
+            if tabela is None:
+                continue
+            if formato == 'csv':
+                sink = pa.BufferOutputStream()
+                pacsv.write_csv(tabela, sink)
+                pacote.writestr(f'{nome}.csv', sink.getvalue().to_pybytes(),
+                                compress_type=zipfile.ZIP_DEFLATED, compresslevel=9)
+            else:
+                pacote.writestr(f'{nome}.parquet', serialize_parquet(tabela), compress_type=zipfile.ZIP_STORED)
+            manifesto['datasets'][nome] = {'linhas': tabela.num_rows}
+        pacote.writestr('manifest.json', json.dumps(manifesto, ensure_ascii=False, indent=2),
+                        compress_type=zipfile.ZIP_DEFLATED)
+    os.replace(tmp, path)
+    prune_archives(store)
+
+
+def prune_archives(store):
+    """
+    Remove os pacotes de versões que não estão mais em disco. Downloads em
+    andamento continuam, pois o arquivo aberto só é liberado quando é fechado.
+
+    :param store: Repositório compartilhado.
+    """
+    exports_dir = os.path.join(store.root, EXPORTS_DIR)
+    if not os.path.isdir(exports_dir):
+        return
+    mantidos = {
+        os.path.basename(archive_path(store, version, formato))
+        for version in store.published_versions() for formato in FORMATOS_EXPORTACAO
+    }
+    for arquivo in os.listdir(exports_dir):
+        if arquivo.endswith('.zip') and arquivo not in mantidos:
+            os.remove(os.path.join(exports_dir, arquivo))
+
+
+def build_exports(store, version):
+    """
+    Monta os pacotes de exportação de uma versão recém-publicada em todos os
+    formatos, para que o primeiro download não espere a montagem.
+
+    :param store: Repositório compartilhado.
+    :param version: Número da versão.
+    """
+    for formato in FORMATOS_EXPORTACAO:
+        build_archive(store, version, formato)
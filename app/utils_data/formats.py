@@ -0,0 +1,122 @@
+import json
+
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+
+
+# Formatos de saída aceitos pelos endpoints de dados
+FORMATOS_SUPORTADOS = ('json', 'arrow', 'parquet')
+
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+EXTENSOES = {
+    'json': 'json',
+    'arrow': 'arrow',
+    'parquet': 'parquet',
+}
+
+
+def to_arrow_table(dados):
+    """
+    Converte os dados para uma tabela Arrow, coluna a coluna.
+
+    :param dados: DataFrame pandas ou tabela Arrow.
+    :return: Tabela Arrow.
+    """
+    if isinstance(dados, pa.Table):
+        return dados
+    try:
+        return pa.Table.from_pandas(dados, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Colunas de objeto com tipos mistos (ex.: CSV com '-' e números) viram texto
+        dados = dados.copy()
+        for col in dados.select_dtypes(include='object'):
+            dados[col] = dados[col].map(lambda valor: None if valor is None else str(valor))
+        return pa.Table.from_pandas(dados, preserve_index=False)
+
+
+def concat_tables(tabelas):
+    """
+    Concatena tabelas Arrow, unificando os esquemas quando necessário.
+
+    :param tabelas: Lista de tabelas Arrow.
+    :return: Tabela Arrow concatenada.
+    """
+    try:
+        return pa.concat_tables(tabelas, promote_options='default')
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Tipos incompatíveis entre as fontes (ex.: site e CSV): unifica via pandas
+        return to_arrow_table(pd.concat([tabela.to_pandas() for tabela in tabelas], ignore_index=True))
+
+
+def serialize_json(dados):
+    """
+    Serializa os dados como uma lista JSON de registros.
+
+    :param dados: DataFrame pandas ou tabela Arrow.
+    :return: Bytes do documento JSON.
+    """
+    registros = to_arrow_table(dados).to_pylist()
+    return json.dumps(registros, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def serialize_arrow_ipc(dados):
+    """
+    Serializa os dados no formato Arrow IPC (stream).
+
+    :param dados: DataFrame pandas ou tabela Arrow.
+    :return: Bytes do stream Arrow IPC.
+    """
+    table = to_arrow_table(dados)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def deserialize_arrow_ipc(content):
+    """
+    Lê uma tabela serializada no formato Arrow IPC (stream).
+
+    :param content: Bytes do stream Arrow IPC.
+    :return: Tabela Arrow.
+    """
+    return pa.ipc.open_stream(content).read_all()
+
+
+def serialize_parquet(dados):
+    """
+    Serializa os dados no formato Parquet.
+
+    :param dados: DataFrame pandas ou tabela Arrow.
+    :return: Bytes do arquivo Parquet.
+    """
+    table = to_arrow_table(dados)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression='snappy')
+    return sink.getvalue().to_pybytes()
+
+
+def serialize(dados, formato):
+    """
+    Serializa os dados no formato solicitado.
+
+    :param dados: DataFrame pandas ou tabela Arrow.
+    :param formato: Formato de saída ('json', 'arrow' ou 'parquet').
+    :return: Tupla (conteúdo em bytes, media type, extensão do arquivo).
+    :raises ValueError: Se o formato não for suportado.
+    """
+    if formato == 'json':
+        return serialize_json(dados), MEDIA_TYPES[formato], EXTENSOES[formato]
+    if formato == 'arrow':
+        return serialize_arrow_ipc(dados), MEDIA_TYPES[formato], EXTENSOES[formato]
+    if formato == 'parquet':
+        return serialize_parquet(dados), MEDIA_TYPES[formato], EXTENSOES[formato]
+    raise ValueError(f"Formato não suportado: escolha entre {', '.join(FORMATOS_SUPORTADOS)}.")
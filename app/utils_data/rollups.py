@@ -0,0 +1,139 @@
+from app.utils_data.aggregation import detail_rows, numeric
+from app.lazy import lazy_import
+
+pa = lazy_import('pyarrow')
+pc = lazy_import('pyarrow.compute')
+
+
+# Consolidações mantidas junto de cada versão publicada dos datasets:
+#   anual      - totais por ano (e botão)
+#   paises_ano - totais por país e ano (e botão), apenas importação e exportação
+#   paises     - totais por país (e botão) em todo o histórico, apenas importação e exportação
+# Nos datasets com 'Valor (US$)', todas trazem também o preço médio em US$/kg.
+ROLLUPS = ('anual', 'paises_ano', 'paises')
+# Consolidações recalculadas por ano; 'paises' é derivada de 'paises_ano'
+ROLLUPS_POR_ANO = ('anual', 'paises_ano')
+
+COLUNA_PRECO = 'US$/kg'
+
+
+def available_rollups(tabela):
+    """
+    Lista as consolidações aplicáveis a um dataset.
+
+    :param tabela: Tabela Arrow do dataset.
+    :return: Tupla com os nomes das consolidações.
+    """
+    return ROLLUPS if 'Países' in tabela.column_names else ('anual',)
+
+
+def _with_price(tabela):
+    """
+    Acrescenta o preço médio em US$/kg quando a tabela tiver 'Valor (US$)'.
+
+    :param tabela: Tabela Arrow com as colunas de totais.
+    :return: Tabela Arrow com a coluna de preço, se aplicável.
+    """
+    if 'Valor (US$)' not in tabela.column_names:
+        return tabela
+    quantidade = pc.cast(tabela['Quantidade'], pa.float64())
+    valor = pc.cast(tabela['Valor (US$)'], pa.float64())
+    preco = pc.if_else(pc.greater(quantidade, 0), pc.divide(valor, quantidade), None)
+    return tabela.append_column(COLUNA_PRECO, preco)
+
+
+def _totals(tabela, chaves):
+    """
+    Soma as métricas do dataset agrupadas pelas chaves.
+
+    :param tabela: Tabela Arrow (linhas de detalhe ou totais parciais).
+    :param chaves: Colunas de agrupamento.
+    :return: Tabela Arrow com as chaves e os totais, ordenada pelas chaves.
+    """
+    metricas = [coluna for coluna in ('Quantidade', 'Valor (US$)') if coluna in tabela.column_names]
+    base = pa.table({**{chave: tabela[chave] for chave in chaves}, **{m: numeric(tabela[m]) for m in metricas}})
+    totais = base.group_by(chaves).aggregate([(m, 'sum') for m in metricas])
+    totais = totais.select([*chaves, *(f'{m}_sum' for m in metricas)]).rename_columns([*chaves, *metricas])
+    return _with_price(totais.sort_by([(chave, 'ascending') for chave in chaves]))
+
+
+def _keys(tabela, *chaves):
+    """Chaves de agrupamento, acrescidas de 'Botao' nos datasets com botões."""
+    return [*chaves, *(['Botao'] if 'Botao' in tabela.column_names else [])]
+
+
+def compute_rollups(tabela, anos=None):
+    """
+    Calcula as consolidações de um dataset, opcionalmente só para alguns anos.
+
+    :param tabela: Tabela Arrow do dataset.
+    :param anos: Anos a consolidar (None para todos).
+    :return: Dicionário nome da consolidação -> tabela Arrow.
+    """
+    detalhe = detail_rows(tabela)
+    if anos is not None:
+        detalhe = detalhe.filter(pc.is_in(detalhe['Ano'], value_set=pa.array(sorted(anos), detalhe['Ano'].type)))
+    rollups = {'anual': _totals(detalhe, _keys(tabela, 'Ano'))}
+    if 'Países' in tabela.column_names:
+        rollups['paises_ano'] = _totals(detalhe, _keys(tabela, 'Países', 'Ano'))
+        rollups['paises'] = _totals(rollups['paises_ano'], _keys(tabela, 'Países'))
+    return rollups
+
+
+def changed_years(anterior, nova):
+    """
+    Obtém os anos cujas linhas mudaram entre duas versões de um dataset.
+
+    :param anterior: Tabela Arrow da versão anterior.
+    :param nova: Tabela Arrow da nova versão.
+    :return: Conjunto de anos alterados, incluídos ou removidos.
+    """
+    # A origem da linha (site ou CSV) não altera as consolidações
+    if 'Fonte' in anterior.column_names:
+        anterior = anterior.drop_columns(['Fonte'])
+    if 'Fonte' in nova.column_names:
+        nova = nova.drop_columns(['Fonte'])
+    anos_anteriores = set(pc.unique(anterior['Ano']).to_pylist())
+    anos_novos = set(pc.unique(nova['Ano']).to_pylist())
+    if not anterior.schema.equals(nova.schema):
+        return anos_anteriores | anos_novos
+    alterados = anos_anteriores ^ anos_novos
+    for ano in anos_anteriores & anos_novos:
+        if not anterior.filter(pc.equal(anterior['Ano'], ano)).equals(nova.filter(pc.equal(nova['Ano'], ano))):
+            alterados.add(ano)
+    return alterados
+
+
+def update_rollups(nova, anterior=None, rollups_anteriores=None):
+    """
+    Atualiza as consolidações de um dataset recalculando apenas os anos alterados
+    em relação à versão anterior. Sem versão anterior (ou sem todas as suas
+    consolidações), calcula tudo.
+
+    :param nova: Tabela Arrow da nova versão do dataset.
+    :param anterior: Tabela Arrow da versão anterior ou None.
+    :param rollups_anteriores: Consolidações da versão anterior ou None.
+    :return: Tupla (consolidações da nova versão, anos recalculados ou None se tudo foi calculado).
+    """
+    nomes = available_rollups(nova)
+    if anterior is None or not rollups_anteriores or any(nome not in rollups_anteriores for nome in nomes):
+        return compute_rollups(nova), None
+
+    alterados = changed_years(anterior, nova)
+    if not alterados:
+        return {nome: rollups_anteriores[nome] for nome in nomes}, alterados
+
+    parciais = compute_rollups(nova, alterados)
+    anos = pa.array(sorted(alterados), pa.int64())
+    rollups = {}
+    for nome in ROLLUPS_POR_ANO:
+        if nome not in nomes:
+            continue
+        base = rollups_anteriores[nome]
+        mantidas = base.filter(pc.invert(pc.is_in(pc.cast(base['Ano'], pa.int64()), value_set=anos)))
+        chaves = [coluna for coluna in base.column_names if coluna not in ('Quantidade', 'Valor (US$)', COLUNA_PRECO)]
+        rollups[nome] = pa.concat_tables([mantidas, parciais[nome].cast(base.schema)]) \
+            .sort_by([(chave, 'ascending') for chave in chaves])
+    if 'paises' in nomes:
+        rollups['paises'] = _totals(rollups['paises_ano'], _keys(nova, 'Países'))
+    return rollups, alterados
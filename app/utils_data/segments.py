@@ -0,0 +1,92 @@
+import struct
+import time
+
+from app.utils_data.cache import cache, segment_key, record_lookup, SEGMENT_TTL, STALE_TTL
+from app.utils_data.formats import serialize_arrow_ipc, deserialize_arrow_ipc, concat_tables
+from app.lazy import lazy_import
+
+pc = lazy_import('pyarrow.compute')
+
+
+# Cada segmento é gravado com o instante da gravação na frente do stream Arrow IPC
+_TIMESTAMP = struct.Struct('!d')
+
+
+def _pack_segment(tabela):
+    return _TIMESTAMP.pack(time.time()) + serialize_arrow_ipc(tabela)
+
+
+def _unpack_segment(valor):
+    (gravado_em,) = _TIMESTAMP.unpack_from(valor)
+    return gravado_em, valor[_TIMESTAMP.size:]
+
+
+def segment_cells(scraper, start_year, end_year):
+    """
+    Lista as células (ano, botão) que compõem uma consulta.
+
+    :param scraper: Instância da classe de raspagem (define os botões).
+    :param start_year: Ano de início.
+    :param end_year: Ano de término.
+    :return: Lista de tuplas (ano, classificação do botão ou None).
+    """
+    botoes = [botao['classificacao_botao'] for botao in scraper.get_botoes()] or [None]
+    return [(ano, botao) for ano in range(start_year, end_year + 1) for botao in botoes]
+
+
+def load_segments(nome, scraper, start_year, end_year, max_age=SEGMENT_TTL, backend=cache):
+    """
+    Monta o resultado de uma consulta a partir dos segmentos transformados em cache.
+
+    :param nome: Nome do dataset.
+    :param scraper: Instância da classe de raspagem.
+    :param start_year: Ano de início.
+    :param end_year: Ano de término.
+    :param max_age: Idade máxima aceita dos segmentos em segundos (None aceita segmentos vencidos).
+    :param backend: Backend de cache.
+    :return: Tabela Arrow ou None se algum segmento estiver ausente ou vencido.
+    """
+    camada = 'segmento' if max_age is not None else 'segmento_vencido'
+    cells = segment_cells(scraper, start_year, end_year)
+    valores = backend.get_many([segment_key(nome, ano, botao) for ano, botao in cells])
+    if any(valor is None for valor in valores):
+        record_lookup(camada, False)
+        return None
+    segmentos = [_unpack_segment(valor) for valor in valores]
+    if max_age is not None and any(time.time() - gravado_em > max_age for gravado_em, _ in segmentos):
+        record_lookup(camada, False)
+        return None
+    record_lookup(camada, True)
+    return concat_tables([deserialize_arrow_ipc(conteudo) for _, conteudo in segmentos])
+
+
+def store_segments(nome, scraper, tabela, start_year, end_year, backend=cache, exclude=()):
+    """
+    Divide o resultado transformado em segmentos (ano, botão) e os grava no cache.
+
+    Segmentos sem linhas também são gravados, para registrar que o ano não tem dados.
+    Eles permanecem no cache além da validade para servir de reserva quando o
+    prazo de uma requisição se esgota.
+
+    :param nome: Nome do dataset.
+    :param scraper: Instância da classe de raspagem.
+    :param tabela: Tabela Arrow transformada.
+    :param start_year: Ano de início.
+    :param end_year: Ano de término.
+    :param backend: Backend de cache.
+    :param exclude: Células (ano, botão) que não foram obtidas e não devem ser
+        gravadas como segmentos vazios.
+    """
+    if 'Ano' not in tabela.column_names:
+        return
+    tem_botao = 'Botao' in tabela.column_names
+    ausentes = set(exclude)
+    for ano, botao in segment_cells(scraper, start_year, end_year):
+        if (ano, botao) in ausentes:
+            continue
+        mask = pc.equal(tabela['Ano'], ano)
+        if botao is not None and tem_botao:
+            mask = pc.and_(mask, pc.equal(tabela['Botao'], botao))
+        segmento = tabela.filter(mask)
+        backend.set(segment_key(nome, ano, botao), _pack_segment(segmento), ttl=STALE_TTL)
+
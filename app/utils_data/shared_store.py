@@ -0,0 +1,505 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+from app.lazy import lazy_import
+
+pa = lazy_import('pyarrow')
+pc = lazy_import('pyarrow.compute')
+
+
+# Diretório compartilhado entre os workers com as versões publicadas dos datasets
+STORE_DIR = os.environ.get('VITIBRASIL_STORE_DIR', os.path.join(os.getcwd(), '.vitibrasil_store'))
+# Quantidade de versões antigas mantidas em disco após cada publicação
+STORE_KEEP_VERSIONS = int(os.environ.get('VITIBRASIL_STORE_KEEP', '3'))
+
+# Por quantos dias o registro de alterações de cada versão é mantido, independente
+# de VITIBRASIL_STORE_KEEP, para que clientes que sincronizam com pouca frequência
+# não precisem recarregar os datasets completos
+CHANGES_KEEP_DAYS = float(os.environ.get('VITIBRASIL_CHANGES_KEEP_DAYS', '30'))
+
+# Pasta, na raiz do repositório, com o registro de alterações de cada versão em
+# relação à anterior ('<versão>.arrow'), fora das pastas das versões
+CHANGES_DIR = 'changes'
+# Identificação de cada versão: conteúdo, data de publicação e manifesto de cada dataset
+SNAPSHOT_FILE = 'SNAPSHOT.json'
+# Manifesto das partições de cada dataset na pasta da versão
+MANIFEST_SUFFIX = '.manifest.json'
+# Partições anuais dos datasets, endereçadas pelo conteúdo e compartilhadas entre as versões
+OBJECTS_DIR = 'objects'
+
+
+class SharedDatasetStore:
+    """
+    Repositório de datasets em arquivos Arrow mapeados em memória.
+
+    Um único processo de atualização publica cada versão em ``versions/<n>/`` e troca
+    o ponteiro ``CURRENT`` de forma atômica. Os workers apenas mapeiam os arquivos em
+    modo somente leitura, então as páginas ficam no cache do sistema operacional e são
+    compartilhadas por todos os processos.
+
+    Cada dataset é gravado em partições anuais imutáveis em ``objects/``, nomeadas
+    pelo SHA-256 do conteúdo, e a versão guarda apenas o manifesto das partições.
+    Anos que não mudaram entre versões apontam para o mesmo arquivo, então o
+    espaço em disco cresce só com as alterações e qualquer versão mantida é lida
+    tão rápido quanto a atual.
+    """
+
+    def __init__(self, root=STORE_DIR, keep_versions=STORE_KEEP_VERSIONS, changes_keep_days=CHANGES_KEEP_DAYS):
+        """
+        Inicializa o repositório compartilhado.
+
+        :param root: Diretório raiz do repositório.
+        :param keep_versions: Quantidade de versões mantidas em disco.
+        :param changes_keep_days: Dias em que o registro de alterações de cada versão é mantido.
+        """
+        self.root = root
+        self.keep_versions = keep_versions
+        self.changes_keep_days = changes_keep_days
+        self._current_path = os.path.join(root, 'CURRENT')
+        self._current_stat = None
+        self._current_version = None
+        self._tables = {}
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def version_dir(self, version):
+        """
+        Obtém o diretório de uma versão publicada.
+
+        :param version: Número da versão.
+        :return: Caminho do diretório da versão.
+        """
+        return os.path.join(self.root, 'versions', str(version))
+
+    def current_version(self):
+        """
+        Lê a versão publicada atualmente, relendo o ponteiro apenas quando ele muda.
+
+        :return: Número da versão atual ou None se nada foi publicado.
+        """
+        try:
+            stat = os.stat(self._current_path)
+        except FileNotFoundError:
+            return None
+        chave = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if chave != self._current_stat:
+                with open(self._current_path) as f:
+                    self._current_version = int(f.read().strip())
+                self._current_stat = chave
+                # Descarta os mapeamentos das versões fora do limite de retenção
+                minima = self._current_version - self.keep_versions
+                self._tables = {k: v for k, v in self._tables.items() if k[0] > minima}
+                self._snapshots = {k: v for k, v in self._snapshots.items() if k > minima}
+            return self._current_version
+
+    def get_table(self, nome, version=None):
+        """
+        Obtém a tabela Arrow de um dataset, com as partições anuais mapeadas em memória.
+
+        :param nome: Nome do dataset.
+        :param version: Número da versão (padrão: versão atual).
+        :return: Tabela Arrow ou None se o dataset não estiver publicado na versão.
+        """
+        atual = self.current_version()
+        if version is None:
+            version = atual
+        if version is None:
+            return None
+        chave = (version, manifest_filename(nome))
+        tabela = self._tables.get(chave)
+        if tabela is not None:
+            return tabela
+
+        manifesto = _read_json(os.path.join(self.version_dir(version), manifest_filename(nome)))
+        if manifesto is None:
+            return None
+        partes = []
+        for objeto in [manifesto['esquema'], *(p['objeto'] for p in manifesto['particoes'])]:
+            try:
+                partes.append(pa.ipc.open_file(pa.memory_map(self._object_path(objeto), 'r')).read_all())
+            except FileNotFoundError:
+                return None
+        tabela = pa.concat_tables(partes)
+        with self._lock:
+            self._tables[chave] = tabela
+        return tabela
+
+    def snapshot(self, version):
+        """
+        Obtém a identificação de uma versão publicada: o identificador do conteúdo
+        (SHA-256 dos manifestos dos datasets), a data de publicação e os manifestos.
+
+        :param version: Número da versão.
+        :return: Dicionário da versão ou None se ela não existir mais.
+        """
+        snapshot = self._snapshots.get(version)
+        if snapshot is None:
+            snapshot = _read_json(os.path.join(self.version_dir(version), SNAPSHOT_FILE))
+            if snapshot is None:
+                return None
+            # As versões são imutáveis, então a identificação pode ficar em memória
+            with self._lock:
+                self._snapshots[version] = snapshot
+        return snapshot
+
+    def snapshots(self):
+        """
+        Lista as versões mantidas em disco, da mais antiga para a mais recente.
+
+        :return: Lista de dicionários de versão (ver snapshot).
+        """
+        snapshots = [self.snapshot(version) for version in self.published_versions()]
+        return [snapshot for snapshot in snapshots if snapshot is not None]
+
+    def get_rollup(self, nome, rollup):
+        """
+        Obtém uma consolidação de um dataset na versão atual, mapeada em memória.
+
+        :param nome: Nome do dataset.
+        :param rollup: Nome da consolidação (ver app/utils_data/rollups.py).
+        :return: Tabela Arrow ou None se a consolidação não estiver publicada.
+        """
+        return self._read(rollup_filename(nome, rollup))
+
+    def get_changes(self, version):
+        """
+        Obtém o registro de alterações de uma versão publicada em relação à anterior.
+        O registro é mantido por changes_keep_days, mesmo depois de a versão ser descartada.
+
+        :param version: Número da versão.
+        :return: Tabela Arrow ou None se o registro não existir mais.
+        """
+        try:
+            source = pa.memory_map(self.changes_path(version), 'r')
+        except FileNotFoundError:
+            return None
+        return pa.ipc.open_file(source).read_all()
+
+    def changes_path(self, version):
+        """
+        Obtém o caminho do registro de alterações de uma versão.
+
+        :param version: Número da versão.
+        :return: Caminho do arquivo Arrow.
+        """
+        return os.path.join(self.root, CHANGES_DIR, f'{version}.arrow')
+
+    def get_rollups(self, nome, rollups):
+        """
+        Obtém as consolidações publicadas de um dataset na versão atual.
+
+        :param nome: Nome do dataset.
+        :param rollups: Nomes das consolidações.
+        :return: Dicionário nome da consolidação -> tabela Arrow, só com as publicadas.
+        """
+        tabelas = {rollup: self.get_rollup(nome, rollup) for rollup in rollups}
+        return {rollup: tabela for rollup, tabela in tabelas.items() if tabela is not None}
+
+    def _read(self, arquivo, version=None):
+        """
+        Mapeia em memória um arquivo Arrow de uma versão, reaproveitando o
+        mapeamento já aberto.
+
+        :param arquivo: Nome do arquivo na pasta da versão.
+        :param version: Número da versão (padrão: versão atual).
+        :return: Tabela Arrow ou None se nada foi publicado ou o arquivo não existir.
+        """
+        atual = self.current_version()
+        if version is None:
+            version = atual
+        if version is None:
+            return None
+        chave = (version, arquivo)
+        tabela = self._tables.get(chave)
+        if tabela is None:
+            path = os.path.join(self.version_dir(version), arquivo)
+            try:
+                source = pa.memory_map(path, 'r')
+            except FileNotFoundError:
+                return None
+            tabela = pa.ipc.open_file(source).read_all()
+            with self._lock:
+                self._tables[chave] = tabela
+        return tabela
+
+    def publish(self, tabelas, rollups=None, changes=None):
+        """
+        Publica uma nova versão com as tabelas fornecidas. Só as partições anuais
+        com conteúdo novo são gravadas; datasets não informados (e suas
+        consolidações) são reaproveitados da versão anterior por hard link, sem cópia.
+
+        :param tabelas: Dicionário nome do dataset -> tabela Arrow.
+        :param rollups: Dicionário nome do dataset -> {nome da consolidação: tabela Arrow}.
+        :param changes: Registro das alterações em relação à versão anterior (tabela Arrow).
+        :return: Número da versão publicada.
+        """
+        os.makedirs(os.path.join(self.root, 'versions'), exist_ok=True)
+        with self._publish_lock():
+            anterior = self.current_version()
+            nova = (anterior or 0) + 1
+            destino = self.version_dir(nova)
+            tmp = destino + '.tmp'
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+
+            for nome, tabela in tabelas.items():
+                _write_json(self._write_partitions(tabela), os.path.join(tmp, manifest_filename(nome)))
+            for nome, consolidacoes in (rollups or {}).items():
+                for rollup, tabela in consolidacoes.items():
+                    write_arrow_file(tabela, os.path.join(tmp, rollup_filename(nome, rollup)))
+
+            if anterior is not None:
+                anterior_dir = self.version_dir(anterior)
+                for arquivo in os.listdir(anterior_dir):
+                    if arquivo == SNAPSHOT_FILE or os.path.exists(os.path.join(tmp, arquivo)):
+                        continue
+                    os.link(os.path.join(anterior_dir, arquivo), os.path.join(tmp, arquivo))
+
+            _write_json(_describe_snapshot(tmp, nova), os.path.join(tmp, SNAPSHOT_FILE))
+            if changes is not None:
+                # Gravado antes da troca do ponteiro, para que a versão nunca fique sem registro
+                os.makedirs(os.path.join(self.root, CHANGES_DIR), exist_ok=True)
+                write_arrow_file(changes, self.changes_path(nova) + '.tmp')
+                os.replace(self.changes_path(nova) + '.tmp', self.changes_path(nova))
+            os.rename(tmp, destino)
+            self._write_current(nova)
+            self._cleanup(nova)
+            return nova
+
+    def _write_partitions(self, tabela):
+        """
+        Grava as partições anuais de um dataset em ``objects/``, pulando as que já
+        existem com o mesmo conteúdo.
+
+        :param tabela: Tabela Arrow do dataset, com a coluna 'Ano'.
+        :return: Manifesto do dataset: o objeto do esquema (tabela vazia) e o
+            objeto e a quantidade de linhas de cada ano, em ordem crescente de ano.
+        """
+        os.makedirs(os.path.join(self.root, OBJECTS_DIR), exist_ok=True)
+        particoes = []
+        for ano in sorted(pc.unique(tabela['Ano']).drop_null().to_pylist()):
+            parte = tabela.filter(pc.equal(tabela['Ano'], ano))
+            particoes.append({'ano': ano, 'linhas': parte.num_rows, 'objeto': self._write_object(parte)})
+        return {'esquema': self._write_object(tabela.schema.empty_table()), 'particoes': particoes}
+
+    def _write_object(self, tabela):
+        """
+        Grava uma tabela em ``objects/`` com o SHA-256 do conteúdo como nome.
+
+        :param tabela: Tabela Arrow.
+        :return: SHA-256 (hexadecimal) do arquivo Arrow IPC.
+        """
+        sink = pa.BufferOutputStream()
+        # Um único lote por partição, para que o mesmo conteúdo gere sempre os mesmos bytes
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela.combine_chunks())
+        conteudo = sink.getvalue()
+        objeto = hashlib.sha256(conteudo).hexdigest()
+        path = self._object_path(objeto)
+        if not os.path.exists(path):
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(conteudo)
+            os.replace(tmp, path)
+        return objeto
+
+    def _object_path(self, objeto):
+        """
+        Obtém o caminho de uma partição endereçada pelo conteúdo.
+
+        :param objeto: SHA-256 do conteúdo.
+        :return: Caminho do arquivo.
+        """
+        return os.path.join(self.root, OBJECTS_DIR, f'{objeto}.arrow')
+
+    def _write_current(self, version):
+        """
+        Troca o ponteiro da versão atual de forma atômica.
+
+        :param version: Número da nova versão.
+        """
+        tmp = self._current_path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(str(version))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._current_path)
+
+    def _cleanup(self, atual):
+        """
+        Remove as versões mais antigas que o limite de retenção e os registros de
+        alterações mais antigos que changes_keep_days (os das versões mantidas
+        nunca são removidos).
+
+        Workers que ainda mapeiam arquivos removidos continuam lendo normalmente,
+        pois o conteúdo só é liberado quando o último mapeamento é fechado.
+
+        :param atual: Número da versão atual.
+        """
+        for version in self.published_versions():
+            if version <= atual - self.keep_versions:
+                shutil.rmtree(self.version_dir(version), ignore_errors=True)
+
+        # Partições que nenhuma versão mantida referencia
+        referenciados = set()
+        for version in self.published_versions():
+            version_dir = self.version_dir(version)
+            for arquivo in os.listdir(version_dir):
+                if arquivo.endswith(MANIFEST_SUFFIX):
+                    manifesto = _read_json(os.path.join(version_dir, arquivo)) or {'particoes': []}
+                    referenciados.add(manifesto.get('esquema'))
+                    referenciados.update(p['objeto'] for p in manifesto['particoes'])
+        objects_dir = os.path.join(self.root, OBJECTS_DIR)
+        for arquivo in os.listdir(objects_dir) if os.path.isdir(objects_dir) else []:
+            if arquivo.split('.')[0] not in referenciados:
+                os.remove(os.path.join(objects_dir, arquivo))
+
+        changes_dir = os.path.join(self.root, CHANGES_DIR)
+        limite = time.time() - self.changes_keep_days * 24 * 60 * 60
+        for arquivo in os.listdir(changes_dir) if os.path.isdir(changes_dir) else []:
+            version = arquivo.split('.')[0]
+            if not version.isdigit() or int(version) > atual - self.keep_versions:
+                continue
+            path = os.path.join(changes_dir, arquivo)
+            if os.path.getmtime(path) < limite:
+                os.remove(path)
+
+    def published_versions(self):
+        """
+        Lista as versões presentes em disco.
+
+        :return: Lista de números de versão.
+        """
+        versions_dir = os.path.join(self.root, 'versions')
+        if not os.path.isdir(versions_dir):
+            return []
+        return sorted(int(nome) for nome in os.listdir(versions_dir) if nome.isdigit())
+
+    def _publish_lock(self):
+        """
+        Trava exclusiva entre processos para a publicação de versões.
+
+        :return: Gerenciador de contexto da trava.
+        """
+        return _FileLock(os.path.join(self.root, '.publish.lock'))
+
+
+class _FileLock:
+    """Trava de arquivo exclusiva (flock) usada para serializar publicações."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+
+
+def manifest_filename(nome):
+    """
+    Obtém o nome do manifesto das partições de um dataset na pasta da versão.
+
+    :param nome: Nome do dataset.
+    :return: Nome do arquivo.
+    """
+    return f'{nome}{MANIFEST_SUFFIX}'
+
+
+def _describe_snapshot(version_dir, version):
+    """
+    Monta a identificação de uma versão a partir dos manifestos dos datasets.
+
+    :param version_dir: Pasta da versão, com os manifestos já gravados.
+    :param version: Número da versão.
+    :return: Dicionário com a versão, o identificador do conteúdo, a data de publicação e os manifestos.
+    """
+    datasets = {}
+    for arquivo in sorted(os.listdir(version_dir)):
+        if arquivo.endswith(MANIFEST_SUFFIX):
+            with open(os.path.join(version_dir, arquivo), 'rb') as f:
+                datasets[arquivo[:-len(MANIFEST_SUFFIX)]] = hashlib.sha256(f.read()).hexdigest()
+    return {
+        'versao': version,
+        'id': hashlib.sha256(json.dumps(datasets, sort_keys=True).encode('utf-8')).hexdigest(),
+        'publicado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'datasets': datasets,
+    }
+
+
+def _read_json(path):
+    """Lê um arquivo JSON, ou None se ele não existir."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(dados, path):
+    """Grava um arquivo JSON com as chaves ordenadas, para que o mesmo conteúdo gere os mesmos bytes."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, sort_keys=True, ensure_ascii=False)
+
+
+def rollup_filename(nome, rollup):
+    """
+    Obtém o nome do arquivo de uma consolidação na pasta da versão.
+
+    :param nome: Nome do dataset.
+    :param rollup: Nome da consolidação.
+    :return: Nome do arquivo.
+    """
+    return f'{nome}.rollup.{rollup}.arrow'
+
+
+def write_arrow_file(tabela, path):
+    """
+    Grava uma tabela no formato de arquivo Arrow IPC, adequado para mapeamento em memória.
+
+    :param tabela: Tabela Arrow.
+    :param path: Caminho do arquivo de destino.
+    """
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+
+
+def filter_table(tabela, start_year, end_year, botao=None):
+    """
+    Filtra uma tabela Arrow pelo intervalo de anos e, opcionalmente, pelo botão.
+
+    :param tabela: Tabela Arrow com a coluna 'Ano' (e 'Botao', se aplicável).
+    :param start_year: Ano de início.
+    :param end_year: Ano de término.
+    :param botao: Opção de botão para filtrar os dados, se aplicável.
+    :return: Tabela Arrow filtrada.
+    """
+    mask = pc.and_(
+        pc.greater_equal(tabela['Ano'], start_year),
+        pc.less_equal(tabela['Ano'], end_year)
+    )
+    if botao is not None and 'Botao' in tabela.column_names:
+        mask = pc.and_(mask, pc.equal(tabela['Botao'], botao['classificacao_botao']))
+    return tabela.filter(mask)
+
+
+shared_store = SharedDatasetStore()
@@ -0,0 +1,58 @@
+import threading
+
+
+class _Chamada:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas simultâneas com a mesma chave: a primeira executa a função e
+    as demais aguardam e recebem o mesmo resultado (ou a mesma exceção).
+
+    Evita, por exemplo, que consultas concorrentes baixem a mesma página do site
+    ao mesmo tempo antes de ela chegar ao cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chamadas = {}
+
+    def do(self, key, funcao, *args, timeout=None, **kwargs):
+        """
+        Executa a função uma única vez por chave entre as chamadas simultâneas.
+
+        :param key: Chave que identifica a chamada.
+        :param funcao: Função a executar.
+        :param args: Argumentos posicionais da função.
+        :param timeout: Tempo máximo de espera pelo resultado de outra chamada (None espera indefinidamente).
+        :param kwargs: Argumentos nomeados da função.
+        :return: Tupla (resultado da função, True se o resultado veio de outra chamada).
+        :raises TimeoutError: Se o resultado da outra chamada não chegar dentro do tempo.
+        """
+        with self._lock:
+            chamada = self._chamadas.get(key)
+            lider = chamada is None
+            if lider:
+                chamada = self._chamadas[key] = _Chamada()
+
+        if not lider:
+            if not chamada.event.wait(timeout):
+                raise TimeoutError(f'Tempo esgotado aguardando a chamada em andamento: {key}')
+            if chamada.error is not None:
+                raise chamada.error
+            return chamada.result, True
+
+        try:
+            chamada.result = funcao(*args, **kwargs)
+            return chamada.result, False
+        except BaseException as e:
+            chamada.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._chamadas[key]
+            chamada.event.set()
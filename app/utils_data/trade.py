@@ -0,0 +1,84 @@
+from app.utils_data.aggregation import detail_rows, numeric
+from app.utils_data.rollups import COLUNA_PRECO
+from app.lazy import lazy_import
+
+pa = lazy_import('pyarrow')
+pc = lazy_import('pyarrow.compute')
+
+
+# Chave da junção entre importação e exportação
+CHAVES_COMERCIO = ['Países', 'Ano', 'Botao']
+
+
+def trade_totals(tabela):
+    """
+    Indexa um dataset de comércio exterior pela chave (Países, Ano, Botao), somando
+    Quantidade e Valor (US$) das linhas de detalhe de cada chave.
+
+    :param tabela: Tabela Arrow da importação ou da exportação.
+    :return: Tabela Arrow com uma linha por chave, ordenada pela chave.
+    """
+    detalhe = detail_rows(tabela)
+    base = pa.table({
+        **{chave: detalhe[chave] for chave in CHAVES_COMERCIO},
+        'Quantidade': pc.cast(numeric(detalhe['Quantidade']), pa.float64()),
+        'Valor (US$)': pc.cast(numeric(detalhe['Valor (US$)']), pa.float64()),
+    })
+    totais = base.group_by(CHAVES_COMERCIO).aggregate([('Quantidade', 'sum'), ('Valor (US$)', 'sum')])
+    return totais.select([*CHAVES_COMERCIO, 'Quantidade_sum', 'Valor (US$)_sum']) \
+        .rename_columns([*CHAVES_COMERCIO, 'Quantidade', 'Valor (US$)']) \
+        .sort_by([(chave, 'ascending') for chave in CHAVES_COMERCIO])
+
+
+def filter_trade(totais, start_year, end_year, classificacao_botao=None):
+    """
+    Filtra os totais indexados pelo intervalo de anos e, opcionalmente, pelo botão.
+
+    :param totais: Tabela Arrow retornada por trade_totals.
+    :param start_year: Ano de início.
+    :param end_year: Ano de término.
+    :param classificacao_botao: Classificação do botão ou None.
+    :return: Tabela Arrow filtrada.
+    """
+    mask = pc.and_(pc.greater_equal(totais['Ano'], start_year), pc.less_equal(totais['Ano'], end_year))
+    if classificacao_botao is not None:
+        mask = pc.and_(mask, pc.equal(totais['Botao'], classificacao_botao))
+    return totais.filter(mask)
+
+
+def _unit_value(valor, quantidade):
+    """Valor unitário em US$/kg, nulo quando a quantidade for zero."""
+    return pc.if_else(pc.greater(quantidade, 0), pc.divide(valor, quantidade), None)
+
+
+def trade_balance(exportacao, importacao):
+    """
+    Junta os totais de exportação e importação pela chave (Países, Ano, Botao), por
+    hash join, e calcula o saldo e o valor unitário de cada lado. Chaves presentes
+    em só um dos lados têm o outro lado como zero no saldo.
+
+    :param exportacao: Totais da exportação (trade_totals).
+    :param importacao: Totais da importação (trade_totals).
+    :return: Tabela Arrow com os totais de cada lado, o saldo e o US$/kg, ordenada pela chave.
+    """
+    metricas = ('Quantidade', 'Valor (US$)')
+    exp = exportacao.rename_columns([f'{c} Exportação' if c in metricas else c for c in exportacao.column_names])
+    imp = importacao.rename_columns([f'{c} Importação' if c in metricas else c for c in importacao.column_names])
+    junta = exp.join(imp, keys=CHAVES_COMERCIO, join_type='full outer', coalesce_keys=True)
+
+    qtd_exp = pc.fill_null(junta['Quantidade Exportação'], 0.0)
+    qtd_imp = pc.fill_null(junta['Quantidade Importação'], 0.0)
+    valor_exp = pc.fill_null(junta['Valor (US$) Exportação'], 0.0)
+    valor_imp = pc.fill_null(junta['Valor (US$) Importação'], 0.0)
+    resultado = pa.table({
+        **{chave: junta[chave] for chave in CHAVES_COMERCIO},
+        'Quantidade Exportação': qtd_exp,
+        'Valor (US$) Exportação': valor_exp,
+        'Quantidade Importação': qtd_imp,
+        'Valor (US$) Importação': valor_imp,
+        'Saldo Quantidade': pc.subtract(qtd_exp, qtd_imp),
+        'Saldo (US$)': pc.subtract(valor_exp, valor_imp),
+        f'{COLUNA_PRECO} Exportação': _unit_value(valor_exp, qtd_exp),
+        f'{COLUNA_PRECO} Importação': _unit_value(valor_imp, qtd_imp),
+    })
+    return resultado.sort_by([(chave, 'ascending') for chave in CHAVES_COMERCIO])
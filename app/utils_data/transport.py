@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from app.utils_data.cache import record_lookup
+
+
+# Modo de transporte das requisições ao site da Embrapa:
+#   live   - acessa o site normalmente
+#   record - acessa o site e grava cada resposta no arquivo
+#   replay - serve as respostas do arquivo, sem acessar a rede
+TRANSPORT_MODE = os.environ.get('VITIBRASIL_TRANSPORT', 'live')
+# Diretório do arquivo de respostas (endereçado por conteúdo)
+ARCHIVE_DIR = os.environ.get('VITIBRASIL_ARCHIVE_DIR', os.path.join(os.getcwd(), '.vitibrasil_archive'))
+# Nos modos live e record, serve a resposta do arquivo quando o site estiver fora do ar
+ARCHIVE_FALLBACK = os.environ.get('VITIBRASIL_ARCHIVE_FALLBACK') == '1'
+
+MODOS_TRANSPORTE = ('live', 'record', 'replay')
+
+
+class ArchiveMiss(requests.exceptions.ConnectionError):
+    """A resposta solicitada não está no arquivo (modo replay)."""
+
+
+def request_key(url, params=None):
+    """
+    Monta a chave de uma requisição: caminho e query ordenada, sem o endereço do
+    site, para que o arquivo sirva também quando o site for acessado por outro
+    endereço (espelho ou stub).
+
+    :param url: URL da requisição.
+    :param params: Parâmetros da requisição.
+    :return: Chave da requisição.
+    """
+    partes = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(partes.query) + [(str(k), str(v)) for k, v in (params or {}).items()]))
+    return f'{partes.path}?{query}' if query else partes.path
+
+
+class ResponseArchive:
+    """
+    Arquivo de respostas endereçado por conteúdo.
+
+    O corpo de cada resposta fica em ``objects/<sha256>`` (respostas idênticas
+    são gravadas uma única vez) e o índice ``index/<hash da chave>.json`` aponta
+    a requisição para o corpo, com status e cabeçalhos.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        """
+        Inicializa o arquivo.
+
+        :param directory: Diretório do arquivo.
+        """
+        self.directory = directory
+
+    def _index_path(self, key):
+        return os.path.join(self.directory, 'index', hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def store(self, url, params, response):
+        """
+        Grava uma resposta no arquivo.
+
+        :param url: URL da requisição.
+        :param params: Parâmetros da requisição.
+        :param response: Resposta obtida do site.
+        """
+        key = request_key(url, params)
+        conteudo = response.content
+        digest = hashlib.sha256(conteudo).hexdigest()
+        if not os.path.exists(self._object_path(digest)):
+            self._write_atomic(self._object_path(digest), conteudo)
+        entrada = {
+            'key': key,
+            'url': response.url or url,
+            'status': response.status_code,
+            'headers': {nome: valor for nome, valor in response.headers.items() if nome.lower() == 'content-type'},
+            'encoding': response.encoding,
+            'sha256': digest,
+            'size': len(conteudo),
+            'recorded_at': time.time(),
+        }
+        self._write_atomic(self._index_path(key), json.dumps(entrada, ensure_ascii=False).encode('utf-8'))
+
+    def load(self, url, params=None):
+        """
+        Obtém uma resposta gravada.
+
+        :param url: URL da requisição.
+        :param params: Parâmetros da requisição.
+        :return: Objeto Response reconstruído ou None se a requisição não estiver no arquivo.
+        """
+        try:
+            with open(self._index_path(request_key(url, params)), encoding='utf-8') as f:
+                entrada = json.load(f)
+            with open(self._object_path(entrada['sha256']), 'rb') as f:
+                conteudo = f.read()
+        except FileNotFoundError:
+            return None
+        response = requests.models.Response()
+        response.status_code = entrada['status']
+        response._content = conteudo
+        response.headers = CaseInsensitiveDict(entrada.get('headers', {}))
+        response.encoding = entrada.get('encoding')
+        response.url = entrada['url']
+        response.reason = 'OK' if entrada['status'] < 400 else ''
+        return response
+
+
+class Transport:
+    """Executa as requisições GET ao site conforme o modo configurado."""
+
+    def __init__(self, mode=TRANSPORT_MODE, archive=None, fallback=ARCHIVE_FALLBACK):
+        """
+        Inicializa o transporte.
+
+        :param mode: Modo de transporte ('live', 'record' ou 'replay').
+        :param archive: Arquivo de respostas (padrão: ResponseArchive em ARCHIVE_DIR).
+        :param fallback: Nos modos live e record, usa o arquivo quando o site falhar.
+        :raises ValueError: Se o modo não for suportado.
+        """
+        if mode not in MODOS_TRANSPORTE:
+            raise ValueError(f"Modo de transporte não suportado: escolha entre {', '.join(MODOS_TRANSPORTE)}")
+        self.mode = mode
+        self.archive = archive or ResponseArchive()
+        self.fallback = fallback
+
+    @property
+    def offline(self):
+        """True se as requisições são servidas apenas do arquivo, sem acessar a rede."""
+        return self.mode == 'replay'
+
+    def _from_archive(self, url, params):
+        response = self.archive.load(url, params)
+        record_lookup('arquivo', response is not None)
+        return response
+
+    def get(self, url, params=None, **kwargs):
+        """
+        Faz uma requisição GET.
+
+        :param url: URL da requisição.
+        :param params: Parâmetros da requisição.
+        :param kwargs: Argumentos adicionais repassados para requests.get.
+        :return: Objeto Response.
+        :raises ArchiveMiss: No modo replay, se a requisição não estiver no arquivo.
+        """
+        if self.offline:
+            response = self._from_archive(url, params)
+            if response is None:
+                raise ArchiveMiss(f'Resposta não encontrada no arquivo: {request_key(url, params)}')
+            return response
+
+        try:
+            response = requests.get(url, params=params, **kwargs)
+        except requests.exceptions.RequestException:
+            response = self._from_archive(url, params) if self.fallback else None
+            if response is None:
+                raise
+            return response
+        if response.status_code >= 500 and self.fallback:
+            return self._from_archive(url, params) or response
+        if self.mode == 'record' and response.ok:
+            self.archive.store(url, params, response)
+        return response
+
+
+transport = Transport()
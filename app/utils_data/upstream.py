@@ -0,0 +1,270 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+
+from app.metrics import registry
+from app.utils_data.deadline import current_deadline, upstream_timeout, DeadlineExceeded
+from app.utils_data.singleflight import SingleFlight
+from app.utils_data.transport import transport, request_key
+
+
+# Requisições por segundo permitidas ao site da Embrapa, por processo (0 desativa o limite)
+UPSTREAM_RATE = float(os.environ.get('VITIBRASIL_UPSTREAM_RATE', '5'))
+# Quantidade de requisições que podem ser feitas em rajada antes de o limite atuar
+UPSTREAM_BURST = int(os.environ.get('VITIBRASIL_UPSTREAM_BURST', '10'))
+
+# Classes de prioridade: valores menores são atendidos primeiro
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_BACKGROUND = 1
+NOMES_PRIORIDADES = {PRIORIDADE_INTERATIVA: 'interativa', PRIORIDADE_BACKGROUND: 'background'}
+
+_prioridade_atual = ContextVar('vitibrasil_upstream_prioridade', default=PRIORIDADE_INTERATIVA)
+
+UPSTREAM_QUEUE_DELAY = registry.histogram(
+    'vitibrasil_upstream_queue_delay_seconds',
+    'Tempo de espera no limitador antes de cada requisição ao site da Embrapa',
+    ['prioridade'],
+)
+UPSTREAM_REQUESTS = registry.counter(
+    'vitibrasil_upstream_requests_total',
+    'Requisições feitas ao site da Embrapa',
+    ['prioridade'],
+)
+UPSTREAM_ERRORS = registry.counter(
+    'vitibrasil_upstream_errors_total',
+    'Erros nas requisições ao site da Embrapa (falhas de conexão, timeouts e respostas HTTP de erro)',
+    ['motivo'],
+)
+UPSTREAM_SHARED = registry.counter(
+    'vitibrasil_upstream_shared_total',
+    'Requisições ao site da Embrapa atendidas pela resposta de uma requisição idêntica já em andamento',
+)
+
+
+class RateLimitTimeout(requests.exceptions.RequestException):
+    """O limitador não liberou a requisição dentro do tempo máximo de espera."""
+
+
+class Pedido:
+    """Vez de uma requisição na fila do limitador, cuja prioridade pode ser elevada enquanto aguarda."""
+
+    def __init__(self, priority=PRIORIDADE_INTERATIVA):
+        """
+        :param priority: Classe de prioridade inicial.
+        """
+        self.priority = priority
+        self.entrada = None
+
+
+class TokenBucketLimiter:
+    """
+    Limitador token bucket com fila por prioridade.
+
+    Os tokens são repostos a ``rate`` por segundo até o máximo de ``burst``. Quando
+    não há token disponível, as chamadas esperam numa fila ordenada por prioridade
+    e ordem de chegada, de modo que requisições interativas passam à frente das
+    atualizações em segundo plano.
+    """
+
+    def __init__(self, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST):
+        """
+        Inicializa o limitador.
+
+        :param rate: Tokens repostos por segundo (0 ou negativo desativa o limite).
+        :param burst: Capacidade máxima do bucket.
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        agora = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (agora - self._updated) * self.rate)
+        self._updated = agora
+
+    def acquire(self, priority=PRIORIDADE_INTERATIVA, timeout=None, pedido=None):
+        """
+        Aguarda a liberação de uma requisição.
+
+        :param priority: Classe de prioridade da requisição (ignorada se `pedido` for informado).
+        :param timeout: Tempo máximo de espera em segundos (None espera indefinidamente).
+        :param pedido: Vez na fila, para que a prioridade possa ser elevada com promote.
+        :return: Tempo de espera em segundos.
+        :raises RateLimitTimeout: Se o tempo máximo de espera for excedido.
+        """
+        inicio = time.monotonic()
+        if self.rate <= 0:
+            return 0.0
+        limite = None if timeout is None else inicio + timeout
+        pedido = pedido or Pedido(priority)
+        with self._cond:
+            pedido.entrada = (pedido.priority, next(self._seq))
+            heapq.heappush(self._waiters, pedido.entrada)
+            try:
+                while True:
+                    self._refill()
+                    primeiro = self._waiters[0] == pedido.entrada
+                    if primeiro and self._tokens >= 1:
+                        self._tokens -= 1
+                        heapq.heappop(self._waiters)
+                        break
+                    espera = (1 - self._tokens) / self.rate if primeiro else None
+                    if limite is not None:
+                        restante = limite - time.monotonic()
+                        if restante <= 0:
+                            self._waiters.remove(pedido.entrada)
+                            heapq.heapify(self._waiters)
+                            raise RateLimitTimeout('Tempo de espera do limitador de requisições excedido')
+                        espera = restante if espera is None else min(espera, restante)
+                    self._cond.wait(espera)
+            finally:
+                pedido.entrada = None
+                # Acorda o próximo da fila para que ele reavalie sua vez
+                self._cond.notify_all()
+        return time.monotonic() - inicio
+
+    def promote(self, pedido, priority):
+        """
+        Eleva a prioridade de um pedido, inclusive se ele já estiver na fila. A
+        ordem de chegada é mantida dentro da nova classe.
+
+        :param pedido: Vez na fila.
+        :param priority: Nova classe de prioridade (ignorada se for menor que a atual).
+        """
+        with self._cond:
+            if priority >= pedido.priority:
+                return
+            pedido.priority = priority
+            if pedido.entrada is not None:
+                self._waiters.remove(pedido.entrada)
+                pedido.entrada = (priority, pedido.entrada[1])
+                self._waiters.append(pedido.entrada)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+
+limiter = TokenBucketLimiter()
+# Requisições ao site em andamento, compartilhadas entre chamadas idênticas simultâneas
+_em_andamento = SingleFlight()
+# Vez no limitador de cada requisição em andamento e quantas chamadas a aguardam:
+# a vez fica com a maior prioridade entre as chamadas
+_pedidos = {}
+_pedidos_lock = threading.Lock()
+
+
+def current_priority():
+    """
+    Obtém a classe de prioridade do contexto atual.
+
+    :return: Classe de prioridade.
+    """
+    return _prioridade_atual.get()
+
+
+@contextmanager
+def upstream_priority(priority):
+    """
+    Define a classe de prioridade das requisições feitas dentro do bloco.
+
+    :param priority: Classe de prioridade (PRIORIDADE_INTERATIVA ou PRIORIDADE_BACKGROUND).
+    """
+    token = _prioridade_atual.set(priority)
+    try:
+        yield
+    finally:
+        _prioridade_atual.reset(token)
+
+
+def upstream_get(url, params=None, **kwargs):
+    """
+    Faz uma requisição GET ao site da Embrapa respeitando o limitador de requisições
+    e o prazo da requisição em andamento. No modo replay do transporte, a resposta
+    vem do arquivo, sem passar pelo limitador.
+
+    Requisições idênticas simultâneas (mesma URL e parâmetros) são feitas uma
+    única vez e compartilham a resposta. A requisição compartilhada aguarda no
+    limitador com a maior prioridade entre as chamadas: uma requisição interativa
+    que encontra a mesma página sendo buscada por uma atualização em segundo plano
+    não espera na fila de background.
+
+    :param url: URL para fazer a requisição.
+    :param params: Parâmetros para a requisição.
+    :param kwargs: Argumentos adicionais repassados para requests.get.
+    :return: Objeto Response da requisição.
+    :raises DeadlineExceeded: Se o prazo se esgotar antes da requisição.
+    """
+    if transport.offline:
+        return transport.get(url, params=params)
+    deadline = current_deadline()
+    chave = f'{urlsplit(url).netloc}{request_key(url, params)}'
+    pedido = _join_request(chave, current_priority())
+    try:
+        response, compartilhada = _em_andamento.do(
+            chave, _upstream_get, url, params, kwargs, pedido,
+            timeout=deadline.remaining() if deadline else None,
+        )
+    except TimeoutError:
+        raise DeadlineExceeded('Prazo esgotado aguardando requisição idêntica em andamento')
+    finally:
+        _leave_request(chave)
+    if compartilhada:
+        UPSTREAM_SHARED.inc()
+    return response
+
+
+def _join_request(chave, priority):
+    """
+    Registra uma chamada à requisição da chave, elevando a vez no limitador à
+    prioridade da chamada.
+
+    :param chave: Chave da requisição.
+    :param priority: Classe de prioridade da chamada.
+    :return: Vez da requisição no limitador.
+    """
+    with _pedidos_lock:
+        registro = _pedidos.get(chave)
+        if registro is None:
+            registro = _pedidos[chave] = [Pedido(priority), 0]
+        registro[1] += 1
+    limiter.promote(registro[0], priority)
+    return registro[0]
+
+
+def _leave_request(chave):
+    """Remove o registro de uma chamada à requisição da chave."""
+    with _pedidos_lock:
+        registro = _pedidos[chave]
+        registro[1] -= 1
+        if not registro[1]:
+            del _pedidos[chave]
+
+
+def _upstream_get(url, params, kwargs, pedido):
+    deadline = current_deadline()
+    try:
+        atraso = limiter.acquire(timeout=deadline.remaining() if deadline else None, pedido=pedido)
+    except RateLimitTimeout:
+        raise DeadlineExceeded('Prazo esgotado aguardando o limitador de requisições')
+    nome = NOMES_PRIORIDADES.get(pedido.priority, str(pedido.priority))
+    UPSTREAM_QUEUE_DELAY.observe(atraso, prioridade=nome)
+    UPSTREAM_REQUESTS.inc(prioridade=nome)
+    kwargs.setdefault('timeout', upstream_timeout())
+    try:
+        response = transport.get(url, params=params, **kwargs)
+    except requests.exceptions.RequestException as e:
+        UPSTREAM_ERRORS.inc(motivo=type(e).__name__)
+        raise
+    if response.status_code >= 400:
+        UPSTREAM_ERRORS.inc(motivo=f'http_{response.status_code}')
+    return response
@@ -1,5 +1,7 @@
 import requests
 
+from app.utils_data.upstream import upstream_get
+
 
 def health_check_site(url):
     """
@@ -9,7 +11,7 @@ def health_check_site(url):
     :return: True se o site estiver acessível, False caso contrário.
     """
     try:
-        response = requests.get(url)
+        response = upstream_get(url)
         response.raise_for_status()
         return True
     except requests.exceptions.RequestException:
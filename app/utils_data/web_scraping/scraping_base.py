@@ -1,8 +1,28 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import os
+import time
+from requests.exceptions import RequestException
 from unidecode import unidecode
 
+from app.metrics import stage_timer
+from app.utils_data.cache import cache, page_key, record_lookup, PAGE_TTL
+from app.utils_data.upstream import upstream_get
+from app.utils_data.transport import ArchiveMiss
+from app.utils_data.deadline import current_deadline
+from app.lazy import lazy_import
+
+bs4 = lazy_import('bs4')
+pd = lazy_import('pandas')
+
+
+# Tentativas extras por página antes de marcá-la como falha, e espera inicial entre elas
+PAGE_RETRIES = int(os.environ.get('VITIBRASIL_PAGE_RETRIES', '2'))
+PAGE_RETRY_BACKOFF = float(os.environ.get('VITIBRASIL_PAGE_RETRY_BACKOFF', '1'))
+
+# Identificação da origem de cada linha na coluna 'Fonte'
+FONTE_SITE = 'SITE'
+FONTE_CSV = 'CSV'
+
+
 class ScraperBase:
     def __init__(self, url, anos):
         """
@@ -14,17 +34,26 @@ class ScraperBase:
         self.url = url
         self.anos = anos
         self.dados = pd.DataFrame()
+        self.segmentos = {}
+        self.celulas_falhas = []
 
     def fetch_data(self, url, params):
         """
-        Faz uma requisição GET para a URL fornecida com os parâmetros especificados.
+        Faz uma requisição GET para a URL fornecida com os parâmetros especificados,
+        reaproveitando a página do cache quando disponível.
 
         :param url: URL para fazer a requisição.
         :param params: Parâmetros para a requisição.
         :return: Conteúdo da resposta.
         """
-        response = requests.get(url, params=params)
+        key = page_key(url, params)
+        content = cache.get(key)
+        record_lookup('pagina', content is not None)
+        if content is not None:
+            return content
+        response = upstream_get(url, params=params)
         response.raise_for_status()
+        cache.set(key, response.content, ttl=PAGE_TTL)
         return response.content
 
     def parse_html(self, html):
@@ -34,7 +63,7 @@ class ScraperBase:
         :param html: Conteúdo HTML para analisar.
         :return: Objeto BeautifulSoup.
         """
-        return BeautifulSoup(html, 'html.parser')
+        return bs4.BeautifulSoup(html, 'html.parser')
 
     def extract_table(self, soup):
         """
@@ -84,38 +113,96 @@ class ScraperBase:
             rows.append(row_data)
         return pd.DataFrame(rows, columns=headers)
 
+    def fetch_cell(self, ano, botao=None):
+        """
+        Raspa a página de um ano e botão, retornando os dados extraídos.
+
+        :param ano: Ano da página.
+        :param botao: Botão opcional da página.
+        :return: DataFrame com os dados extraídos ou None se a tabela não for encontrada.
+        """
+        params = self.get_params(ano, botao) if botao else self.get_params(ano)
+        classificacao = botao['classificacao_botao'] if botao else None
+        with stage_timer('page_fetch', self.tipo, classificacao):
+            html = self.fetch_data(self.url, params)
+        with stage_timer('html_parse', self.tipo, classificacao):
+            soup = self.parse_html(html)
+            table = self.extract_table(soup)
+        if not table:
+            if botao:
+                print(f'Tabela não encontrada para o ano {ano} e botão {botao["value"]}.')
+            else:
+                print(f'Tabela não encontrada para o ano {ano}.')
+            return None
+        with stage_timer('extract_data', self.tipo, classificacao):
+            df = self.extract_data(table, classificacao) if botao else self.extract_data(table)
+        df['Ano'] = ano
+        return df
+
+    def fetch_cell_with_retry(self, ano, botao=None):
+        """
+        Raspa a página de um ano e botão, repetindo apenas essa página em caso de falha.
+
+        :param ano: Ano da página.
+        :param botao: Botão opcional da página.
+        :return: DataFrame com os dados extraídos ou None se a tabela não for encontrada.
+        :raises RequestException: Se todas as tentativas falharem.
+        :raises DeadlineExceeded: Se o prazo da requisição se esgotar.
+        """
+        deadline = current_deadline()
+        for attempt in range(PAGE_RETRIES + 1):
+            try:
+                return self.fetch_cell(ano, botao)
+            except ArchiveMiss:
+                # No modo replay, repetir não traria a página
+                raise
+            except RequestException as e:
+                print(f'Tentativa {attempt + 1} falhou para o ano {ano}: {str(e)}')
+                if attempt == PAGE_RETRIES:
+                    raise
+                espera = PAGE_RETRY_BACKOFF * (2 ** attempt)
+                time.sleep(min(espera, deadline.remaining()) if deadline else espera)
+                if deadline:
+                    deadline.check('antes de nova tentativa da página')
+
     def run(self):
         """
         Executa o processo de raspagem para os anos especificados, 
         incluindo o download, parsing, extração e transformação dos dados.
-        """
-        for ano in self.anos:
-            botao_iteravel = self.get_botoes()
-            if botao_iteravel:
-                for botao in botao_iteravel:
-                    params = self.get_params(ano, botao)
-                    html = self.fetch_data(self.url, params)
-                    soup = self.parse_html(html)
-                    table = self.extract_table(soup)
-                    if table:
-                        df = self.extract_data(table, botao['classificacao_botao'])
-                        df['Ano'] = ano
-                        self.dados = pd.concat([self.dados, df], ignore_index=True)
-                    else:
-                        print(f'Tabela não encontrada para o ano {ano} e botão {botao["value"]}.')
-            else:
-                params = self.get_params(ano)
-                html = self.fetch_data(self.url, params)
-                soup = self.parse_html(html)
-                table = self.extract_table(soup)
-                if table:
-                    df = self.extract_data(table)
-                    df['Ano'] = ano
-                    self.dados = pd.concat([self.dados, df], ignore_index=True)
-                else:
-                    print(f'Tabela não encontrada para o ano {ano}.')
 
-        self.transform_data()
+        Cada página (ano, botão) é tentada individualmente e o resultado fica salvo
+        em self.segmentos; as páginas que falharam ficam em self.celulas_falhas para
+        serem completadas por outra fonte. Uma nova execução reaproveita as páginas
+        já obtidas.
+
+        :raises RequestException: Se nenhuma página puder ser obtida.
+        """
+        self.celulas_falhas = []
+        ultimo_erro = None
+        celulas = [
+            ((ano, botao['classificacao_botao'] if botao else None), ano, botao)
+            for ano in self.anos
+            for botao in (self.get_botoes() or [None])
+        ]
+
+        for chave, ano, botao in celulas:
+            if chave in self.segmentos:
+                continue
+            try:
+                self.segmentos[chave] = self.fetch_cell_with_retry(ano, botao)
+            except RequestException as e:
+                ultimo_erro = e
+                self.celulas_falhas.append(chave)
+
+        if ultimo_erro is not None and len(self.celulas_falhas) == len(celulas):
+            raise ultimo_erro
+
+        frames = [self.segmentos[chave] for chave, _, _ in celulas if self.segmentos.get(chave) is not None]
+        self.dados = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if not self.dados.empty:
+            with stage_timer('transform_data', self.tipo, self.botao['classificacao_botao'] if self.botao else None):
+                self.transform_data()
+        self.dados['Fonte'] = FONTE_SITE
 
     def get_params(self, ano, botao=None):
         """
@@ -1,6 +1,9 @@
 from ..web_scraping.scraping_base import ScraperBase
+from app.utils_data.constants import BASE_URL
 from unidecode import unidecode
-import pandas as pd
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 class ExportacaoScraper(ScraperBase):
     def __init__(self, anos=range(1970, 2023), botao=None):
@@ -10,11 +13,11 @@ class ExportacaoScraper(ScraperBase):
         :param anos: Intervalo de anos para obter os dados. Padrão é de 1970 a 2023.
         :param botao: Botão opcional para adicionar aos dados.
         """
-        url = 'http://vitibrasil.cnpuv.embrapa.br/index.php?opcao=opt_06'  # Definindo a URL como um atributo de classe
-        self.csv_url = ['http://vitibrasil.cnpuv.embrapa.br/download/ExpVinho.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ExpEspumantes.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ExpUva.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ExpSuco.csv']
+        url = f'{BASE_URL}/index.php?opcao=opt_06'  # Definindo a URL como um atributo de classe
+        self.csv_url = [f'{BASE_URL}/download/ExpVinho.csv',
+                        f'{BASE_URL}/download/ExpEspumantes.csv',
+                        f'{BASE_URL}/download/ExpUva.csv',
+                        f'{BASE_URL}/download/ExpSuco.csv']
         self.tipo = 'Exp'
         super().__init__(url, anos)
         self.botao = botao
@@ -90,12 +93,3 @@ class ExportacaoScraper(ScraperBase):
                 {'name': 'subopcao', 'value': 'subopt_03', 'classificacao_botao': 'UVAS FRESCAS'},
                 {'name': 'subopcao', 'value': 'subopt_04', 'classificacao_botao': 'SUCO DE UVA'}
             ]
-            
-    def run(self):
-        """
-        Executa o processo de raspagem e transformação de dados, 
-        incluindo download, parsing, extração e transformação dos dados.
-        """
-        super().run()
-        self.transform_data()
-
@@ -1,6 +1,9 @@
 from ..web_scraping.scraping_base import ScraperBase
+from app.utils_data.constants import BASE_URL
 from unidecode import unidecode
-import pandas as pd
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 class ImportacaoScraper(ScraperBase):
     def __init__(self, anos=range(1970, 2023), botao=None):
@@ -10,12 +13,12 @@ class ImportacaoScraper(ScraperBase):
         :param anos: Intervalo de anos para obter os dados. Padrão é de 1970 a 2023.
         :param botao: Botão opcional para adicionar aos dados.
         """
-        url = 'http://vitibrasil.cnpuv.embrapa.br/index.php?opcao=opt_05'  # Definindo a URL como um atributo de classe
-        self.csv_url = ['http://vitibrasil.cnpuv.embrapa.br/download/ImpVinhos.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ImpEspumantes.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ImpFrescas.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ImpPassas.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ImpSuco.csv']
+        url = f'{BASE_URL}/index.php?opcao=opt_05'  # Definindo a URL como um atributo de classe
+        self.csv_url = [f'{BASE_URL}/download/ImpVinhos.csv',
+                        f'{BASE_URL}/download/ImpEspumantes.csv',
+                        f'{BASE_URL}/download/ImpFrescas.csv',
+                        f'{BASE_URL}/download/ImpPassas.csv',
+                        f'{BASE_URL}/download/ImpSuco.csv']
         self.tipo = 'Imp'
         super().__init__(url, anos)
         self.botao = botao
@@ -93,12 +96,3 @@ class ImportacaoScraper(ScraperBase):
                 {'name': 'subopcao', 'value': 'subopt_04', 'classificacao_botao': 'UVAS PASSAS'},
                 {'name': 'subopcao', 'value': 'subopt_05', 'classificacao_botao': 'SUCO DE UVA'}
             ]
-    
-    def run(self):
-        """
-        Executa o processo de raspagem e transformação de dados, 
-        incluindo download, parsing, extração e transformação dos dados.
-        """
-        super().run()
-        self.transform_data()
-        
@@ -1,6 +1,9 @@
 from ..web_scraping.scraping_base import ScraperBase
+from app.utils_data.constants import BASE_URL
 from unidecode import unidecode
-import pandas as pd
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 class ProcessamentoScraper(ScraperBase):
     def __init__(self, anos=range(1970, 2022), botao=None):
@@ -10,11 +13,11 @@ class ProcessamentoScraper(ScraperBase):
         :param anos: Intervalo de anos para obter os dados. Padrão é de 1970 a 2022.
         :param botao: Botão opcional para adicionar aos dados.
         """
-        url = 'http://vitibrasil.cnpuv.embrapa.br/index.php?opcao=opt_03'
-        self.csv_url = ['http://vitibrasil.cnpuv.embrapa.br/download/ProcessaViniferas.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ProcessaAmericanas.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ProcessaMesa.csv',
-                        'http://vitibrasil.cnpuv.embrapa.br/download/ProcessaSemclass.csv']
+        url = f'{BASE_URL}/index.php?opcao=opt_03'
+        self.csv_url = [f'{BASE_URL}/download/ProcessaViniferas.csv',
+                        f'{BASE_URL}/download/ProcessaAmericanas.csv',
+                        f'{BASE_URL}/download/ProcessaMesa.csv',
+                        f'{BASE_URL}/download/ProcessaSemclass.csv']
         self.tipo = 'Proces'
         super().__init__(url, anos)
         self.botao = botao
@@ -95,13 +98,3 @@ class ProcessamentoScraper(ScraperBase):
                 {'name': 'subopcao', 'value': 'subopt_03', 'classificacao_botao': 'UVAS DE MESA'},
                 {'name': 'subopcao', 'value': 'subopt_04', 'classificacao_botao': 'SEM CLASSIFICACAO'}
             ]
-            
-
-    def run(self):
-        """
-        Executa o processo de raspagem e transformação de dados, 
-        incluindo download, parsing, extração e transformação dos dados.
-        """
-        super().run()
-        self.transform_data()
-
@@ -1,6 +1,9 @@
 from ..web_scraping.scraping_base import ScraperBase
+from app.utils_data.constants import BASE_URL
 from unidecode import unidecode
-import pandas as pd
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 
 class ProducaoScraper(ScraperBase):
@@ -11,8 +14,8 @@ class ProducaoScraper(ScraperBase):
         :param anos: Intervalo de anos para obter os dados. Padrão é de 1970 a 2023.
         :param botao: Botão opcional para adicionar aos dados.
         """
-        url = 'http://vitibrasil.cnpuv.embrapa.br/index.php?opcao=opt_02'
-        self.csv_url = ['http://vitibrasil.cnpuv.embrapa.br/download/Producao.csv']
+        url = f'{BASE_URL}/index.php?opcao=opt_02'
+        self.csv_url = [f'{BASE_URL}/download/Producao.csv']
         self.tipo = 'Prod'
         super().__init__(url, anos)
         self.botao = botao
@@ -69,14 +72,3 @@ class ProducaoScraper(ScraperBase):
 
 
         self.dados = self.dados.loc[(self.dados['Produto'] != 'TOTAL') | (self.dados['Classificação'] != 'TOTAL')]
-
-    def run(self):
-        """
-        Executa o processo de raspagem e transformação de dados,
-        incluindo download, parsing, extração e transformação dos dados.
-        """
-        super().run()
-        self.transform_data()
-    
-
-
@@ -0,0 +1,55 @@
+"""
+Benchmark do custo de autenticação por requisição, com e sem o cache de tokens verificados.
+
+Uso:
+    python -m benchmarks.bench_auth --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+os.environ.setdefault('ALGORITHM', 'HS256')
+
+from app import auth  # noqa: E402
+
+
+async def _run(token, total):
+    inicio = time.perf_counter()
+    for _ in range(total):
+        user = await auth.get_current_user(token)
+        auth.authorize_user(user, "GET", "/producao")
+    return time.perf_counter() - inicio
+
+
+def bench(total, maxsize):
+    """
+    Mede o tempo médio de get_current_user + authorize_user por requisição.
+
+    :param total: Quantidade de requisições simuladas.
+    :param maxsize: Tamanho do cache de tokens (0 desativa).
+    :return: Tempo médio por requisição em microssegundos.
+    """
+    auth.token_cache.maxsize = maxsize
+    auth.token_cache.clear()
+    token = auth.create_access_token({"sub": "usuario"})
+    duracao = asyncio.run(_run(token, total))
+    return duracao / total * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark do custo de autenticação por requisição.')
+    parser.add_argument('--requests', type=int, default=20000, help='Requisições simuladas por cenário')
+    args = parser.parse_args(argv)
+
+    sem_cache = bench(args.requests, 0)
+    com_cache = bench(args.requests, auth.TOKEN_CACHE_SIZE or 4096)
+    print(f'{"cenário":<12} {"µs/requisição":>15}')
+    print(f'{"sem cache":<12} {sem_cache:>15.1f}')
+    print(f'{"com cache":<12} {com_cache:>15.1f}')
+    print(f'redução: {sem_cache / com_cache:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
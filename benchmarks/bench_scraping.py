@@ -0,0 +1,208 @@
+"""
+Benchmark offline do pipeline de dados: raspagem das páginas, caminho CSV e serialização,
+por dataset, contra o stub local do site da Embrapa (sem acessar o site real).
+
+Mede o tempo (mediana das repetições), a vazão e o pico de memória de cada etapa (alocações
+Python via tracemalloc; os buffers nativos do Arrow não entram na conta), detalha o tempo de cada etapa interna (page_fetch, html_parse, extract_data,
+transform_data, csv_download, transform_csv...) e compara com o baseline gravado,
+sinalizando regressões.
+
+Uso:
+    python -m benchmarks.bench_scraping [--datasets importacao exportacao] [--repeat 3] [--anos 2014-2023]
+                                        [--fixtures DIR] [--save-baseline] [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+
+# Sem limite de requisições: o stub é local e o objetivo é medir o processamento
+os.environ.setdefault('VITIBRASIL_UPSTREAM_RATE', '0')
+
+from benchmarks.fixtures import Fixtures  # noqa: E402
+from benchmarks.stub_server import StubServer  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+FORMATOS = ('json', 'arrow', 'parquet')
+# Diferenças absolutas abaixo destes limites não são consideradas regressão (ruído de medição)
+TEMPO_MINIMO = 0.005
+MEMORIA_MINIMA = 0.5
+
+
+def medir(funcao, repeticoes):
+    """
+    Mede uma etapa: mediana do tempo das repetições, tempo das etapas internas
+    registrado no histograma de métricas e pico de memória de uma execução extra.
+
+    :param funcao: Função sem argumentos que executa a etapa.
+    :param repeticoes: Quantidade de execuções cronometradas.
+    :return: Tupla (tempo em segundos, pico de memória em MB, etapas internas, resultado).
+    """
+    from app.metrics import STAGE_DURATION
+
+    STAGE_DURATION.clear()
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    etapas = {}
+    for (etapa, _, _), (soma, _) in STAGE_DURATION.summary().items():
+        etapas[etapa] = etapas.get(etapa, 0.0) + soma / repeticoes
+
+    # A memória é medida à parte: o tracemalloc distorce o tempo
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(tempos), pico / 2 ** 20, etapas, resultado
+
+
+def bench_dataset(nome, config, repeticoes, anos=None):
+    """
+    Executa o benchmark de um dataset: raspagem, caminho CSV e serialização.
+
+    :param nome: Nome do dataset.
+    :param config: Configuração do dataset (DATASETS).
+    :param repeticoes: Quantidade de execuções cronometradas por etapa.
+    :param anos: Intervalo (inicio, fim) de anos, ou None para o intervalo completo.
+    :return: Tupla (resultados por etapa, tempo das etapas internas).
+    """
+    from app.utils_data import cache as cache_module
+    from app.utils_data.csv.download_csv import download_and_process_csv
+    from app.utils_data.formats import serialize, to_arrow_table
+    from app.utils_data.web_scraping import scraping_base
+
+    inicio, fim = anos or (config['ano_inicial'], config['ano_final'])
+    inicio, fim = max(inicio, config['ano_inicial']), min(fim, config['ano_final'])
+    scraper_class = config['scraper']
+    resultados = {}
+    internas = {}
+
+    def raspar():
+        # Cada execução começa com o cache de páginas vazio, para medir também o download
+        scraping_base.cache = cache_module.MemoryCacheBackend()
+        scraper = scraper_class(range(inicio, fim + 1))
+        scraper.run()
+        return scraper
+
+    tempo, pico, etapas, scraper = medir(raspar, repeticoes)
+    paginas = (fim - inicio + 1) * max(len(scraper.get_botoes()), 1)
+    resultados['site'] = {
+        'tempo_s': tempo, 'pico_mb': pico, 'linhas': len(scraper.dados), 'itens_por_s': paginas / tempo,
+    }
+    internas.update(etapas)
+
+    tempo, pico, etapas, dados_csv = medir(lambda: download_and_process_csv(scraper.csv_url, scraper.tipo), repeticoes)
+    resultados['csv'] = {
+        'tempo_s': tempo, 'pico_mb': pico, 'linhas': len(dados_csv), 'itens_por_s': len(dados_csv) / tempo,
+    }
+    internas.update(etapas)
+
+    tabela = to_arrow_table(scraper.dados)
+    for formato in FORMATOS:
+        tempo, pico, _, (conteudo, _, _) = medir(lambda: serialize(tabela, formato), repeticoes)
+        resultados[f'serialize_{formato}'] = {
+            'tempo_s': tempo, 'pico_mb': pico, 'linhas': tabela.num_rows, 'itens_por_s': tabela.num_rows / tempo,
+            'bytes': len(conteudo),
+        }
+    return resultados, internas
+
+
+def comparar(atual, baseline, tolerancia):
+    """
+    Compara os resultados com o baseline.
+
+    :param atual: Resultados atuais no formato do baseline.
+    :param baseline: Resultados do baseline.
+    :param tolerancia: Aumento relativo aceito (ex.: 0.2 = 20%).
+    :return: Lista de regressões (chave, métrica, valor do baseline, valor atual).
+    """
+    regressoes = []
+    for chave, valores in atual['resultados'].items():
+        base = baseline.get('resultados', {}).get(chave)
+        if not base:
+            continue
+        for metrica, minimo in (('tempo_s', TEMPO_MINIMO), ('pico_mb', MEMORIA_MINIMA)):
+            if metrica in base and valores[metrica] > base[metrica] * (1 + tolerancia) \
+                    and valores[metrica] - base[metrica] > minimo:
+                regressoes.append((chave, metrica, base[metrica], valores[metrica]))
+    for chave, valor in atual['etapas'].items():
+        base = baseline.get('etapas', {}).get(chave)
+        if base is not None and valor > base * (1 + tolerancia) and valor - base > TEMPO_MINIMO:
+            regressoes.append((chave, 'tempo_s', base, valor))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark offline do pipeline de dados contra o stub do site.')
+    parser.add_argument('--datasets', nargs='+', help='Datasets a medir (padrão: todos)')
+    parser.add_argument('--repeat', type=int, default=3, help='Execuções cronometradas por etapa')
+    parser.add_argument('--anos', default='2014-2023',
+                        help="Intervalo de anos INICIO-FIM, ou 'todos' para o intervalo completo de cada dataset")
+    parser.add_argument('--fixtures', help='Diretório com fixtures gravadas (padrão: sintéticas)')
+    parser.add_argument('--baseline', default=BASELINE, help='Arquivo do baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='Grava os resultados como novo baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Aumento relativo aceito antes de sinalizar regressão')
+    args = parser.parse_args(argv)
+    anos = None if args.anos == 'todos' else tuple(int(ano) for ano in args.anos.split('-'))
+
+    with StubServer(Fixtures(args.fixtures)) as stub:
+        # A URL do site é lida na importação dos módulos da API
+        os.environ['VITIBRASIL_BASE_URL'] = stub.base_url
+        from app.utils_data.datasets import DATASETS
+
+        nomes = args.datasets or list(DATASETS)
+        atual = {
+            'config': {'anos': args.anos, 'fixtures': 'gravadas' if args.fixtures else 'sinteticas', 'repeat': args.repeat},
+            'ambiente': {'python': platform.python_version(), 'maquina': platform.machine()},
+            'resultados': {},
+            'etapas': {},
+        }
+        print(f'{"dataset/etapa":<34} {"tempo (s)":>10} {"itens/s":>12} {"linhas":>8} {"pico (MB)":>10}')
+        for nome in nomes:
+            resultados, internas = bench_dataset(nome, DATASETS[nome], args.repeat, anos)
+            for etapa, valores in resultados.items():
+                chave = f'{nome}/{etapa}'
+                atual['resultados'][chave] = valores
+                print(f'{chave:<34} {valores["tempo_s"]:>10.3f} {valores["itens_por_s"]:>12.1f} '
+                      f'{valores["linhas"]:>8} {valores["pico_mb"]:>10.1f}')
+            for etapa, segundos in sorted(internas.items()):
+                atual['etapas'][f'{nome}/{etapa}'] = segundos
+
+    print(f'\n{"etapa interna":<34} {"tempo (s)":>10}')
+    for chave, segundos in atual['etapas'].items():
+        print(f'{chave:<34} {segundos:>10.3f}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(atual, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f'\nBaseline gravado em {args.baseline}')
+        return
+
+    if not os.path.exists(args.baseline):
+        print('\nSem baseline para comparar (use --save-baseline para gravar um).')
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('config') != atual['config']:
+        print(f'\nAviso: configuração diferente do baseline ({baseline.get("config")}).')
+    regressoes = comparar(atual, baseline, args.tolerance)
+    if not regressoes:
+        print(f'\nSem regressões acima de {args.tolerance:.0%} em relação ao baseline.')
+        return
+    print(f'\nREGRESSÕES acima de {args.tolerance:.0%} em relação ao baseline:')
+    for chave, metrica, base, valor in regressoes:
+        print(f'  {chave:<34} {metrica:<8} {base:>10.3f} -> {valor:>10.3f} ({valor / base - 1:+.0%})')
+    raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark do tempo de inicialização de um worker (importação de app.main).
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CENARIOS = {
+    'import app.main (sob demanda)': 'import app.main',
+    'import app.main + módulos pesados': 'import app.main; from app.lazy import preload_heavy_modules; preload_heavy_modules()',
+    'import app.auth + 1 hash bcrypt': 'from app.auth import pwd_context; pwd_context.hash("senha")',
+}
+
+
+def measure(code, runs):
+    """
+    Mede o tempo de execução de um trecho de código em processos Python novos.
+
+    :param code: Código a executar.
+    :param runs: Quantidade de execuções.
+    :return: Lista de tempos em segundos.
+    """
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'benchmark-secret')
+    env.setdefault('ALGORITHM', 'HS256')
+    env.pop('VITIBRASIL_PRELOAD', None)
+    tempos = []
+    for _ in range(runs):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark do tempo de inicialização de um worker.')
+    parser.add_argument('--runs', type=int, default=5, help='Execuções por cenário')
+    args = parser.parse_args(argv)
+
+    base = statistics.median(measure('pass', args.runs))
+    print(f'{"cenário":<38} {"mediana (ms)":>12} {"mínimo (ms)":>12}')
+    for nome, code in CENARIOS.items():
+        tempos = [t - base for t in measure(code, args.runs)]
+        print(f'{nome:<38} {statistics.median(tempos) * 1000:>12.0f} {min(tempos) * 1000:>12.0f}')
+    print(f'(descontado o início do interpretador: {base * 1000:.0f} ms)')
+
+
+if __name__ == '__main__':
+    main()
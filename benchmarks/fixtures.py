@@ -0,0 +1,279 @@
+"""
+Fixtures das páginas e CSVs do site da Embrapa para os benchmarks offline.
+
+As fixtures podem ser gravadas do site real (``python -m benchmarks.fixtures --record DIR``)
+ou geradas sinteticamente, de forma determinística, com a mesma estrutura HTML e CSV
+do site. O stub HTTP (benchmarks/stub_server.py) serve qualquer uma das duas.
+
+Layout das fixtures gravadas:
+    DIR/pages/<opcao>/<subopcao ou ->/<ano>.html
+    DIR/download/<arquivo>.csv
+"""
+import argparse
+import os
+import random
+import time
+from functools import lru_cache
+from html import escape
+
+
+SITE_URL = 'http://vitibrasil.cnpuv.embrapa.br'
+
+# Páginas do site: opção, subopções (None para páginas sem botões), anos e colunas da tabela
+OPCOES = {
+    'opt_02': {'subopcoes': [None], 'anos': range(1970, 2024), 'colunas': ['Produto', 'Quantidade (L.)']},
+    'opt_03': {
+        'subopcoes': ['subopt_01', 'subopt_02', 'subopt_03', 'subopt_04'],
+        'anos': range(1970, 2023),
+        'colunas': ['Cultivar', 'Quantidade (Kg)'],
+    },
+    'opt_04': {'subopcoes': [None], 'anos': range(1970, 2024), 'colunas': ['Produto', 'Quantidade (L.)']},
+    'opt_05': {
+        'subopcoes': ['subopt_01', 'subopt_02', 'subopt_03', 'subopt_04', 'subopt_05'],
+        'anos': range(1970, 2024),
+        'colunas': ['Países', 'Quantidade (Kg)', 'Valor (US$)'],
+    },
+    'opt_06': {
+        'subopcoes': ['subopt_01', 'subopt_02', 'subopt_03', 'subopt_04'],
+        'anos': range(1970, 2024),
+        'colunas': ['Países', 'Quantidade (Kg)', 'Valor (US$)'],
+    },
+}
+
+# Os 15 arquivos CSV de download, com o formato de cada um
+CSVS = {
+    'Producao.csv': 'Prod',
+    'ProcessaViniferas.csv': 'Proces',
+    'ProcessaAmericanas.csv': 'Proces',
+    'ProcessaMesa.csv': 'Proces',
+    'ProcessaSemclass.csv': 'Proces',
+    'Comercio.csv': 'Comerc',
+    'ImpVinhos.csv': 'Imp',
+    'ImpEspumantes.csv': 'Imp',
+    'ImpFrescas.csv': 'Imp',
+    'ImpPassas.csv': 'Imp',
+    'ImpSuco.csv': 'Imp',
+    'ExpVinho.csv': 'Exp',
+    'ExpEspumantes.csv': 'Exp',
+    'ExpUva.csv': 'Exp',
+    'ExpSuco.csv': 'Exp',
+}
+
+# Grupos (tb_item) e prefixos de controle usados nas páginas e CSVs sintéticos
+_GRUPOS = {
+    'Prod': [('VINHO DE MESA', 'vm_', 3), ('VINHO FINO DE MESA (VINIFERA)', 'vv_', 3), ('SUCO', 'su_', 4), ('DERIVADOS', 'de_', 32)],
+    'Proces': [('TINTAS', 'ti_', 45), ('BRANCAS E ROSADAS', 'br_', 55), ('SEM CLASSIFICACAO', 'sc', 1)],
+    'Comerc': [
+        ('VINHO DE MESA', 'vm_', 3), ('VINHO FINO DE MESA', 'vv_', 3), ('VINHO ESPECIAL', 've_', 3),
+        ('ESPUMANTES', 'es_', 2), ('SUCO DE UVAS', 'su_', 3), ('OUTROS PRODUTOS COMERCIALIZADOS', 'ou_', 20),
+    ],
+}
+_TIPOS_OPCAO = {'opt_02': 'Prod', 'opt_03': 'Proces', 'opt_04': 'Comerc', 'opt_05': 'Imp', 'opt_06': 'Exp'}
+_PAISES = 140
+
+# Cabeçalho e menu das páginas, para o custo do parse se aproximar do site real
+_MENU = ''.join(
+    f'<td><button class="btn_opt" value="opt_0{i}" name="opcao">Opção {i}</button></td>' for i in range(1, 8)
+)
+_BOILERPLATE = (
+    '<html><head><meta charset="utf-8"><title>Banco de dados de uva, vinho e derivados</title></head><body>'
+    '<table class="tb_base tb_header"><tr>' + _MENU + '</tr></table>'
+    + '<p class="text_center">Embrapa Uva e Vinho</p>' * 40
+)
+
+
+def _seed(*partes):
+    return sum(ord(c) * (i + 1) for i, c in enumerate(':'.join(str(p) for p in partes)))
+
+
+def _numero(rng, maximo):
+    """Número no formato do site: separador de milhar '.', com '-' ocasional para zero."""
+    if rng.random() < 0.08:
+        return '-'
+    return f'{rng.randint(0, maximo):,}'.replace(',', '.')
+
+
+def _linhas_tabela(opcao, subopcao, ano):
+    """
+    Gera as linhas da tabela de uma página: lista de (classe, valores).
+
+    :return: Lista de tuplas (classe CSS da linha ou '', lista de valores).
+    """
+    rng = random.Random(_seed(opcao, subopcao, ano))
+    tipo = _TIPOS_OPCAO[opcao]
+    linhas = []
+    if tipo in ('Imp', 'Exp'):
+        for i in range(_PAISES):
+            linhas.append(('', [f'País {i + 1:03d}', _numero(rng, 5_000_000), _numero(rng, 20_000_000)]))
+        return linhas
+    grupos = _GRUPOS[tipo]
+    if tipo == 'Proces':
+        # Cada subopção tem seus próprios cultivares
+        grupos = [(nome, prefixo, quantidade // 2 + int(subopcao[-1])) for nome, prefixo, quantidade in grupos]
+    for nome, _, quantidade in grupos:
+        linhas.append(('tb_item', [nome, _numero(rng, 300_000_000)]))
+        for i in range(quantidade):
+            linhas.append(('tb_subitem', [f'{nome.title()} {i + 1:02d}', _numero(rng, 50_000_000)]))
+    return linhas
+
+
+@lru_cache(maxsize=None)
+def synthetic_page(opcao, subopcao, ano):
+    """
+    Gera a página HTML de uma opção, subopção e ano.
+
+    :param opcao: Opção da página (ex.: 'opt_05').
+    :param subopcao: Subopção (ex.: 'subopt_01') ou None.
+    :param ano: Ano da página.
+    :return: Conteúdo HTML em bytes.
+    """
+    colunas = OPCOES[opcao]['colunas']
+    partes = [_BOILERPLATE, '<table class="tb_base tb_dados"><thead><tr>']
+    partes.extend(f'<th>{escape(coluna)}</th>' for coluna in colunas)
+    partes.append('</tr></thead><tbody>')
+    for classe, valores in _linhas_tabela(opcao, subopcao, ano):
+        atributo = f' class="{classe}"' if classe else ''
+        partes.append('<tr>' + ''.join(f'<td{atributo}>{escape(v)}</td>' for v in valores) + '</tr>')
+    partes.append('</tbody><tfoot class="tb_total"><tr><td>Total</td>')
+    partes.extend(f'<td>{_numero(random.Random(ano), 900_000_000)}</td>' for _ in colunas[1:])
+    partes.append('</tr></tfoot></table></body></html>')
+    return ''.join(partes).encode('utf-8')
+
+
+@lru_cache(maxsize=None)
+def synthetic_csv(nome):
+    """
+    Gera um arquivo CSV de download com o mesmo formato do arquivo do site.
+
+    :param nome: Nome do arquivo (ex.: 'ImpVinhos.csv').
+    :return: Conteúdo do CSV em bytes.
+    """
+    tipo = CSVS[nome]
+    rng = random.Random(_seed(nome))
+    anos = list(range(1970, 2023 if tipo == 'Proces' else 2024))
+    linhas = []
+    if tipo in ('Imp', 'Exp'):
+        # Cada ano aparece duas vezes: quantidade e valor
+        linhas.append(';'.join(['Id', 'País'] + [str(ano) for ano in anos for _ in range(2)]))
+        for i in range(_PAISES):
+            valores = [str(rng.randint(0, 5_000_000)) for _ in range(len(anos) * 2)]
+            linhas.append(';'.join([str(i + 1), f'País {i + 1:03d}'] + valores))
+        return ('\n'.join(linhas) + '\n').encode('utf-8')
+
+    delimitador = '\t' if tipo == 'Proces' else ';'
+    coluna = 'cultivar' if tipo == 'Proces' else 'produto'
+    linhas.append(delimitador.join(['id', 'control', coluna] + [str(ano) for ano in anos]))
+    identificador = 0
+    for grupo, prefixo, quantidade in _GRUPOS[tipo]:
+        identificador += 1
+        linhas.append(delimitador.join(
+            [str(identificador), grupo, grupo] + [str(rng.randint(0, 300_000_000)) for _ in anos]
+        ))
+        for i in range(quantidade):
+            identificador += 1
+            item = f'{grupo.title()} {i + 1:02d}'
+            linhas.append(delimitador.join(
+                [str(identificador), f'{prefixo}{item}', item] + [str(rng.randint(0, 50_000_000)) for _ in anos]
+            ))
+    return ('\n'.join(linhas) + '\n').encode('utf-8')
+
+
+class Fixtures:
+    """
+    Fonte das páginas e CSVs servidos pelo stub: usa as fixtures gravadas em disco
+    quando existirem e gera as demais sinteticamente.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Inicializa a fonte de fixtures.
+
+        :param directory: Diretório das fixtures gravadas (None usa apenas as sintéticas).
+        """
+        self.directory = directory
+
+    def _read(self, *partes):
+        if not self.directory:
+            return None
+        caminho = os.path.join(self.directory, *partes)
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, 'rb') as f:
+            return f.read()
+
+    def page(self, opcao, subopcao, ano):
+        """
+        Obtém a página de uma opção, subopção e ano.
+
+        :return: Conteúdo HTML em bytes ou None se a opção não existir.
+        """
+        if opcao not in OPCOES:
+            return None
+        if ano is None:
+            ano = max(OPCOES[opcao]['anos'])
+        if subopcao is None:
+            subopcao = OPCOES[opcao]['subopcoes'][0]
+        gravada = self._read('pages', opcao, subopcao or '-', f'{ano}.html')
+        return gravada if gravada is not None else synthetic_page(opcao, subopcao, ano)
+
+    def csv(self, nome):
+        """
+        Obtém um arquivo CSV de download.
+
+        :return: Conteúdo do CSV em bytes ou None se o arquivo não existir.
+        """
+        if nome not in CSVS:
+            return None
+        gravado = self._read('download', nome)
+        return gravado if gravado is not None else synthetic_csv(nome)
+
+
+def record_fixtures(directory, site_url=SITE_URL, pausa=0.2):
+    """
+    Grava do site real todas as páginas (opção, subopção, ano) e os 15 CSVs.
+    Os arquivos já gravados são mantidos, então a gravação pode ser retomada.
+
+    :param directory: Diretório de destino.
+    :param site_url: Endereço do site.
+    :param pausa: Espera em segundos entre as requisições, para não sobrecarregar o site.
+    """
+    import requests
+
+    for opcao, config in OPCOES.items():
+        for subopcao in config['subopcoes']:
+            pasta = os.path.join(directory, 'pages', opcao, subopcao or '-')
+            os.makedirs(pasta, exist_ok=True)
+            for ano in config['anos']:
+                caminho = os.path.join(pasta, f'{ano}.html')
+                if os.path.exists(caminho):
+                    continue
+                params = {'opcao': opcao, 'ano': ano}
+                if subopcao:
+                    params['subopcao'] = subopcao
+                response = requests.get(f'{site_url}/index.php', params=params, timeout=30)
+                response.raise_for_status()
+                with open(caminho, 'wb') as f:
+                    f.write(response.content)
+                print(f'Gravado {caminho}')
+                time.sleep(pausa)
+
+    pasta = os.path.join(directory, 'download')
+    os.makedirs(pasta, exist_ok=True)
+    for nome in CSVS:
+        response = requests.get(f'{site_url}/download/{nome}', timeout=60)
+        response.raise_for_status()
+        with open(os.path.join(pasta, nome), 'wb') as f:
+            f.write(response.content)
+        print(f'Gravado {nome}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Grava as fixtures do site da Embrapa para os benchmarks offline.')
+    parser.add_argument('--record', metavar='DIR', required=True, help='Diretório onde gravar as fixtures')
+    parser.add_argument('--site-url', default=SITE_URL, help='Endereço do site da Embrapa')
+    args = parser.parse_args(argv)
+    record_fixtures(args.record, args.site_url)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Teste de carga de ponta a ponta: sobe a API (app.main via uvicorn) apontada para o stub
+local do site da Embrapa, obtém um token em /token e dispara tráfego misto nos cinco
+endpoints, com intervalos de anos, botões e formatos variados.
+
+Ao final, relata por endpoint: requisições, vazão, latências p50/p95/p99 e taxa de erros.
+
+Uso:
+    python -m benchmarks.load_test --duration 30 --concurrency 16 --workers 2 \\
+        [--latency 0.2] [--failure-rate 0.05] [--json resultado.json]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+from benchmarks.fixtures import Fixtures
+from benchmarks.stub_server import StubServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREFIXO = '/vitibrasil/api/v1'
+
+# Endpoints, peso no tráfego, anos disponíveis e botões aceitos
+ENDPOINTS = {
+    'producao': {'peso': 3, 'anos': (1970, 2023), 'botoes': []},
+    'processamento': {
+        'peso': 2, 'anos': (1970, 2022),
+        'botoes': ['VINIFERA', 'AMERICANAS_E_HIBRIDA', 'UVA_DE_MESA', 'SEM_CLASSIFICACAO'],
+    },
+    'comercializacao': {'peso': 2, 'anos': (1970, 2023), 'botoes': []},
+    'importacao': {
+        'peso': 2, 'anos': (1970, 2023),
+        'botoes': ['VINHOS_DE_MESA', 'ESPUMANTES', 'UVAS_FRESCAS', 'UVAS_PASSAS', 'SUCO_DE_UVA'],
+    },
+    'exportacao': {
+        'peso': 2, 'anos': (1970, 2023),
+        'botoes': ['VINHOS_DE_MESA', 'ESPUMANTES', 'UVAS_FRESCAS', 'SUCO_DE_UVA'],
+    },
+}
+# Tamanhos de intervalo de anos sorteados (intervalos curtos são os mais comuns)
+INTERVALOS = (1, 1, 1, 3, 5, 10)
+FORMATOS = ('json', 'json', 'json', 'arrow', 'parquet')
+
+
+def porta_livre():
+    """
+    Obtém uma porta TCP livre na máquina local.
+
+    :return: Número da porta.
+    """
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def iniciar_api(base_url, porta, workers, env_extra=None):
+    """
+    Inicia a API com uvicorn em um subprocesso e aguarda ela responder.
+
+    :param base_url: Endereço do stub do site, repassado em VITIBRASIL_BASE_URL.
+    :param porta: Porta da API.
+    :param workers: Quantidade de workers do uvicorn.
+    :param env_extra: Variáveis de ambiente adicionais.
+    :return: Processo do uvicorn.
+    :raises RuntimeError: Se a API não responder a tempo.
+    """
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'load-test-secret')
+    env.setdefault('ALGORITHM', 'HS256')
+    env['VITIBRASIL_BASE_URL'] = base_url
+    # O limite de logins por cliente não deve interferir no teste
+    env.setdefault('VITIBRASIL_LOGIN_MAX_ATTEMPTS', '0')
+    env.update(env_extra or {})
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1', '--port', str(porta),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError('A API terminou durante a inicialização')
+        try:
+            requests.get(f'http://127.0.0.1:{porta}/', timeout=1)
+            return processo
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError('A API não respondeu em 60 segundos')
+
+
+def sortear_requisicao(rng):
+    """
+    Sorteia uma requisição do tráfego misto.
+
+    :param rng: Gerador de números aleatórios.
+    :return: Tupla (endpoint, parâmetros da query).
+    """
+    nomes = list(ENDPOINTS)
+    endpoint = rng.choices(nomes, weights=[ENDPOINTS[n]['peso'] for n in nomes])[0]
+    config = ENDPOINTS[endpoint]
+    inicio_min, fim_max = config['anos']
+    tamanho = rng.choice(INTERVALOS)
+    inicio = rng.randint(inicio_min, fim_max - tamanho + 1)
+    params = {'start_year': inicio, 'end_year': inicio + tamanho - 1, 'format': rng.choice(FORMATOS)}
+    if config['botoes'] and rng.random() < 0.5:
+        params['botao_opcao'] = rng.choice(config['botoes'])
+    return endpoint, params
+
+
+def percentil(valores, p):
+    """
+    Calcula o percentil p (0-100) de uma lista de valores pelo método nearest-rank.
+
+    :param valores: Lista de valores ordenada.
+    :param p: Percentil desejado.
+    :return: Valor do percentil.
+    """
+    if not valores:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[indice]
+
+
+def gerar_carga(api_url, token, duracao, concorrencia, seed, timeout):
+    """
+    Dispara o tráfego misto com várias threads durante o tempo informado.
+
+    :param api_url: Endereço da API.
+    :param token: Token JWT usado nas requisições.
+    :param duracao: Duração em segundos.
+    :param concorrencia: Quantidade de clientes simultâneos.
+    :param seed: Semente do sorteio das requisições.
+    :param timeout: Timeout de cada requisição, em segundos.
+    :return: Lista de amostras (endpoint, status ou nome do erro, latência em segundos).
+    """
+    amostras = []
+    lock = threading.Lock()
+    fim = time.monotonic() + duracao
+
+    def cliente(indice):
+        rng = random.Random(seed + indice)
+        sessao = requests.Session()
+        sessao.headers['Authorization'] = f'Bearer {token}'
+        locais = []
+        while time.monotonic() < fim:
+            endpoint, params = sortear_requisicao(rng)
+            inicio = time.perf_counter()
+            try:
+                resultado = sessao.get(f'{api_url}{PREFIXO}/{endpoint}', params=params, timeout=timeout).status_code
+            except requests.exceptions.RequestException as e:
+                resultado = type(e).__name__
+            locais.append((endpoint, resultado, time.perf_counter() - inicio))
+        with lock:
+            amostras.extend(locais)
+
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return amostras
+
+
+def resumir(amostras, duracao):
+    """
+    Resume as amostras por endpoint e no total.
+
+    :param amostras: Lista de amostras (endpoint, status ou erro, latência).
+    :param duracao: Duração do teste em segundos.
+    :return: Dicionário {endpoint: estatísticas}.
+    """
+    grupos = defaultdict(list)
+    for amostra in amostras:
+        grupos[amostra[0]].append(amostra)
+        grupos['total'].append(amostra)
+    resumo = {}
+    for endpoint, itens in grupos.items():
+        latencias = sorted(latencia for _, _, latencia in itens)
+        status = Counter(str(resultado) for _, resultado, _ in itens)
+        erros = sum(1 for _, resultado, _ in itens if not isinstance(resultado, int) or resultado >= 400)
+        resumo[endpoint] = {
+            'requisicoes': len(itens),
+            'req_por_s': len(itens) / duracao,
+            'p50_ms': percentil(latencias, 50) * 1000,
+            'p95_ms': percentil(latencias, 95) * 1000,
+            'p99_ms': percentil(latencias, 99) * 1000,
+            'media_ms': statistics.fmean(latencias) * 1000,
+            'erros_pct': erros / len(itens) * 100,
+            'status': dict(status),
+        }
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Teste de carga da API contra o stub local do site da Embrapa.')
+    parser.add_argument('--duration', type=float, default=30, help='Duração do tráfego, em segundos')
+    parser.add_argument('--concurrency', type=int, default=16, help='Clientes simultâneos')
+    parser.add_argument('--workers', type=int, default=1, help='Workers do uvicorn')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latência média injetada no stub, em segundos')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fração das respostas do stub com HTTP 503')
+    parser.add_argument('--fixtures', help='Diretório com fixtures gravadas (padrão: sintéticas)')
+    parser.add_argument('--timeout', type=float, default=60, help='Timeout de cada requisição à API, em segundos')
+    parser.add_argument('--seed', type=int, default=0, help='Semente do tráfego, para execuções reproduzíveis')
+    parser.add_argument('--user', default='admin', help='Usuário usado para obter o token')
+    parser.add_argument('--password', default='admin', help='Senha do usuário')
+    parser.add_argument('--json', help='Grava o resumo neste arquivo JSON')
+    args = parser.parse_args(argv)
+
+    stub = StubServer(Fixtures(args.fixtures), latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+    with stub:
+        porta = porta_livre()
+        api_url = f'http://127.0.0.1:{porta}'
+        processo = iniciar_api(stub.base_url, porta, args.workers)
+        try:
+            resposta = requests.post(f'{api_url}/token', data={'username': args.user, 'password': args.password}, timeout=30)
+            resposta.raise_for_status()
+            token = resposta.json()['access_token']
+            print(f'API em {api_url} ({args.workers} worker(s)), stub em {stub.base_url} '
+                  f'(latência {args.latency}s, falhas {args.failure_rate:.0%}); '
+                  f'{args.concurrency} clientes por {args.duration:.0f}s')
+            inicio = time.monotonic()
+            amostras = gerar_carga(api_url, token, args.duration, args.concurrency, args.seed, args.timeout)
+            duracao = time.monotonic() - inicio
+        finally:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    resumo = resumir(amostras, duracao)
+    print(f'\n{"endpoint":<16} {"req":>7} {"req/s":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"erros %":>8}')
+    for endpoint in [*ENDPOINTS, 'total']:
+        if endpoint not in resumo:
+            continue
+        r = resumo[endpoint]
+        print(f'{endpoint:<16} {r["requisicoes"]:>7} {r["req_por_s"]:>8.1f} {r["p50_ms"]:>9.1f} '
+              f'{r["p95_ms"]:>9.1f} {r["p99_ms"]:>9.1f} {r["erros_pct"]:>8.1f}')
+    print(f'\nStatus: {resumo["total"]["status"] if "total" in resumo else {}}')
+    print(f'Requisições ao stub: {stub.requests} ({stub.failures} falhas injetadas)')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'resumo': resumo, 'stub': {'requisicoes': stub.requests, 'falhas': stub.failures}},
+                      f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Servidor HTTP local que imita o site da Embrapa, servindo as fixtures de benchmarks/fixtures.py.
+
+Aponte a API para ele com VITIBRASIL_BASE_URL. Latência e falhas podem ser injetadas
+para simular um site lento ou instável.
+
+Uso:
+    python -m benchmarks.stub_server --port 8765 [--fixtures DIR] [--latency 0.2] [--failure-rate 0.05]
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.fixtures import Fixtures
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, status, corpo, content_type='text/html; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.requests += 1
+        if stub.latency:
+            time.sleep(stub.latency * (0.5 + stub.rng.random()))
+        if stub.failure_rate and stub.rng.random() < stub.failure_rate:
+            stub.failures += 1
+            self._responder(503, b'Servico indisponivel', 'text/plain')
+            return
+
+        url = urlsplit(self.path)
+        if url.path.startswith('/download/'):
+            corpo = stub.fixtures.csv(url.path.rsplit('/', 1)[-1])
+            content_type = 'text/csv; charset=utf-8'
+        elif url.path in ('/', '/index.php'):
+            query = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+            ano = int(query['ano']) if query.get('ano', '').isdigit() else None
+            corpo = stub.fixtures.page(query.get('opcao', 'opt_02'), query.get('subopcao'), ano)
+            content_type = 'text/html; charset=utf-8'
+        else:
+            corpo = None
+        if corpo is None:
+            self._responder(404, b'Nao encontrado', 'text/plain')
+            return
+        self._responder(200, corpo, content_type)
+
+
+class StubServer:
+    """Stub do site da Embrapa em uma thread em segundo plano."""
+
+    def __init__(self, fixtures=None, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, seed=0):
+        """
+        Inicializa o stub.
+
+        :param fixtures: Fonte das páginas e CSVs (padrão: apenas fixtures sintéticas).
+        :param host: Endereço de escuta.
+        :param port: Porta de escuta (0 escolhe uma porta livre).
+        :param latency: Latência média injetada em cada resposta, em segundos.
+        :param failure_rate: Fração das requisições respondidas com HTTP 503.
+        :param seed: Semente do sorteio de latência e falhas.
+        """
+        self.fixtures = fixtures or Fixtures()
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Endereço do stub, no formato esperado por VITIBRASIL_BASE_URL."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Inicia o servidor em segundo plano."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='vitibrasil-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Encerra o servidor."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stub local do site da Embrapa para benchmarks e testes de carga.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', help='Diretório com fixtures gravadas (padrão: sintéticas)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Latência média por resposta, em segundos')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fração das respostas com HTTP 503')
+    args = parser.parse_args(argv)
+
+    stub = StubServer(Fixtures(args.fixtures), args.host, args.port, args.latency, args.failure_rate)
+    print(f'Stub do site da Embrapa em {stub.base_url} (VITIBRASIL_BASE_URL={stub.base_url})')
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from app.auth import get_current_user
+from app.main import app
+from app.routes import aggregation, analytics, changes, export, routes
+from app.utils_data import upstream
+from app.utils_data.cache import cache
+from app.utils_data.shared_store import SharedDatasetStore
+from app.utils_data.upstream import TokenBucketLimiter
+from app.utils_data.web_scraping import scraping_base
+from benchmarks.fixtures import Fixtures
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    """Repositório compartilhado vazio no lugar do usado pelos endpoints."""
+    store = SharedDatasetStore(root=str(tmp_path / 'store'))
+    for modulo in (routes, aggregation, analytics, changes, export):
+        monkeypatch.setattr(modulo, 'shared_store', store)
+    return store
+
+
+@pytest.fixture
+def client():
+    """Cliente da API autenticado como administrador."""
+    app.dependency_overrides[get_current_user] = lambda: {'username': 'admin', 'is_admin': True}
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+class FakeSite:
+    """
+    Transporte que serve as páginas e os CSVs sintéticos dos benchmarks, sem
+    acessar a rede. As páginas (opção, subopção, ano) em `falhas` e os CSVs em
+    `csv_falhas` respondem com erro de conexão.
+    """
+
+    offline = False
+
+    def __init__(self):
+        self.fixtures = Fixtures()
+        self.falhas = set()
+        self.csv_falhas = set()
+        self.requests = []
+
+    def get(self, url, params=None, **kwargs):
+        partes = urlsplit(url)
+        query = dict(parse_qsl(partes.query), **{k: str(v) for k, v in (params or {}).items()})
+        self.requests.append((partes.path, query))
+        if partes.path.startswith('/download/'):
+            nome = partes.path.rsplit('/', 1)[1]
+            if nome in self.csv_falhas:
+                raise requests.exceptions.ConnectionError(f'CSV {nome} indisponível')
+            conteudo = self.fixtures.csv(nome)
+        else:
+            ano = int(query['ano']) if 'ano' in query else None
+            if (query.get('opcao'), query.get('subopcao'), ano) in self.falhas:
+                raise requests.exceptions.ConnectionError(f'Página {query} indisponível')
+            conteudo = self.fixtures.page(query.get('opcao'), query.get('subopcao'), ano)
+        response = requests.models.Response()
+        response.status_code = 200 if conteudo is not None else 404
+        response._content = conteudo or b''
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+
+@pytest.fixture
+def site(monkeypatch):
+    """Site da Embrapa simulado, sem limite de requisições, sem espera entre tentativas e com o cache vazio."""
+    site = FakeSite()
+    monkeypatch.setattr(upstream, 'transport', site)
+    monkeypatch.setattr(upstream, 'limiter', TokenBucketLimiter(rate=0))
+    monkeypatch.setattr(scraping_base, 'PAGE_RETRY_BACKOFF', 0)
+    cache._data.clear()
+    yield site
+    cache._data.clear()
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes import routes
+from app.utils_data.admission import AdmissionController, Overloaded, MOTIVO_FILA_CHEIA, MOTIVO_TEMPO_NA_FILA
+
+
+async def occupy(controller, liberar):
+    """Ocupa uma vaga com uma thread que só termina quando `liberar` for sinalizado."""
+    tarefa = asyncio.ensure_future(controller.run(liberar.wait))
+    await asyncio.sleep(0.01)
+    return tarefa
+
+
+def test_full_queue_is_shed_immediately():
+    async def cenario():
+        controller = AdmissionController(max_concurrent=1, queue_limit=1, queue_timeout=5, retry_after=7)
+        liberar = threading.Event()
+        ocupada = await occupy(controller, liberar)
+        na_fila = asyncio.ensure_future(controller.run(lambda: 'fila'))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(Overloaded) as erro:
+            await controller.run(lambda: 'descartada')
+        liberar.set()
+        return erro.value, await ocupada, await na_fila
+
+    erro, ocupada, na_fila = asyncio.run(cenario())
+    assert (erro.motivo, erro.retry_after) == (MOTIVO_FILA_CHEIA, 7)
+    assert (ocupada, na_fila) == (True, 'fila')
+
+
+def test_queue_timeout_is_shed():
+    async def cenario():
+        controller = AdmissionController(max_concurrent=1, queue_limit=4, queue_timeout=0.05, retry_after=3)
+        liberar = threading.Event()
+        ocupada = await occupy(controller, liberar)
+        try:
+            with pytest.raises(Overloaded) as erro:
+                await controller.run(lambda: None)
+        finally:
+            liberar.set()
+            await ocupada
+        return erro.value, controller
+
+    erro, controller = asyncio.run(cenario())
+    assert (erro.motivo, erro.retry_after) == (MOTIVO_TEMPO_NA_FILA, 3)
+    assert controller._em_execucao == 0
+    assert not controller._fila
+
+
+def test_cancelled_request_holds_slot_until_thread_ends():
+    async def cenario():
+        controller = AdmissionController(max_concurrent=1, queue_limit=4, queue_timeout=5)
+        liberar = threading.Event()
+        ocupada = await occupy(controller, liberar)
+        ocupada.cancel()
+        await asyncio.sleep(0.01)
+
+        # A thread da requisição cancelada continua em execução com a vaga
+        assert controller._em_execucao == 1
+        seguinte = asyncio.ensure_future(controller.run(lambda: 'seguinte'))
+        await asyncio.sleep(0.01)
+        assert not seguinte.done()
+        liberar.set()
+        return await seguinte, controller
+
+    resultado, controller = asyncio.run(cenario())
+    assert resultado == 'seguinte'
+    assert controller._em_execucao == 0
+
+
+@pytest.mark.parametrize('motivo,codigo', [(MOTIVO_FILA_CHEIA, 429), (MOTIVO_TEMPO_NA_FILA, 503)])
+def test_run_admitted_maps_overload_to_retry_after(monkeypatch, motivo, codigo):
+    class Sobrecarregado:
+        async def run(self, funcao, *args):
+            raise Overloaded(motivo, 11)
+
+    monkeypatch.setattr(routes, 'admission', Sobrecarregado())
+    with pytest.raises(HTTPException) as erro:
+        asyncio.run(routes.run_admitted(lambda: None))
+
+    assert erro.value.status_code == codigo
+    assert erro.value.headers == {'Retry-After': '11'}
+
+
+def test_run_admitted_returns_result(monkeypatch):
+    monkeypatch.setattr(routes, 'admission', AdmissionController(max_concurrent=1))
+    assert asyncio.run(routes.run_admitted(sum, [1, 2, 3])) == 6
+
+
+class Saturated:
+    """Controle de admissão que descarta toda computação, como durante uma rajada."""
+
+    async def run(self, funcao, *args):
+        raise Overloaded(MOTIVO_FILA_CHEIA, 1)
+
+
+def test_cached_requests_bypass_admission(client, site, store, monkeypatch):
+    consulta = {'dataset': 'producao', 'start_year': 2020, 'end_year': 2021}
+    assert client.get('/vitibrasil/api/v1/producao', params={'start_year': 2020, 'end_year': 2021}).status_code == 200
+
+    monkeypatch.setattr(routes, 'admission', Saturated())
+    resposta = client.get('/vitibrasil/api/v1/producao', params={'start_year': 2020, 'end_year': 2021})
+    assert resposta.status_code == 200
+
+    resultados = client.post('/vitibrasil/api/v1/batch', json={'consultas': [consulta, {**consulta, 'end_year': 2022}]}).json()['resultados']
+    por_consulta = {item['consulta']: item for item in resultados}
+    # A consulta em cache é servida; só a que precisa ser calculada é descartada
+    assert {linha['Ano'] for linha in por_consulta[0]['dados']} == {2020, 2021}
+    assert por_consulta[1]['erro']['status'] == 429
@@ -0,0 +1,71 @@
+import pyarrow as pa
+import pytest
+
+from app.utils_data.aggregation import aggregate, detail_rows, numeric, top_n
+
+# Como no processamento: a linha com o nome da classificação é o subtotal dos itens dela
+PROCESSAMENTO = pa.table({
+    'Cultivar': ['TINTAS', 'BORDO', 'ISABEL', 'BRANCAS', 'NIAGARA', 'SEM CLASSIFICACAO', 'TOTAL'] * 2,
+    'Classificação': ['TINTAS', 'TINTAS', 'TINTAS', 'BRANCAS', 'BRANCAS', 'SEM CLASSIFICACAO', None] * 2,
+    'Quantidade': ['30', '10', '20', '5', '5', '-', '35', '60', '20', '40', '7', '7', '3', '70'],
+    'Ano': [2020] * 7 + [2021] * 7,
+})
+
+
+def test_detail_rows_drop_totals_and_subtotals():
+    assert detail_rows(PROCESSAMENTO).slice(0, 5)['Cultivar'].to_pylist() == \
+        ['BORDO', 'ISABEL', 'NIAGARA', 'SEM CLASSIFICACAO', 'BORDO']
+
+
+def test_numeric_treats_text_as_null():
+    assert numeric(pa.chunked_array([['10', ' 2.5 ', '-', None]])).to_pylist() == [10.0, 2.5, None, None]
+
+
+def test_aggregate_by_classification():
+    resultado = aggregate(PROCESSAMENTO, ['classificacao'], 'quantidade', ('sum', 'count'))
+    assert resultado.to_pylist() == [
+        {'Classificação': 'BRANCAS', 'Quantidade_sum': 12.0, 'Quantidade_count': 2},
+        {'Classificação': 'SEM CLASSIFICACAO', 'Quantidade_sum': 3.0, 'Quantidade_count': 1},
+        {'Classificação': 'TINTAS', 'Quantidade_sum': 90.0, 'Quantidade_count': 4},
+    ]
+    # A soma das linhas de detalhe confere com a linha de total de cada ano
+    por_ano = aggregate(PROCESSAMENTO, ['Ano'], 'Quantidade')
+    assert por_ano['Quantidade_sum'].to_pylist() == [35.0, 70.0]
+
+
+def test_top_n():
+    assert top_n(PROCESSAMENTO, 'cultivar', 'quantidade', 2).to_pylist() == [
+        {'Cultivar': 'ISABEL', 'Quantidade_sum': 60.0},
+        {'Cultivar': 'BORDO', 'Quantidade_sum': 30.0},
+    ]
+    assert top_n(PROCESSAMENTO, 'cultivar', 'quantidade', 0).num_rows == 0
+
+
+@pytest.mark.parametrize('dimensoes,metrica,funcoes', [
+    (['paises'], 'quantidade', ('sum',)),
+    (['ano'], 'valor', ('sum',)),
+    (['ano'], 'quantidade', ('max',)),
+    ([], 'quantidade', ('sum',)),
+])
+def test_aggregate_rejects_unsupported_columns(dimensoes, metrica, funcoes):
+    with pytest.raises(ValueError):
+        aggregate(PROCESSAMENTO, dimensoes, metrica, funcoes)
+
+
+def test_aggregation_endpoint(client, site, store):
+    tabela = pa.table({
+        'Produto': ['VINHO DE MESA', 'SUCO', 'TOTAL', 'VINHO DE MESA', 'SUCO', 'TOTAL'],
+        'Quantidade': [10, 20, 30, 1, 2, 3],
+        'Ano': [2022, 2022, 2022, 2023, 2023, 2023],
+    })
+    store.publish({'producao': tabela})
+
+    resposta = client.get('/vitibrasil/api/v1/agregacao/producao', params={'group_by': 'ano', 'agg': ['sum', 'mean']})
+    assert resposta.status_code == 200
+    assert resposta.json() == [
+        {'Ano': 2022, 'Quantidade_sum': 30, 'Quantidade_mean': 15.0},
+        {'Ano': 2023, 'Quantidade_sum': 3, 'Quantidade_mean': 1.5},
+    ]
+    top = client.get('/vitibrasil/api/v1/agregacao/producao/top', params={'group_by': 'produto', 'n': 1})
+    assert top.json() == [{'Produto': 'SUCO', 'Quantidade_sum': 22}]
+    assert client.get('/vitibrasil/api/v1/agregacao/producao', params={'group_by': 'paises'}).status_code == 400
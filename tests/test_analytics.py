@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from app.utils_data.analytics import (
+    COLUNA_ACUMULADO, COLUNA_MEDIA_MOVEL, COLUNA_VARIACAO, moving_average, series_analytics, year_over_year,
+)
+
+PRODUCAO = pa.table({
+    'Produto': ['VINHO DE MESA', 'SUCO', 'TOTAL', 'VINHO DE MESA', 'VINHO DE MESA', 'SUCO', 'TOTAL'],
+    'Quantidade': [100, 0, 100, 110, 121, 50, 171],
+    'Ano': [2020, 2020, 2020, 2021, 2022, 2022, 2022],
+})
+
+
+def test_year_over_year():
+    variacao = year_over_year(np.array([[100.0, 110.0, 99.0], [0.0, 5.0, 10.0]]))
+    np.testing.assert_allclose(variacao, [[np.nan, 0.1, -0.1], [np.nan, np.nan, 1.0]])
+
+
+def test_moving_average():
+    matriz = np.array([[1.0, 2.0, 3.0, 4.0], [10.0, 0.0, 20.0, 30.0]])
+    np.testing.assert_allclose(moving_average(matriz, 2), [[np.nan, 1.5, 2.5, 3.5], [np.nan, 5.0, 10.0, 25.0]])
+    np.testing.assert_allclose(moving_average(matriz, 1), matriz)
+    assert np.isnan(moving_average(matriz, 5)).all()
+
+
+def test_series_analytics_fills_missing_years():
+    resultado = series_analytics(PRODUCAO, 'produto', 'quantidade', janela=2).to_pylist()
+    suco = [linha for linha in resultado if linha['Produto'] == 'SUCO']
+    vinho = [linha for linha in resultado if linha['Produto'] == 'VINHO DE MESA']
+
+    # Os anos sem linhas da série entram com zero, e o TOTAL não é uma série
+    assert {linha['Produto'] for linha in resultado} == {'SUCO', 'VINHO DE MESA'}
+    assert [linha['Quantidade'] for linha in suco] == [0, 0, 50]
+    assert [linha[COLUNA_VARIACAO] for linha in suco] == [None, None, None]
+    assert [linha['Ano'] for linha in vinho] == [2020, 2021, 2022]
+    assert [linha[COLUNA_VARIACAO] for linha in vinho][0] is None
+    assert [round(linha[COLUNA_VARIACAO], 6) for linha in vinho[1:]] == [0.1, 0.1]
+    assert [linha[COLUNA_MEDIA_MOVEL] for linha in vinho] == [None, 105.0, 115.5]
+    assert [linha[COLUNA_ACUMULADO] for linha in vinho] == [100.0, 210.0, 331.0]
+
+
+@pytest.mark.parametrize('serie,janela', [('ano', 3), ('paises', 3), ('produto', 0)])
+def test_series_analytics_rejects_invalid_arguments(serie, janela):
+    with pytest.raises(ValueError):
+        series_analytics(PRODUCAO, serie, 'quantidade', janela)
+
+
+def test_analytics_endpoint(client, site, store):
+    store.publish({'producao': PRODUCAO})
+    resposta = client.get('/vitibrasil/api/v1/analise/producao', params={'serie': 'produto', 'window': 2})
+    assert resposta.status_code == 200
+    linhas = {(linha['Produto'], linha['Ano']): linha for linha in resposta.json()}
+    assert math.isclose(linhas[('VINHO DE MESA', 2022)][COLUNA_VARIACAO], 0.1)
+    assert linhas[('SUCO', 2021)][COLUNA_MEDIA_MOVEL] == 0
+    assert client.get('/vitibrasil/api/v1/analise/producao', params={'serie': 'ano'}).status_code == 400
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth, main
+from app.auth import DEFAULT_USERS, VerifiedTokenCache
+from app.user_store import MemoryUserStore
+
+
+@pytest.fixture
+def users(monkeypatch):
+    """Chave de assinatura de teste, cache de tokens vazio e usuários em memória."""
+    monkeypatch.setattr(auth, 'SECRET_KEY', 'segredo-de-teste')
+    monkeypatch.setattr(auth, 'ALGORITHM', 'HS256')
+    monkeypatch.setattr(auth, 'token_cache', VerifiedTokenCache(maxsize=8))
+    users = MemoryUserStore(DEFAULT_USERS)
+    monkeypatch.setattr(auth, 'users_db', users)
+    return users
+
+
+def test_token_cache_expires_entries():
+    tokens = VerifiedTokenCache(maxsize=8)
+    tokens.put('valido', 'usuario', time.time() + 60)
+    tokens.put('vencido', 'usuario', time.time() - 1)
+    assert tokens.get('valido') == 'usuario'
+    assert tokens.get('vencido') is None
+    assert len(tokens._entries) == 1
+
+
+def test_token_cache_is_bounded():
+    tokens = VerifiedTokenCache(maxsize=2)
+    for token in ('a', 'b'):
+        tokens.put(token, 'usuario', time.time() + 60)
+    tokens.get('a')
+    tokens.put('c', 'usuario', time.time() + 60)
+    assert [tokens.get(token) for token in 'abc'] == ['usuario', None, 'usuario']
+    assert VerifiedTokenCache(maxsize=0).get('a') is None
+
+
+def test_decoded_token_is_cached(users, monkeypatch):
+    token = auth.create_access_token({'sub': 'usuario'}, timedelta(minutes=5))
+    assert auth.decode_token_username(token) == 'usuario'
+
+    def decode(*args, **kwargs):
+        raise AssertionError('token em cache verificado novamente')
+
+    monkeypatch.setattr(auth.jwt, 'decode', decode)
+    assert auth.decode_token_username(token) == 'usuario'
+
+
+def test_disable_user_revokes_access(users):
+    token = auth.create_access_token({'sub': 'usuario'}, timedelta(minutes=5))
+    assert asyncio.run(auth.get_current_user(token))['username'] == 'usuario'
+
+    auth.disable_user(users, 'usuario')
+    assert auth.token_cache.get(token) is None
+    with pytest.raises(HTTPException) as erro:
+        asyncio.run(auth.get_current_user(token))
+    assert erro.value.status_code == 401
+
+
+def test_login_throttle_window(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(auth.time, 'monotonic', lambda: agora[0])
+    throttle = auth.LoginThrottle(max_attempts=2, window=60)
+    assert [throttle.hit('10.0.0.1') for _ in range(2)] == [0, 0]
+    assert throttle.hit('10.0.0.1') == 61
+    assert throttle.hit('10.0.0.2') == 0
+    agora[0] += 60
+    assert throttle.hit('10.0.0.1') == 0
+    assert auth.LoginThrottle(max_attempts=0).hit('10.0.0.1') == 0
+
+
+def test_token_endpoint_throttles_logins(client, monkeypatch):
+    monkeypatch.setattr(main, 'login_throttle', auth.LoginThrottle(max_attempts=1, window=60))
+    assert client.post('/token', data={'username': 'inexistente', 'password': 'x'}).status_code == 401
+    resposta = client.post('/token', data={'username': 'inexistente', 'password': 'x'})
+    assert resposta.status_code == 429
+    assert int(resposta.headers['Retry-After']) > 0
+
+
+def test_token_endpoint_sheds_when_password_queue_is_full(client, monkeypatch):
+    monkeypatch.setattr(main, 'login_throttle', auth.LoginThrottle(max_attempts=0))
+    monkeypatch.setattr(auth, '_password_slots', threading.BoundedSemaphore(1))
+    auth._password_slots.acquire()
+    resposta = client.post('/token', data={'username': 'admin', 'password': 'admin'})
+    assert resposta.status_code == 503
+    assert resposta.headers['Retry-After'] == '1'
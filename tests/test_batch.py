@@ -0,0 +1,86 @@
+import asyncio
+import json
+from collections import Counter
+
+from app.routes import batch
+from app.utils_data.formats import deserialize_arrow_ipc
+
+BATCH = '/vitibrasil/api/v1/batch'
+
+
+def test_identical_queries_run_once():
+    chamadas = []
+
+    async def funcao(scraper, start_year, end_year, botao):
+        chamadas.append((start_year, end_year))
+        return start_year
+
+    consulta = {'dataset': 'producao', 'scraper': None, 'start_year': 2020, 'end_year': 2021, 'botao': None}
+
+    async def cenario():
+        tarefas = batch.run_queries([consulta, dict(consulta), {**consulta, 'end_year': 2022}], funcao)
+        return tarefas, await asyncio.gather(*tarefas)
+
+    tarefas, resultados = asyncio.run(cenario())
+    assert tarefas[0] is tarefas[1]
+    assert resultados == [2020, 2020, 2020]
+    assert sorted(chamadas) == [(2020, 2021), (2020, 2022)]
+
+
+def test_stream_json_yields_results_as_they_finish():
+    consultas = [
+        {'dataset': 'producao', 'start_year': 2020, 'end_year': 2020, 'botao_opcao': None},
+        {'dataset': 'processamento', 'start_year': 2021, 'end_year': 2021, 'botao_opcao': None},
+    ]
+
+    async def resultado(atraso, content):
+        await asyncio.sleep(atraso)
+        return content, False, []
+
+    async def cenario():
+        tarefas = [asyncio.ensure_future(resultado(0.05, b'[1]')), asyncio.ensure_future(resultado(0, b'[2]'))]
+        return b''.join([bloco async for bloco in batch.stream_json(consultas, tarefas)])
+
+    documento = json.loads(asyncio.run(cenario()))
+    # A consulta mais rápida vem primeiro, identificada pelo índice no lote
+    assert [(item['consulta'], item['dados']) for item in documento['resultados']] == [(1, [2]), (0, [1])]
+
+
+def test_batch_json(client, site, store):
+    consultas = [
+        {'dataset': 'producao', 'start_year': 2020, 'end_year': 2021},
+        {'dataset': 'importacao', 'start_year': 2021, 'end_year': 2021, 'botao_opcao': 'subopt_01'},
+        {'dataset': 'producao', 'start_year': 2020, 'end_year': 2021},
+    ]
+    resposta = client.post(BATCH, json={'consultas': consultas})
+    assert resposta.status_code == 200
+
+    resultados = sorted(resposta.json()['resultados'], key=lambda item: item['consulta'])
+    assert [item['dataset'] for item in resultados] == ['producao', 'importacao', 'producao']
+    assert resultados[0]['dados'] == resultados[2]['dados']
+    assert {linha['Ano'] for linha in resultados[0]['dados']} == {2020, 2021}
+    assert not any(item['vencido'] for item in resultados)
+    # Cada página do site foi baixada uma única vez
+    paginas = Counter(tuple(sorted(query.items())) for _, query in site.requests if 'ano' in query)
+    assert paginas and set(paginas.values()) == {1}
+
+
+def test_batch_arrow_combines_tables(client, site, store):
+    consultas = [
+        {'dataset': 'producao', 'start_year': 2020, 'end_year': 2020},
+        {'dataset': 'producao', 'start_year': 2021, 'end_year': 2021},
+    ]
+    resposta = client.post(BATCH, params={'format': 'arrow'}, json={'consultas': consultas})
+    assert resposta.status_code == 200
+
+    tabela = deserialize_arrow_ipc(resposta.content)
+    assert set(zip(tabela['Consulta'].to_pylist(), tabela['Ano'].to_pylist())) == {(0, 2020), (1, 2021)}
+    assert set(tabela['Dataset'].to_pylist()) == {'producao'}
+
+
+def test_batch_size_is_limited(client, monkeypatch):
+    assert client.post(BATCH, json={'consultas': []}).status_code == 400
+    monkeypatch.setattr(batch, 'BATCH_MAX_QUERIES', 1)
+    consulta = {'dataset': 'producao'}
+    assert client.post(BATCH, json={'consultas': [consulta, consulta]}).status_code == 400
+    assert client.post(BATCH, json={'consultas': [{'dataset': 'inexistente'}]}).status_code == 400
@@ -0,0 +1,82 @@
+import time
+
+import fakeredis
+import pytest
+
+from app.utils_data.cache import MemoryCacheBackend, RedisCacheBackend, RedisLock
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+def test_memory_evicts_least_recently_used():
+    cache = MemoryCacheBackend(max_entries=2)
+    cache.set('a', b'1')
+    cache.set('b', b'2')
+    assert cache.get('a') == b'1'
+    cache.set('c', b'3')
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1'
+    assert cache.get('c') == b'3'
+
+
+def test_memory_purges_expired_entries_without_reads():
+    cache = MemoryCacheBackend(purge_interval=0)
+    for indice in range(100):
+        cache.set(f'resposta:{indice}', b'x', ttl=0.01)
+    time.sleep(0.02)
+    cache.set('nova', b'y')
+
+    assert len(cache) == 1
+    assert cache.get('nova') == b'y'
+
+
+def test_redis_backend_roundtrip_with_prefix_and_ttl(client):
+    cache = RedisCacheBackend(client=client, prefix='teste:')
+    cache.set('pagina', b'conteudo', ttl=30)
+    cache.set('segmento', b'dados')
+
+    assert cache.get('pagina') == b'conteudo'
+    assert 0 < client.ttl('teste:pagina') <= 30
+    assert client.ttl('teste:segmento') == -1
+    assert cache.get_many(['pagina', 'ausente', 'segmento']) == [b'conteudo', None, b'dados']
+    cache.delete('pagina')
+    assert cache.get('pagina') is None
+
+
+def test_redis_lock_is_exclusive(client):
+    cache = RedisCacheBackend(client=client, prefix='teste:')
+    primeira = cache.lock('refresh:producao', ttl=30, blocking_timeout=0)
+    segunda = cache.lock('refresh:producao', ttl=30, blocking_timeout=0)
+
+    assert primeira.acquire()
+    assert not segunda.acquire()
+    assert 0 < client.pttl(primeira.key) <= 30000
+    primeira.release()
+    assert client.get(primeira.key) is None
+    assert segunda.acquire()
+
+
+def test_redis_lock_release_checks_token(client):
+    dono = RedisLock(client, 'trava', ttl=30, blocking_timeout=0)
+    assert dono.acquire()
+    # A trava expirou e foi adquirida por outro nó antes de o dono liberá-la
+    client.delete('trava')
+    outro = RedisLock(client, 'trava', ttl=30, blocking_timeout=0)
+    assert outro.acquire()
+
+    dono.release()
+    assert client.get('trava') == outro.token
+
+
+def test_redis_lock_expires_after_ttl(client):
+    abandonada = RedisLock(client, 'trava', ttl=0.05, blocking_timeout=0)
+    assert abandonada.acquire()
+    seguinte = RedisLock(client, 'trava', ttl=30, blocking_timeout=1, poll_interval=0.01)
+
+    assert seguinte.acquire()
+    assert client.get('trava') == seguinte.token
@@ -0,0 +1,97 @@
+import os
+import time
+
+import pyarrow as pa
+
+from app.utils_data.changes import diff_tables, changes_since
+from app.utils_data.shared_store import SharedDatasetStore
+
+
+def producao(quantidades):
+    """Tabela no formato do dataset de produção, com um produto por ano."""
+    anos = sorted(quantidades)
+    return pa.table({
+        'Produto': ['VINHO DE MESA'] * len(anos),
+        'Quantidade': [quantidades[ano] for ano in anos],
+        'Ano': anos,
+    })
+
+
+def publish(store, quantidades):
+    """Publica uma versão com o registro de alterações, como o app.refresher."""
+    tabela = producao(quantidades)
+    changes = diff_tables('producao', store.get_table('producao'), tabela)
+    return store.publish({'producao': tabela}, changes=changes)
+
+
+def test_changes_outlive_pruned_versions(tmp_path):
+    store = SharedDatasetStore(root=str(tmp_path), keep_versions=2)
+    for valor in range(6):
+        atual = publish(store, {2022: 100, 2023: 200 + valor})
+
+    # O cliente está mais atrasado que as versões mantidas em disco
+    assert 1 not in store.published_versions()
+    alteracoes = changes_since(store, 1, ['producao'], atual)
+    assert alteracoes is not None
+    assert alteracoes['Versao'].to_pylist() == [2, 3, 4, 5, 6]
+    assert set(alteracoes['Operacao'].to_pylist()) == {'update'}
+    assert alteracoes['Quantidade'].to_pylist() == [201, 202, 203, 204, 205]
+
+
+def test_changes_expire_after_keep_days(tmp_path):
+    store = SharedDatasetStore(root=str(tmp_path), keep_versions=2, changes_keep_days=1)
+    publish(store, {2023: 1})
+    publish(store, {2023: 2})
+    antigo = time.time() - 2 * 24 * 60 * 60
+    os.utime(store.changes_path(1), (antigo, antigo))
+    atual = publish(store, {2023: 3})
+
+    assert store.get_changes(1) is None
+    assert changes_since(store, 0, ['producao'], atual) is None
+    # O registro de uma versão ainda mantida em disco não expira
+    os.utime(store.changes_path(atual), (antigo, antigo))
+    publish(store, {2023: 4})
+    assert atual in store.published_versions()
+    assert store.get_changes(atual) is not None
+
+
+def test_diff_tables_reports_inserts_updates_and_deletes():
+    anterior = producao({2021: 10, 2022: 20, 2023: 30})
+    nova = producao({2022: 20, 2023: 35, 2024: 40})
+    alteracoes = diff_tables('producao', anterior, nova).to_pylist()
+
+    assert [(a['Operacao'], a['Ano']) for a in alteracoes] == [('delete', 2021), ('update', 2023), ('insert', 2024)]
+    assert alteracoes[0]['Quantidade Anterior'] == 10 and alteracoes[0]['Quantidade'] is None
+    assert (alteracoes[1]['Quantidade Anterior'], alteracoes[1]['Quantidade']) == (30, 35)
+    assert alteracoes[2]['Quantidade Anterior'] is None and alteracoes[2]['Quantidade'] == 40
+    assert {a['Dataset'] for a in alteracoes} == {'producao'}
+    assert {a['Entidade'] for a in alteracoes} == {'VINHO DE MESA'}
+
+
+def test_diff_tables_without_previous_version_inserts_everything():
+    alteracoes = diff_tables('producao', None, producao({2022: 1, 2023: 2}))
+    assert alteracoes['Operacao'].to_pylist() == ['insert', 'insert']
+
+
+def test_changes_since_current_version_is_empty(tmp_path):
+    store = SharedDatasetStore(root=str(tmp_path))
+    atual = publish(store, {2023: 1})
+    alteracoes = changes_since(store, atual, ['producao'], atual)
+    assert alteracoes.num_rows == 0
+    assert 'Versao' in alteracoes.column_names
+
+
+def test_changes_endpoint(client, store):
+    for valor in (1, 2, 3):
+        atual = publish(store, {2023: valor})
+
+    resposta = client.get('/vitibrasil/api/v1/changes', params={'since': 1})
+    assert resposta.status_code == 200
+    assert resposta.headers['X-Vitibrasil-Version'] == str(atual)
+    assert [(a['Versao'], a['Quantidade']) for a in resposta.json()] == [(2, 2), (3, 3)]
+
+    assert client.get('/vitibrasil/api/v1/changes', params={'since': atual + 1}).status_code == 400
+    os.remove(store.changes_path(2))
+    resposta = client.get('/vitibrasil/api/v1/changes', params={'since': 1})
+    assert resposta.status_code == 410
+    assert resposta.headers['X-Vitibrasil-Version'] == str(atual)
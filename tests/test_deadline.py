@@ -0,0 +1,46 @@
+import pytest
+from fastapi import HTTPException
+
+from app.routes import routes
+from app.utils_data.cache import cache
+from app.utils_data.deadline import deadline_scope, current_deadline, upstream_timeout, DeadlineExceeded, UPSTREAM_TIMEOUT
+from app.utils_data.segments import _TIMESTAMP, _unpack_segment
+from app.utils_data.web_scraping.scraping_producao import ProducaoScraper
+
+
+def test_nested_scope_keeps_shorter_deadline():
+    assert current_deadline() is None
+    assert upstream_timeout() == UPSTREAM_TIMEOUT
+    with deadline_scope(1) as externo:
+        with deadline_scope(60) as interno:
+            assert interno is externo
+            assert 0 < upstream_timeout() <= 1
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            upstream_timeout()
+
+
+def expire_segments():
+    """Marca os segmentos em cache como gravados há muito tempo, além da validade."""
+    for chave, (valor, expires_at) in list(cache._data.items()):
+        if chave.startswith('segment'):
+            _, conteudo = _unpack_segment(valor)
+            cache._data[chave] = (_TIMESTAMP.pack(0) + conteudo, expires_at)
+
+
+def test_expired_deadline_without_cache_fails_fast(site, store):
+    with pytest.raises(HTTPException) as erro:
+        routes.get_data(ProducaoScraper, 2020, 2021, budget=0)
+    assert erro.value.status_code == 504
+
+
+def test_expired_deadline_serves_stale_segments(site, store):
+    tabela = routes.get_data(ProducaoScraper, 2020, 2021)
+    assert not routes.is_stale(tabela)
+    expire_segments()
+    site.requests.clear()
+
+    vencida = routes.get_data(ProducaoScraper, 2020, 2021, budget=0)
+    assert routes.is_stale(vencida)
+    assert vencida.equals(tabela)
+    assert site.requests == []
@@ -0,0 +1,83 @@
+import io
+import json
+import zipfile
+
+import pytest
+import pyarrow as pa
+from fastapi import HTTPException
+
+from app.routes.export import parse_range
+
+EXPORT = '/vitibrasil/api/v1/export'
+
+
+@pytest.mark.parametrize('header,intervalo', [
+    (None, None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=10-19', (10, 19)),
+    ('bytes=90-', (90, 99)),
+    ('bytes=-10', (90, 99)),
+    ('bytes=-500', (0, 99)),
+    ('bytes=50-500', (50, 99)),
+    ('bytes=0-9,20-29', None),
+    ('items=0-9', None),
+    ('bytes=a-b', None),
+])
+def test_parse_range(header, intervalo):
+    assert parse_range(header, 100) == intervalo
+
+
+@pytest.mark.parametrize('header', ['bytes=100-', 'bytes=100-200', 'bytes=20-10', 'bytes=-0'])
+def test_parse_range_outside_file(header):
+    with pytest.raises(HTTPException) as erro:
+        parse_range(header, 100)
+    assert erro.value.status_code == 416
+    assert erro.value.headers == {'Content-Range': 'bytes */100'}
+
+
+@pytest.fixture
+def pacote(client, store):
+    """Publica uma versão e baixa o pacote completo uma vez."""
+    tabela = pa.table({'Produto': ['VINHO DE MESA', 'SUCO'], 'Quantidade': [10, 20], 'Ano': [2023, 2023]})
+    store.publish({'producao': tabela})
+    resposta = client.get(EXPORT)
+    assert resposta.status_code == 200
+    return resposta
+
+
+def test_export_range_resumes_download(client, pacote):
+    etag, tamanho = pacote.headers['ETag'], len(pacote.content)
+    assert pacote.headers['Content-Length'] == str(tamanho)
+
+    resposta = client.get(EXPORT, headers={'Range': 'bytes=10-', 'If-Range': etag})
+    assert resposta.status_code == 206
+    assert resposta.headers['Content-Range'] == f'bytes 10-{tamanho - 1}/{tamanho}'
+    assert resposta.content == pacote.content[10:]
+
+    resposta = client.get(EXPORT, headers={'Range': f'bytes={tamanho}-'})
+    assert resposta.status_code == 416
+
+
+def test_export_if_range_mismatch_sends_whole_file(client, pacote):
+    resposta = client.get(EXPORT, headers={'Range': 'bytes=10-', 'If-Range': '"outra-versao"'})
+    assert resposta.status_code == 200
+    assert resposta.content == pacote.content
+
+
+def test_export_if_none_match(client, pacote):
+    resposta = client.get(EXPORT, headers={'If-None-Match': pacote.headers['ETag']})
+    assert resposta.status_code == 304
+
+
+def test_versions_with_same_content_share_package(client, store, pacote):
+    tabela = pa.table({'Produto': ['VINHO DE MESA', 'SUCO'], 'Quantidade': [10, 20], 'Ano': [2023, 2023]})
+    assert store.publish({'producao': tabela}) == 2
+
+    resposta = client.get(EXPORT)
+    assert resposta.headers['ETag'] == pacote.headers['ETag']
+    assert resposta.headers['X-Vitibrasil-Version'] == '2'
+    assert 'vitibrasil-v2-parquet.zip' in resposta.headers['Content-Disposition']
+    # O manifesto compartilhado não traz dados de uma versão específica
+    with zipfile.ZipFile(io.BytesIO(resposta.content)) as arquivo:
+        manifesto = json.loads(arquivo.read('manifest.json'))
+    assert manifesto == {'id': store.snapshot(2)['id'], 'datasets': {'producao': {'linhas': 2}}}
@@ -0,0 +1,56 @@
+import io
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.utils_data.formats import serialize, deserialize_arrow_ipc, MEDIA_TYPES
+
+DADOS = pd.DataFrame({
+    'Produto': ['VINHO DE MESA', 'SUCO', None],
+    'Quantidade': [1.5, None, 3.0],
+    'Ano': [2021, 2022, 2023],
+})
+
+
+def test_json_roundtrip():
+    content, media_type, extensao = serialize(DADOS, 'json')
+    assert (media_type, extensao) == (MEDIA_TYPES['json'], 'json')
+    assert json.loads(content) == [
+        {'Produto': 'VINHO DE MESA', 'Quantidade': 1.5, 'Ano': 2021},
+        {'Produto': 'SUCO', 'Quantidade': None, 'Ano': 2022},
+        {'Produto': None, 'Quantidade': 3.0, 'Ano': 2023},
+    ]
+
+
+def test_arrow_roundtrip():
+    content, media_type, _ = serialize(DADOS, 'arrow')
+    assert media_type == MEDIA_TYPES['arrow']
+    assert deserialize_arrow_ipc(content).equals(pa.Table.from_pandas(DADOS, preserve_index=False))
+
+
+def test_parquet_roundtrip():
+    content, media_type, _ = serialize(DADOS, 'parquet')
+    assert media_type == MEDIA_TYPES['parquet']
+    pd.testing.assert_frame_equal(pq.read_table(io.BytesIO(content)).to_pandas(), DADOS)
+
+
+@pytest.mark.parametrize('formato', ['json', 'arrow', 'parquet'])
+def test_mixed_object_column_becomes_text(formato):
+    # Colunas do CSV podem misturar '-' e números
+    dados = pd.DataFrame({'Quantidade': ['-', 10, None]})
+    content, _, _ = serialize(dados, formato)
+    if formato == 'json':
+        valores = [linha['Quantidade'] for linha in json.loads(content)]
+    elif formato == 'arrow':
+        valores = deserialize_arrow_ipc(content)['Quantidade'].to_pylist()
+    else:
+        valores = pq.read_table(io.BytesIO(content))['Quantidade'].to_pylist()
+    assert valores == ['-', '10', None]
+
+
+def test_unsupported_format():
+    with pytest.raises(ValueError):
+        serialize(DADOS, 'csv')
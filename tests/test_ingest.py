@@ -0,0 +1,136 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pytest
+
+from app import ingest
+from app.utils_data.shared_store import SharedDatasetStore, write_arrow_file
+
+
+def test_plan_tasks_splits_years_and_buttons():
+    tarefas = ingest.plan_tasks(['producao', 'importacao'], 'site', 20)
+    producao = [t for t in tarefas if t[0] == 'producao']
+    importacao = [t for t in tarefas if t[0] == 'importacao']
+
+    assert producao == [('producao', None, 1970, 1989), ('producao', None, 1990, 2009), ('producao', None, 2010, 2023)]
+    botoes = list(ingest.DATASETS['importacao']['botoes'])
+    # Dentro de cada intervalo de anos, uma tarefa por botão
+    assert importacao[:len(botoes)] == [('importacao', botao, 1970, 1989) for botao in botoes]
+    assert len(importacao) == 3 * len(botoes)
+
+
+@pytest.mark.parametrize('fonte,anos_por_tarefa', [('csv', 20), ('site', 0)])
+def test_plan_tasks_full_range(fonte, anos_por_tarefa):
+    assert ingest.plan_tasks(['producao'], fonte, anos_por_tarefa) == [('producao', None, 1970, 2023)]
+
+
+@pytest.fixture
+def fake_workers(monkeypatch):
+    """Executa as tarefas em threads, com a obtenção dos dados substituída."""
+    executadas = []
+
+    def run_task(tarefa, fonte, checkpoint_dir):
+        executadas.append(tarefa)
+        write_checkpoint(checkpoint_dir, tarefa, fonte)
+        return 1, 0.0, {}
+
+    monkeypatch.setattr(ingest, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    monkeypatch.setattr(ingest, 'run_task', run_task)
+    monkeypatch.setattr(ingest, 'prepare_exports', lambda version, store: None)
+    monkeypatch.setattr(ingest.limiter, 'rate', ingest.limiter.rate)
+    return executadas
+
+
+def write_checkpoint(checkpoint_dir, tarefa, fonte):
+    _, _, start_year, end_year = tarefa
+    tabela = pa.table({'Produto': ['VINHO DE MESA'], 'Quantidade': [float(start_year)], 'Ano': [end_year]})
+    write_arrow_file(tabela, ingest.checkpoint_path(checkpoint_dir, tarefa, fonte))
+
+
+def test_ingest_resumes_from_checkpoints(fake_workers, tmp_path):
+    store = SharedDatasetStore(root=str(tmp_path / 'store'))
+    checkpoint_dir = str(tmp_path / 'ingest')
+    tarefas = ingest.plan_tasks(['producao'], 'site', 20)
+    os.makedirs(checkpoint_dir)
+    write_checkpoint(checkpoint_dir, tarefas[0], 'site')
+
+    version = ingest.ingest(['producao'], 'site', workers=2, anos_por_tarefa=20, checkpoint_dir=checkpoint_dir,
+                            rate=10, store=store)
+
+    assert version == 1
+    assert sorted(fake_workers) == tarefas[1:]
+    assert store.get_table('producao')['Ano'].to_pylist() == [1989, 2009, 2023]
+    # Os pontos de controle são removidos depois da publicação
+    assert os.listdir(checkpoint_dir) == []
+
+
+def test_ingest_failure_keeps_checkpoints(fake_workers, monkeypatch, tmp_path):
+    store = SharedDatasetStore(root=str(tmp_path / 'store'))
+    checkpoint_dir = str(tmp_path / 'ingest')
+    tarefas = ingest.plan_tasks(['producao'], 'site', 20)
+    executar = ingest.run_task
+
+    def run_task(tarefa, fonte, checkpoint_dir):
+        if tarefa == tarefas[-1]:
+            raise RuntimeError('página com falha no site')
+        return executar(tarefa, fonte, checkpoint_dir)
+
+    monkeypatch.setattr(ingest, 'run_task', run_task)
+    assert ingest.ingest(['producao'], 'site', workers=2, anos_por_tarefa=20, checkpoint_dir=checkpoint_dir,
+                         rate=10, store=store) is None
+    assert store.current_version() is None
+    assert len(os.listdir(checkpoint_dir)) == 2
+
+    # A nova execução só refaz a tarefa que falhou
+    monkeypatch.setattr(ingest, 'run_task', executar)
+    fake_workers.clear()
+    assert ingest.ingest(['producao'], 'site', workers=2, anos_por_tarefa=20, checkpoint_dir=checkpoint_dir,
+                         rate=10, store=store) == 1
+    assert fake_workers == [tarefas[-1]]
+
+
+def test_worker_rate_splits_total_rate():
+    assert ingest.worker_rate(8, 4) == 2
+    assert ingest.worker_rate(0, 1) == 0
+
+
+def test_worker_rate_rejects_unlimited_parallel_scraping(monkeypatch):
+    monkeypatch.setattr(ingest.transport, 'mode', 'live')
+    monkeypatch.setattr(ingest, 'BASE_URL', ingest.DEFAULT_BASE_URL)
+    with pytest.raises(ValueError):
+        ingest.worker_rate(0, 2)
+    # Sem acessar o site da Embrapa, o limite pode ficar desativado
+    monkeypatch.setattr(ingest.transport, 'mode', 'replay')
+    assert ingest.worker_rate(0, 2) == 0
+
+
+def test_empty_task_fails_without_checkpoint(site, tmp_path):
+    # Os CSVs vão até 2023: a tarefa não obtém nenhuma linha
+    tarefa = ('producao', None, 2030, 2031)
+    with pytest.raises(ingest.IncompleteDataset):
+        ingest.run_task(tarefa, 'csv', str(tmp_path))
+    assert not os.path.exists(ingest.checkpoint_path(str(tmp_path), tarefa, 'csv'))
+
+
+def test_csv_task_writes_checkpoint(site, tmp_path):
+    tarefa = ('producao', None, 2020, 2021)
+    linhas, _, _ = ingest.run_task(tarefa, 'csv', str(tmp_path))
+    tabela = pa.ipc.open_file(ingest.checkpoint_path(str(tmp_path), tarefa, 'csv')).read_all()
+    assert tabela.num_rows == linhas > 0
+    assert set(tabela['Ano'].to_pylist()) == {2020, 2021}
+
+
+def test_empty_dataset_is_not_published(fake_workers, monkeypatch, tmp_path):
+    store = SharedDatasetStore(root=str(tmp_path / 'store'))
+    checkpoint_dir = str(tmp_path / 'ingest')
+
+    def run_task(tarefa, fonte, checkpoint_dir):
+        write_arrow_file(pa.table({}), ingest.checkpoint_path(checkpoint_dir, tarefa, fonte))
+        return 0, 0.0, {}
+
+    monkeypatch.setattr(ingest, 'run_task', run_task)
+    assert ingest.ingest(['producao'], 'csv', workers=1, checkpoint_dir=checkpoint_dir, rate=10, store=store) is None
+    assert store.current_version() is None
+    # Os pontos de controle vazios são refeitos na próxima execução
+    assert os.listdir(checkpoint_dir) == []
@@ -0,0 +1,45 @@
+from app.metrics import Registry, CONTENT_TYPE
+from app.utils_data.cache import CACHE_LOOKUPS
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    contador = registry.counter('teste_total', 'Contador de teste', ['dataset'])
+    assert registry.counter('teste_total', 'Outra descrição', ['dataset']) is contador
+    contador.inc(dataset='producao')
+    contador.inc(2, dataset='"aspas"\n')
+    registry.gauge('teste_fila', 'Medidor de teste').set(1.5)
+    histograma = registry.histogram('teste_segundos', 'Histograma de teste', buckets=(0.1, 1))
+    for valor in (0.05, 0.5, 5):
+        histograma.observe(valor)
+
+    assert registry.render().splitlines() == [
+        '# HELP teste_total Contador de teste',
+        '# TYPE teste_total counter',
+        'teste_total{dataset="\\"aspas\\"\\n"} 2',
+        'teste_total{dataset="producao"} 1',
+        '# HELP teste_fila Medidor de teste',
+        '# TYPE teste_fila gauge',
+        'teste_fila 1.5',
+        '# HELP teste_segundos Histograma de teste',
+        '# TYPE teste_segundos histogram',
+        'teste_segundos_bucket{le="0.1"} 1',
+        'teste_segundos_bucket{le="1"} 2',
+        'teste_segundos_bucket{le="+Inf"} 3',
+        'teste_segundos_sum 5.55',
+        'teste_segundos_count 3',
+    ]
+
+
+def test_metrics_endpoint(client, site, store):
+    antes = CACHE_LOOKUPS.value(camada='segmento', resultado='miss')
+    assert client.get('/vitibrasil/api/v1/producao', params={'start_year': 2020, 'end_year': 2021}).status_code == 200
+
+    resposta = client.get('/metrics')
+    assert resposta.status_code == 200
+    assert resposta.headers['content-type'] == CONTENT_TYPE
+    assert CACHE_LOOKUPS.value(camada='segmento', resultado='miss') == antes + 1
+    linhas = resposta.text.splitlines()
+    assert f'vitibrasil_cache_lookups_total{{camada="segmento",resultado="miss"}} {antes + 1}' in linhas
+    assert '# TYPE vitibrasil_stage_duration_seconds histogram' in linhas
+    assert any(linha.startswith('vitibrasil_upstream_requests_total') for linha in linhas)
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import auth
+from app.main import app
+from app.auth import VerifiedTokenCache
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    """Tokens assinados com uma chave de teste para os usuários iniciais."""
+    monkeypatch.setattr(auth, 'SECRET_KEY', 'segredo-de-teste')
+    monkeypatch.setattr(auth, 'ALGORITHM', 'HS256')
+    monkeypatch.setattr(auth, 'token_cache', VerifiedTokenCache(maxsize=8))
+    return {
+        username: {'Authorization': 'Bearer ' + auth.create_access_token({'sub': username}, timedelta(minutes=5))}
+        for username in ('usuario', 'admin')
+    }
+
+
+@pytest.mark.parametrize('credencial', ['sem_token', 'invalido', 'usuario'])
+def test_profiling_requires_admin(tokens, credencial):
+    headers = {'sem_token': {}, 'invalido': {'Authorization': 'Bearer invalido'}, **tokens}[credencial]
+    resposta = TestClient(app).get('/metrics', params={'profile': 'inline'}, headers=headers)
+    assert resposta.status_code == 403
+    # Sem pedir o perfil, a requisição segue normalmente
+    assert TestClient(app).get('/metrics', headers=headers).status_code == 200
+
+
+def test_admin_gets_inline_profile(tokens):
+    resposta = TestClient(app).get('/metrics', headers={**tokens['admin'], 'X-Vitibrasil-Profile': 'inline'})
+    assert resposta.status_code == 200
+    assert resposta.headers['content-type'].startswith('text/plain')
+    assert 'x-vitibrasil-profile-samples' in resposta.headers
+    assert '# HELP' not in resposta.text
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from app import refresher
+from app.routes.routes import CELULAS_FALHAS_ATTR
+from app.utils_data.cache import MemoryCacheBackend
+from app.utils_data.shared_store import SharedDatasetStore
+
+
+def producao(quantidade, faltando=()):
+    dados = pd.DataFrame({'Produto': ['VINHO DE MESA'], 'Quantidade': [quantidade], 'Ano': [2023], 'Fonte': ['SITE']})
+    dados.attrs[CELULAS_FALHAS_ATTR] = list(faltando)
+    return dados
+
+
+@pytest.fixture
+def refresh(monkeypatch, tmp_path):
+    """Executa refresh_datasets com a raspagem substituída pelos dados informados."""
+    store = SharedDatasetStore(root=str(tmp_path))
+    monkeypatch.setattr(refresher, 'prepare_exports', lambda version, store: None)
+
+    def executar(dados):
+        monkeypatch.setattr(refresher, 'get_data_from_source', lambda *args: dados)
+        return refresher.refresh_datasets(['producao'], store=store, ttl=60, backend=MemoryCacheBackend())
+
+    return store, executar
+
+
+@pytest.mark.parametrize('dados', [pd.DataFrame(), producao(20, faltando=[(2023, None)])], ids=['vazio', 'celulas_falhas'])
+def test_incomplete_scrape_keeps_previous_version(refresh, dados):
+    store, executar = refresh
+    assert executar(producao(10)) == 1
+
+    assert executar(dados) == 1
+    assert store.published_versions() == [1]
+    assert store.get_table('producao')['Quantidade'].to_pylist() == [10]
+
+
+def test_complete_scrape_publishes_new_version(refresh):
+    store, executar = refresh
+    executar(producao(10))
+
+    assert executar(producao(20)) == 2
+    assert store.get_changes(2)['Operacao'].to_pylist() == ['update']
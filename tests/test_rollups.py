@@ -0,0 +1,71 @@
+import pyarrow as pa
+import pytest
+
+from app.utils_data.rollups import ROLLUPS, available_rollups, changed_years, compute_rollups, update_rollups
+
+
+def exportacao(linhas):
+    """Tabela no formato da exportação a partir de tuplas (país, ano, botão, quantidade, valor)."""
+    paises, anos, botoes, quantidades, valores = zip(*linhas)
+    return pa.table({
+        'Países': list(paises), 'Quantidade': list(quantidades), 'Valor (US$)': list(valores),
+        'Ano': list(anos), 'Botao': list(botoes), 'Fonte': ['SITE'] * len(linhas),
+    })
+
+
+ANTERIOR = exportacao([
+    (pais, ano, botao, ano - 2000 + i, (ano - 2000 + i) * 3)
+    for ano in (2020, 2021, 2022) for botao in ('VINHOS', 'SUCO') for i, pais in enumerate(['ALEMANHA', 'CHINA', 'TOTAL'])
+])
+
+
+def assert_same_rollups(calculado, esperado):
+    assert set(calculado) == set(esperado)
+    for nome in esperado:
+        assert calculado[nome].equals(esperado[nome]), nome
+
+
+def test_compute_rollups():
+    rollups = compute_rollups(ANTERIOR)
+    assert set(rollups) == set(ROLLUPS) == set(available_rollups(ANTERIOR))
+    # As linhas de TOTAL não entram nas somas
+    assert rollups['anual'].slice(0, 1).to_pylist() == [
+        {'Ano': 2020, 'Botao': 'SUCO', 'Quantidade': 41, 'Valor (US$)': 123, 'US$/kg': 3.0}
+    ]
+    assert rollups['paises'].num_rows == 4
+    assert available_rollups(ANTERIOR.drop_columns(['Países'])) == ('anual',)
+
+
+def test_update_rollups_matches_full_recompute():
+    linhas = [linha for linha in zip(*[ANTERIOR[c].to_pylist() for c in ('Países', 'Ano', 'Botao', 'Quantidade', 'Valor (US$)')])
+              if linha[1] != 2020]
+    linhas = [(p, a, b, q * 10 if a == 2021 else q, v) for p, a, b, q, v in linhas]
+    linhas += [('CHINA', 2023, 'VINHOS', 7, 70)]
+    nova = exportacao(linhas)
+
+    rollups, anos = update_rollups(nova, ANTERIOR, compute_rollups(ANTERIOR))
+    assert anos == {2020, 2021, 2023}
+    assert_same_rollups(rollups, compute_rollups(nova))
+
+
+def test_update_rollups_without_changes():
+    anteriores = compute_rollups(ANTERIOR)
+    # A origem das linhas não conta como alteração
+    nova = ANTERIOR.set_column(ANTERIOR.schema.get_field_index('Fonte'), 'Fonte', pa.array(['CSV'] * ANTERIOR.num_rows))
+    rollups, anos = update_rollups(nova, ANTERIOR, anteriores)
+    assert anos == set()
+    assert all(rollups[nome] is anteriores[nome] for nome in ROLLUPS)
+
+
+@pytest.mark.parametrize('anterior,rollups_anteriores', [(None, None), (ANTERIOR, {}), (ANTERIOR, 'sem_paises')])
+def test_update_rollups_computes_everything_without_previous_rollups(anterior, rollups_anteriores):
+    if rollups_anteriores == 'sem_paises':
+        rollups_anteriores = {'anual': compute_rollups(ANTERIOR)['anual']}
+    rollups, anos = update_rollups(ANTERIOR, anterior, rollups_anteriores)
+    assert anos is None
+    assert_same_rollups(rollups, compute_rollups(ANTERIOR))
+
+
+def test_schema_change_recomputes_all_years():
+    nova = ANTERIOR.set_column(1, 'Quantidade', ANTERIOR['Quantidade'].cast(pa.float64()))
+    assert changed_years(ANTERIOR, nova) == {2020, 2021, 2022}
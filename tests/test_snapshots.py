@@ -0,0 +1,109 @@
+import json
+import os
+
+import pyarrow as pa
+import pytest
+from fastapi import HTTPException
+
+from app.routes import routes
+from app.utils_data.shared_store import SharedDatasetStore, SNAPSHOT_FILE, OBJECTS_DIR, manifest_filename
+
+
+def producao(quantidades):
+    """Tabela de produção com um produto e uma quantidade por ano."""
+    anos = sorted(quantidades)
+    return pa.table({'Produto': ['VINHO DE MESA'] * len(anos), 'Quantidade': [quantidades[a] for a in anos], 'Ano': anos})
+
+
+def objects(store):
+    return set(os.listdir(os.path.join(store.root, OBJECTS_DIR)))
+
+
+def partitions(store, version):
+    with open(os.path.join(store.version_dir(version), manifest_filename('producao'))) as f:
+        return {p['ano']: p['objeto'] for p in json.load(f)['particoes']}
+
+
+def test_unchanged_years_share_partitions(tmp_path):
+    store = SharedDatasetStore(root=str(tmp_path), keep_versions=2)
+    store.publish({'producao': producao({2020: 1, 2021: 2, 2022: 3})})
+    primeira = objects(store)
+    store.publish({'producao': producao({2020: 1, 2021: 2, 2022: 30})})
+
+    # Esquema e três anos na primeira versão; só o ano alterado é gravado na segunda
+    assert len(primeira) == 4
+    assert len(objects(store)) == 5
+    v1, v2 = partitions(store, 1), partitions(store, 2)
+    assert [v1[ano] == v2[ano] for ano in (2020, 2021, 2022)] == [True, True, False]
+    assert store.get_table('producao', 1)['Quantidade'].to_pylist() == [1, 2, 3]
+    assert store.get_table('producao', 2)['Quantidade'].to_pylist() == [1, 2, 30]
+
+    # A partição que só a versão descartada usava é removida
+    store.publish({'producao': producao({2020: 1, 2021: 2, 2022: 300})})
+    assert store.published_versions() == [2, 3]
+    assert v1[2022] + '.arrow' not in objects(store)
+    assert len(objects(store)) == 5
+
+
+@pytest.fixture
+def versions(store):
+    """Três versões publicadas em datas conhecidas, com a primeira já descartada."""
+    store.keep_versions = 2
+    for version, (quantidade, publicado_em) in enumerate(
+        [(1, '2024-01-10T12:00:00+00:00'), (2, '2024-03-01T00:00:00+00:00'), (3, '2024-03-05T08:00:00+00:00')], 1
+    ):
+        store.publish({'producao': producao({2023: quantidade})})
+        path = os.path.join(store.version_dir(version), SNAPSHOT_FILE)
+        with open(path) as f:
+            snapshot = json.load(f)
+        with open(path, 'w') as f:
+            json.dump({**snapshot, 'publicado_em': publicado_em}, f)
+    return store
+
+
+@pytest.mark.parametrize('as_of,versao', [
+    ('2', 2),
+    ('3', 3),
+    ('2024-03-01', 2),
+    ('2024-03-04T23:59:59', 2),
+    ('2024-03-05', 3),
+    ('2024-03-05T08:00:00-03:00', 3),
+])
+def test_as_of_resolves_version(versions, as_of, versao):
+    assert routes.snapshot_version(as_of) == versao
+
+
+def test_as_of_content_id(versions):
+    snapshot = versions.snapshot(2)
+    assert routes.snapshot_version(snapshot['id'][:8]) == 2
+    assert routes.snapshot_version(snapshot['id'].upper()) == 2
+
+
+@pytest.mark.parametrize('as_of,codigo', [
+    ('0', 404),
+    ('4', 404),
+    ('ffffffffffff', 404),
+    ('1', 410),
+    ('2024-02-01', 410),
+    ('ontem', 400),
+    ('abc', 400),
+])
+def test_as_of_errors(versions, as_of, codigo):
+    with pytest.raises(HTTPException) as erro:
+        routes.snapshot_version(as_of)
+    assert erro.value.status_code == codigo
+
+
+def test_as_of_without_published_versions(store):
+    assert routes.snapshot_version(None) is None
+    with pytest.raises(HTTPException) as erro:
+        routes.snapshot_version('1')
+    assert erro.value.status_code == 404
+
+
+def test_endpoint_serves_requested_version(client, versions):
+    resposta = client.get('/vitibrasil/api/v1/producao', params={'start_year': 2023, 'end_year': 2023, 'as_of': '2'})
+    assert resposta.status_code == 200
+    assert [linha['Quantidade'] for linha in resposta.json()] == [2]
+    assert resposta.headers['X-Vitibrasil-Version'] == '2'
+    assert client.get('/vitibrasil/api/v1/producao', params={'as_of': '1'}).status_code == 410
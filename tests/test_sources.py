@@ -0,0 +1,82 @@
+import io
+
+import pyarrow as pa
+import pytest
+
+from app.routes.routes import get_data, get_data_from_source, is_stale, missing_from, CELULAS_FALHAS_ATTR, \
+    MISSING_METADATA_KEY
+from app.utils_data.constants import opcoes_botoes_importacao
+from app.utils_data.web_scraping.scraping_base import FONTE_SITE, FONTE_CSV
+from app.utils_data.web_scraping.scraping_importacao import ImportacaoScraper
+from app.utils_data.web_scraping.scraping_producao import ProducaoScraper
+
+
+def csv_downloads(site):
+    return [caminho for caminho, _ in site.requests if caminho.startswith('/download/')]
+
+
+def test_failed_page_is_filled_from_csv(site):
+    site.falhas.add(('opt_02', None, 2020))
+    dados = get_data_from_source(ProducaoScraper, 2019, 2021)
+
+    fontes = dados.groupby('Ano')['Fonte'].unique().map(list).to_dict()
+    assert fontes == {2019: [FONTE_SITE], 2020: [FONTE_CSV], 2021: [FONTE_SITE]}
+    assert dados.attrs[CELULAS_FALHAS_ATTR] == []
+    assert csv_downloads(site) == ['/download/Producao.csv']
+
+
+def test_only_failed_button_csv_is_downloaded(site):
+    site.falhas.add(('opt_05', 'subopt_03', 2022))
+    dados = get_data_from_source(ImportacaoScraper, 2022, 2022)
+
+    botoes = {botao['classificacao_botao'] for botao in opcoes_botoes_importacao.values()}
+    assert set(dados['Botao']) == botoes
+    csv = dados[dados['Fonte'] == FONTE_CSV]
+    assert set(csv['Botao']) == {opcoes_botoes_importacao['UVAS_FRESCAS']['classificacao_botao']}
+    assert csv_downloads(site) == ['/download/ImpFrescas.csv']
+
+
+def test_site_down_serves_csv(site):
+    site.falhas.update(('opt_02', None, ano) for ano in (None, 2019, 2020))
+    dados = get_data_from_source(ProducaoScraper, 2019, 2020)
+    assert set(dados['Ano']) == {2019, 2020}
+    assert set(dados['Fonte']) == {FONTE_CSV}
+
+
+@pytest.fixture
+def incompleto(site, store):
+    """A página de 2024 falha no site e não existe nos CSVs (que vão até 2023)."""
+    site.falhas.add(('opt_02', None, 2024))
+    return site
+
+
+def test_missing_cell_is_not_cached(incompleto):
+    tabela = get_data(ProducaoScraper, 2023, 2024)
+    assert set(tabela['Ano'].to_pylist()) == {2023}
+    assert is_stale(tabela)
+    assert missing_from(tabela) == [[2024, None]]
+
+    # A próxima requisição tenta o site de novo em vez de servir um segmento vazio
+    incompleto.requests.clear()
+    incompleto.falhas.clear()
+    tabela = get_data(ProducaoScraper, 2023, 2024)
+    assert ('/index.php', {'opcao': 'opt_02', 'ano': '2024'}) in incompleto.requests
+    assert set(tabela['Ano'].to_pylist()) == {2023, 2024}
+    assert not is_stale(tabela)
+
+
+def test_missing_cells_reach_the_client(client, incompleto):
+    resposta = client.get('/vitibrasil/api/v1/producao', params={'start_year': 2023, 'end_year': 2024})
+    assert resposta.status_code == 200
+    assert resposta.headers['X-Vitibrasil-Missing-Cells'] == '[[2024, null]]'
+    assert resposta.headers['Warning'] == '110 - "Response is Stale"'
+
+    resposta = client.get('/vitibrasil/api/v1/producao', params={'start_year': 2023, 'end_year': 2024, 'format': 'arrow'})
+    tabela = pa.ipc.open_stream(io.BytesIO(resposta.content)).read_all()
+    assert tabela.schema.metadata[MISSING_METADATA_KEY] == b'[[2024, null]]'
+
+    # Com o site de volta, a resposta completa substitui a incompleta
+    incompleto.falhas.clear()
+    resposta = client.get('/vitibrasil/api/v1/producao', params={'start_year': 2023, 'end_year': 2024})
+    assert 'X-Vitibrasil-Missing-Cells' not in resposta.headers
+    assert {linha['Ano'] for linha in resposta.json()} == {2023, 2024}
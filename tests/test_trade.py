@@ -0,0 +1,58 @@
+import pyarrow as pa
+import pytest
+
+from app.routes import analytics
+from app.utils_data.trade import trade_totals, trade_balance
+
+
+def comercio(linhas):
+    """Tabela no formato da importação/exportação: (país, ano, botão, quantidade, valor)."""
+    paises, anos, botoes, quantidades, valores = zip(*linhas)
+    return pa.table({
+        'Países': list(paises), 'Quantidade': list(quantidades), 'Valor (US$)': list(valores),
+        'Ano': list(anos), 'Botao': list(botoes),
+    })
+
+
+def test_trade_balance_joins_both_sides():
+    exportacao = trade_totals(comercio([
+        ('Chile', 2022, 'VINHOS DE MESA', 100, 500),
+        ('Chile', 2022, 'VINHOS DE MESA', 50, 250),
+        ('Japão', 2022, 'VINHOS DE MESA', 10, 80),
+        ('TOTAL', 2022, 'VINHOS DE MESA', 160, 830),
+    ]))
+    importacao = trade_totals(comercio([
+        ('Chile', 2022, 'VINHOS DE MESA', 200, 600),
+        ('Itália', 2022, 'VINHOS DE MESA', 0, 0),
+    ]))
+    linhas = {linha['Países']: linha for linha in trade_balance(exportacao, importacao).to_pylist()}
+
+    assert set(linhas) == {'Chile', 'Japão', 'Itália'}
+    chile = linhas['Chile']
+    assert (chile['Quantidade Exportação'], chile['Quantidade Importação']) == (150, 200)
+    assert (chile['Saldo Quantidade'], chile['Saldo (US$)']) == (-50, 150)
+    assert chile['US$/kg Exportação'] == 5 and chile['US$/kg Importação'] == 3
+    # Chaves de um lado só: o outro lado entra como zero e o US$/kg fica nulo
+    assert linhas['Japão']['Saldo Quantidade'] == 10 and linhas['Japão']['US$/kg Importação'] is None
+    assert linhas['Itália']['US$/kg Importação'] is None
+
+
+def test_balance_endpoint(client, store):
+    store.publish({
+        'exportacao': comercio([('Chile', 2021, 'VINHOS DE MESA', 10, 20), ('Chile', 2022, 'VINHOS DE MESA', 30, 60)]),
+        'importacao': comercio([('Chile', 2022, 'VINHOS DE MESA', 5, 25)]),
+    })
+    resposta = client.get('/vitibrasil/api/v1/balanca-comercial', params={'start_year': 2022, 'end_year': 2022})
+    assert resposta.status_code == 200
+    assert [(linha['Ano'], linha['Saldo Quantidade']) for linha in resposta.json()] == [(2022, 25)]
+
+
+def test_index_reads_its_own_version(store, monkeypatch):
+    monkeypatch.setattr(analytics, '_trade_frames', {})
+    store.publish({'exportacao': comercio([('Chile', 2022, 'VINHOS DE MESA', 10, 20)])})
+    # Uma nova versão é publicada antes de a indexação da versão 1 ler a tabela
+    store.publish({'exportacao': comercio([('Chile', 2022, 'VINHOS DE MESA', 99, 99)])})
+
+    totais = analytics.index_trade(1, 'exportacao')
+    assert totais['Quantidade'].to_pylist() == [10]
+    assert analytics._trade_frames[(1, 'exportacao')] is totais
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+import requests
+
+from app.utils_data import transport as transport_module
+from app.utils_data.transport import ArchiveMiss, ResponseArchive, Transport, request_key
+from tests.conftest import FakeSite
+
+PAGINA = 'http://vitibrasil.cnpuv.embrapa.br/index.php'
+
+
+def test_request_key_ignores_host_and_parameter_order():
+    assert request_key(PAGINA + '?opcao=opt_02', {'ano': 2020}) == '/index.php?ano=2020&opcao=opt_02'
+    assert request_key('http://127.0.0.1:8000/index.php', {'opcao': 'opt_02', 'ano': '2020'}) == \
+        '/index.php?ano=2020&opcao=opt_02'
+
+
+def test_record_then_replay(monkeypatch, tmp_path):
+    site = FakeSite()
+    monkeypatch.setattr(transport_module.requests, 'get', site.get)
+    archive = ResponseArchive(str(tmp_path / 'arquivo'))
+
+    gravado = Transport('record', archive).get(PAGINA, params={'opcao': 'opt_02', 'ano': 2020})
+    Transport('record', archive).get(PAGINA, params={'opcao': 'opt_02', 'ano': 2020})
+    assert len(site.requests) == 2
+    assert len(os.listdir(tmp_path / 'arquivo' / 'index')) == 1
+
+    replay = Transport('replay', archive)
+    # O arquivo serve a mesma requisição feita a outro endereço, sem acessar a rede
+    reproduzido = replay.get('http://127.0.0.1:8000/index.php', params={'ano': '2020', 'opcao': 'opt_02'})
+    assert len(site.requests) == 2
+    assert reproduzido.status_code == 200
+    assert reproduzido.content == gravado.content
+    assert reproduzido.text == gravado.text
+
+    with pytest.raises(ArchiveMiss):
+        replay.get(PAGINA, params={'opcao': 'opt_02', 'ano': 2021})
+
+
+def test_identical_bodies_are_stored_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(transport_module.requests, 'get', FakeSite().get)
+    transport = Transport('record', ResponseArchive(str(tmp_path)))
+    transport.get(PAGINA, params={'opcao': 'opt_02', 'ano': 2020})
+    transport.get(PAGINA + '?ano=2020', params={'opcao': 'opt_02', 'extra': 1})
+    assert len(os.listdir(tmp_path / 'index')) == 2
+    assert sum(len(arquivos) for _, _, arquivos in os.walk(tmp_path / 'objects')) == 1
+
+
+def test_live_fallback_to_archive(monkeypatch, tmp_path):
+    site = FakeSite()
+    monkeypatch.setattr(transport_module.requests, 'get', site.get)
+    archive = ResponseArchive(str(tmp_path))
+    Transport('record', archive).get(PAGINA, params={'opcao': 'opt_02', 'ano': 2020})
+
+    site.falhas.add(('opt_02', None, 2020))
+    assert Transport('live', archive, fallback=True).get(PAGINA, params={'opcao': 'opt_02', 'ano': 2020}).ok
+    with pytest.raises(requests.exceptions.ConnectionError):
+        Transport('live', archive).get(PAGINA, params={'opcao': 'opt_02', 'ano': 2020})
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        Transport('offline')
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from app.utils_data import upstream
+from app.utils_data.upstream import TokenBucketLimiter, Pedido, PRIORIDADE_INTERATIVA, PRIORIDADE_BACKGROUND
+
+
+def wait_queued(limiter, quantidade):
+    """Aguarda até `quantidade` chamadas estarem na fila do limitador."""
+    limite = time.monotonic() + 2
+    while len(limiter._waiters) < quantidade:
+        assert time.monotonic() < limite, 'chamadas não chegaram à fila'
+        time.sleep(0.005)
+
+
+def start(alvo, *args):
+    thread = threading.Thread(target=alvo, args=args)
+    thread.start()
+    return thread
+
+
+def test_promote_moves_queued_request_ahead(monkeypatch):
+    limiter = TokenBucketLimiter(rate=5, burst=1)
+    limiter.acquire()
+    ordem = []
+
+    def chamar(nome, pedido):
+        limiter.acquire(pedido=pedido)
+        ordem.append(nome)
+
+    antigo, promovido = Pedido(PRIORIDADE_BACKGROUND), Pedido(PRIORIDADE_BACKGROUND)
+    threads = [start(chamar, 'antigo', antigo)]
+    wait_queued(limiter, 1)
+    threads.append(start(chamar, 'promovido', promovido))
+    wait_queued(limiter, 2)
+    limiter.promote(promovido, PRIORIDADE_INTERATIVA)
+    for thread in threads:
+        thread.join()
+
+    assert ordem == ['promovido', 'antigo']
+
+
+class FakeTransport:
+    offline = False
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.urls.append(url)
+        return type('Response', (), {'status_code': 200, 'url': url})()
+
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    limiter = TokenBucketLimiter(rate=5, burst=1)
+    limiter.acquire()
+    transport = FakeTransport()
+    monkeypatch.setattr(upstream, 'limiter', limiter)
+    monkeypatch.setattr(upstream, 'transport', transport)
+    return limiter, transport
+
+
+def test_interactive_caller_promotes_shared_background_fetch(fake_upstream):
+    limiter, transport = fake_upstream
+    respostas = {}
+
+    def buscar(nome, url, priority):
+        with upstream.upstream_priority(priority):
+            respostas[nome] = upstream.upstream_get(url)
+
+    threads = [start(buscar, 'refresh_a', 'http://site/a', PRIORIDADE_BACKGROUND)]
+    wait_queued(limiter, 1)
+    threads.append(start(buscar, 'refresh_b', 'http://site/b', PRIORIDADE_BACKGROUND))
+    wait_queued(limiter, 2)
+    # A requisição interativa se junta à busca de 'b', que passa à frente de 'a'
+    threads.append(start(buscar, 'usuario_b', 'http://site/b', PRIORIDADE_INTERATIVA))
+    for thread in threads:
+        thread.join()
+
+    assert transport.urls == ['http://site/b', 'http://site/a']
+    assert respostas['usuario_b'] is respostas['refresh_b']
+    assert upstream._pedidos == {}
+
+
+def test_interactive_requests_go_first_in_arrival_order():
+    limiter = TokenBucketLimiter(rate=5, burst=1)
+    limiter.acquire()
+    ordem = []
+
+    def chamar(nome, priority):
+        limiter.acquire(priority)
+        ordem.append(nome)
+
+    threads = []
+    for nome, priority in [('bg1', PRIORIDADE_BACKGROUND), ('bg2', PRIORIDADE_BACKGROUND),
+                           ('int1', PRIORIDADE_INTERATIVA), ('int2', PRIORIDADE_INTERATIVA)]:
+        threads.append(start(chamar, nome, priority))
+        wait_queued(limiter, len(threads))
+    for thread in threads:
+        thread.join()
+
+    assert ordem == ['int1', 'int2', 'bg1', 'bg2']
+
+
+def test_acquire_respects_rate_after_burst():
+    limiter = TokenBucketLimiter(rate=10, burst=2)
+    inicio = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    duracao = time.monotonic() - inicio
+
+    # A rajada sai na hora e as outras 4 chamadas aguardam um token cada (0,1s)
+    assert 0.35 <= duracao < 1.0
+
+
+def test_acquire_timeout_leaves_queue():
+    limiter = TokenBucketLimiter(rate=1, burst=1)
+    limiter.acquire()
+    with pytest.raises(upstream.RateLimitTimeout):
+        limiter.acquire(timeout=0.05)
+    assert limiter._waiters == []
+
+
+def test_zero_rate_disables_limit():
+    limiter = TokenBucketLimiter(rate=0, burst=1)
+    assert [limiter.acquire() for _ in range(100)] == [0.0] * 100
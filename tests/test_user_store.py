@@ -0,0 +1,59 @@
+from app.auth import DEFAULT_USERS
+from app.user_store import MemoryUserStore, SQLiteUserStore, compile_permissions
+from app.utils_data.cache import MemoryCacheBackend
+
+
+def test_compile_permissions():
+    assert compile_permissions(['GET:/producao', 'POST:/batch', 'invalida']) == frozenset(
+        {('GET', '/producao'), ('POST', '/batch')}
+    )
+
+
+def test_sqlite_store_loads_seed_users(tmp_path):
+    store = SQLiteUserStore(str(tmp_path / 'usuarios.db'), DEFAULT_USERS, backend=MemoryCacheBackend())
+    usuario = store['usuario']
+
+    assert usuario['permissions'] == ['GET:/processamento', 'GET:/producao']
+    assert usuario.permission_set == compile_permissions(DEFAULT_USERS['usuario']['permissions'])
+    assert store['admin']['is_admin'] is True
+    assert 'is_admin' not in usuario
+    assert store.get('inexistente') is None
+    assert 'inexistente' not in store
+    # Os usuários iniciais não substituem os já gravados
+    store.set_disabled('usuario')
+    assert SQLiteUserStore(store.path, DEFAULT_USERS, backend=MemoryCacheBackend())['usuario']['disabled'] is True
+
+
+def test_memory_store_compiles_permissions():
+    store = MemoryUserStore(DEFAULT_USERS)
+    assert store['usuario'].permission_set == frozenset({('GET', '/producao'), ('GET', '/processamento')})
+    store.set_disabled('usuario')
+    assert store['usuario']['disabled'] is True
+
+
+def test_sqlite_cache_is_bounded(tmp_path):
+    store = SQLiteUserStore(str(tmp_path / 'usuarios.db'), DEFAULT_USERS, cache_size=1, backend=MemoryCacheBackend())
+    usuario = store['usuario']
+    assert store['usuario'] is usuario
+    store['admin']
+    assert list(store._cache) == ['admin']
+    assert store['usuario'] is not usuario
+
+
+def test_disable_reaches_other_processes(tmp_path):
+    compartilhado = MemoryCacheBackend()
+    caminho = str(tmp_path / 'usuarios.db')
+    processo_a = SQLiteUserStore(caminho, DEFAULT_USERS, backend=compartilhado)
+    processo_b = SQLiteUserStore(caminho, DEFAULT_USERS, backend=compartilhado)
+    assert processo_b['usuario']['disabled'] is False
+
+    processo_a.set_disabled('usuario')
+    assert processo_b['usuario']['disabled'] is True
+
+    # Sem o cache compartilhado, a alteração só é vista quando o registro em memória expira
+    isolado = SQLiteUserStore(caminho, backend=MemoryCacheBackend())
+    assert isolado['usuario']['disabled'] is True
+    processo_a.set_disabled('usuario', False)
+    assert isolado['usuario']['disabled'] is True
+    isolado._cache.clear()
+    assert isolado['usuario']['disabled'] is False